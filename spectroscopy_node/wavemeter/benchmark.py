@@ -0,0 +1,713 @@
+"""
+Benchmarks for the wavemeter acquisition path.
+
+These run without a wavemeter: synthetic events are fed straight into the scheduler's callback handler
+(or handed out by a stand-in for the DLL's wait-event functions, or returned by a stand-in for
+get_frequency), so they measure the Python side of the acquisition (everything after the DLL delivers
+an event).
+
+The rate sweep drives each scheduler at 100 Hz to 50 kHz and reports, per path and rate:
+    - sustained throughput and dropped events (sent but never received by the consumer)
+    - event -> consumer latency percentiles
+    - heartbeat lag: how late a thread sleeping 1 ms wakes up, an upper bound on how long the
+      acquisition holds the GIL at a stretch
+    - RSS growth over the run and CPU time per event
+
+The startup benchmark starts fresh interpreters and measures their time to first sample
+(imports, loading the wlmData library, registering the callback and receiving the first event),
+against the simulated library unless --dll gives the path of the real one.
+
+The error handling benchmark compares raising and catching an exception per failed poll with keeping
+the raw error codes and classifying them in bulk.
+
+The step overhead benchmark measures what a start()/stop() pair costs per scan step, with a new
+thread or DLL callback per step and with a persistent scheduler (open() once, start/stop only arm and
+disarm it).
+
+The instrument state benchmark measures the dead time of reading temperature, pressure, exposure,
+linewidth and switcher channel one after another, concurrently, and from cached callback events.
+
+The stability benchmark measures how long the Allan deviation, Welch PSD and streaming Allan deviation
+of a long synthetic frequency stream take.
+
+The recording benchmarks measure the sustained MB/s of a RecordingWriter and how much attaching one
+slows down the callback acquisition path.
+
+Usage:
+    python benchmark.py [--events N] [--rates HZ,HZ,...] [--duration S] [--paths callback,wait,poll]
+                        [--dll PATH] [--json]
+"""
+
+import argparse, json, os, platform, queue, resource, subprocess, sys, tempfile, threading, time, tracemalloc
+from typing import Sequence
+
+import numpy as np
+
+import wlmConst
+import wlmData
+from buffers import RingBuffer
+from recording import RECORD_DTYPE, RecordingWriter
+from samples import count_errors, status_codes
+from scheduler import EventDrivenScheduler, IntervalScheduler, WaitEventScheduler
+from stability import StreamingAllan, overlapping_adev, welch_psd
+from wavemeter import _STATE_READERS, STATE_PARAMETERS, WavemeterWS7
+
+DEFAULT_RATES = (100, 500, 1_000, 5_000, 10_000, 50_000)
+ACQUISITION_PATHS = ("callback", "wait", "poll")
+
+
+def _drive_callback(handler, n_events: int) -> float:
+    """
+    Calls handler with n_events synthetic cmiFrequency1 events as fast as possible.
+    Returns the elapsed time in seconds.
+    """
+    mode = wlmConst.cmiFrequency1
+    start = time.perf_counter()
+    for i in range(n_events):
+        handler(mode, i, 375_000.0 + i * 1e-6)
+    return time.perf_counter() - start
+
+
+def _drain_until(scheduler: EventDrivenScheduler, done: threading.Event) -> None:
+    """
+    Consumer loop: empties scheduler.data until the producer is done and the buffer is empty.
+    """
+    data = scheduler.data
+    while not (done.is_set() and data.empty()):
+        while not data.empty():
+            data.get_nowait()
+        time.sleep(0.001)
+
+
+def bench_buffer_backend(use_ring: bool, n_events: int = 200_000) -> dict:
+    """
+    Measures the sustained event rate of EventDrivenScheduler with a concurrent consumer,
+    and the memory held per buffered sample.
+
+    Args:
+        use_ring (bool): Use a RingBuffer instead of the default queue.Queue.
+        n_events (int): The number of synthetic callback events to send.
+
+    Returns:
+        dict: events_per_sec and bytes_per_sample of the backend.
+    """
+    # Throughput: producer calling the handler while a consumer thread empties the buffer
+    buffer = RingBuffer(n_events) if use_ring else None
+    scheduler = EventDrivenScheduler(None, buffer=buffer)  # type: ignore[arg-type]
+    handler = (
+        scheduler.ring_callback_handler if use_ring else scheduler.callback_handler
+    )
+    done = threading.Event()
+    consumer = threading.Thread(target=_drain_until, args=(scheduler, done))
+    consumer.start()
+    elapsed = _drive_callback(handler, n_events)
+    done.set()
+    consumer.join()
+
+    # Memory: bytes held by the buffer once it contains every sample (no consumer)
+    if use_ring:
+        bytes_per_sample = RingBuffer(n_events).bytes_per_sample
+    else:
+        scheduler = EventDrivenScheduler(None)  # type: ignore[arg-type]
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        _drive_callback(scheduler.callback_handler, n_events)
+        after = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        bytes_per_sample = (after - before) / n_events
+
+    return {
+        "backend": "ring" if use_ring else "queue",
+        "events": n_events,
+        "events_per_sec": n_events / elapsed,
+        "bytes_per_sample": bytes_per_sample,
+    }
+
+
+class _SyntheticWaitDevice:
+    """
+    Stands in for WavemeterWS7's wait-event methods: events pushed by the source thread are handed
+    out by wait_for_next_event_ex, which blocks (releasing the GIL) like WaitForNextWLMEventEx.
+    """
+
+    def __init__(self):
+        self._events: queue.SimpleQueue = queue.SimpleQueue()
+        self._timeout = 0.1
+
+    def push(self, mode: int, intval: int, dblval: float) -> None:
+        self._events.put((mode, intval, dblval))
+
+    def install_wait_event(self, timeout_ms: int) -> None:
+        self._timeout = timeout_ms / 1000
+
+    def remove_wait_event(self) -> None:
+        pass
+
+    def clear_events(self) -> None:
+        while not self._events.empty():
+            self._events.get_nowait()
+
+    def wait_for_next_event_ex(self):
+        try:
+            mode, intval, dblval = self._events.get(timeout=self._timeout)
+        except queue.Empty:
+            return 0, 0, 0, 0, 0.0, 0
+        return 1, 0, mode, intval, dblval, 0
+
+
+class _SyntheticPollDevice:
+    """
+    Stands in for WavemeterWS7.get_frequency(_raw), counting the polls.
+    """
+
+    def __init__(self):
+        self.polls = 0
+
+    def get_frequency(self) -> float:
+        self.polls += 1
+        return 375_000.0 + self.polls * 1e-6
+
+    get_frequency_raw = get_frequency
+
+
+def _paced_source(emit, rate: float, duration: float, sent: list) -> None:
+    """
+    Calls emit(mode, intval, dblval) at `rate` Hz for `duration` seconds, counting the events in sent[0].
+    intval carries the perf_counter_ns() of the event, so the consumer can compute its latency.
+    Sleeps of less than a scheduler tick are not possible, so at high rates events are sent in bursts
+    that keep the average rate.
+    """
+    mode = wlmConst.cmiFrequency1
+    period_ns = int(1e9 / rate)
+    start = time.perf_counter_ns()
+    end = start + int(duration * 1e9)
+    deadline = start
+    i = 0
+    while deadline < end:
+        deadline += period_ns
+        delay = (deadline - time.perf_counter_ns()) / 1e9
+        if delay > 0:
+            time.sleep(delay)
+        emit(mode, time.perf_counter_ns(), 375_000.0 + i * 1e-6)
+        i += 1
+        sent[0] = i
+
+
+class _Heartbeat(threading.Thread):
+    """
+    Sleeps 1 ms at a time and records how late it wakes up.
+    A Python thread can only wake up once it gets the GIL, so the lag bounds how long other threads hold it.
+    """
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.lag_ns: list[int] = []
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            start = time.perf_counter_ns()
+            time.sleep(0.001)
+            self.lag_ns.append(time.perf_counter_ns() - start - 1_000_000)
+
+    def stop(self) -> np.ndarray:
+        self._stop_event.set()
+        self.join()
+        return np.asarray(self.lag_ns, dtype=np.float64)
+
+
+def _rss_bytes() -> int:
+    """
+    Returns the resident set size of this process (Linux), or its peak RSS elsewhere.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def bench_acquisition_path(
+    path: str, rate: float = 500.0, duration: float = 2.0, consumers: Sequence = ()
+) -> dict:
+    """
+    Drives one scheduler at `rate` Hz for `duration` seconds while a consumer drains it every millisecond.
+
+    Args:
+        path (str): "callback" for EventDrivenScheduler (the event source thread enters the Python
+            handler, like the DLL's callback thread), "wait" for WaitEventScheduler, or "poll" for
+            IntervalScheduler polling get_frequency every 1/rate seconds.
+        rate (float): Event (or poll) rate in Hz.
+        duration (float): How long to drive the scheduler, in seconds.
+        consumers (Sequence): SampleConsumers attached to the scheduler during the run.
+
+    Returns:
+        dict: Throughput, drops, latency and heartbeat lag percentiles in microseconds,
+            RSS growth and CPU microseconds per event.
+    """
+    capacity = max(int(rate * duration * 2), 1024)
+    sent = [0]
+    source = None
+    timebase = "device"
+    if path == "callback":
+        scheduler = EventDrivenScheduler(None, buffer=RingBuffer(capacity))  # type: ignore[arg-type]
+        source = threading.Thread(
+            target=_paced_source,
+            args=(scheduler.ring_callback_handler, rate, duration, sent),
+        )
+        clock = time.perf_counter_ns
+    elif path == "wait":
+        device = _SyntheticWaitDevice()
+        scheduler = WaitEventScheduler(device, buffer=RingBuffer(capacity))  # type: ignore[arg-type]
+        source = threading.Thread(
+            target=_paced_source, args=(device.push, rate, duration, sent)
+        )
+        clock = time.perf_counter_ns
+    elif path == "poll":
+        device = _SyntheticPollDevice()
+        scheduler = IntervalScheduler(device, interval=1 / rate)  # type: ignore[arg-type]
+        timebase = "host"  # poll samples are stamped with time.monotonic_ns
+        clock = time.monotonic_ns
+    else:
+        raise ValueError(f"Unknown acquisition path: {path}")
+
+    for consumer in consumers:
+        scheduler.add_consumer(consumer)
+    heartbeat = _Heartbeat()
+    latencies = []
+    received = 0
+    rss_start = _rss_bytes()
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    heartbeat.start()
+    if path != "callback":
+        scheduler.start()
+    if source is not None:
+        source.start()
+
+    # Consumer: drain every millisecond and timestamp the arrival of each block
+    end = start + duration
+    idle_after_end = 0
+    while (
+        idle_after_end < 100
+    ):  # stop 0.1 s after the source finished and the buffer ran dry
+        t, _ = scheduler.drain(timebase)
+        if len(t):
+            latencies.append(clock() - t)
+            received += len(t)
+        elif time.perf_counter() > end and (source is None or not source.is_alive()):
+            if path == "poll" and scheduler.is_running:
+                scheduler.stop()
+                sent[0] = device.polls
+            idle_after_end += 1
+        time.sleep(0.001)
+
+    elapsed = time.perf_counter() - start - 0.1
+    cpu = time.process_time() - cpu_start
+    lag_us = heartbeat.stop() / 1e3
+    rss_growth = _rss_bytes() - rss_start
+    if path == "wait":
+        scheduler.stop()
+
+    latency_us = np.concatenate(latencies) / 1e3 if latencies else np.zeros(1)
+    return {
+        "path": path,
+        "rate_hz": rate,
+        "duration_s": duration,
+        "events_sent": sent[0],
+        "events_received": received,
+        "dropped": sent[0] - received,
+        "throughput_per_sec": received / elapsed,
+        "latency_p50_us": float(np.percentile(latency_us, 50)),
+        "latency_p99_us": float(np.percentile(latency_us, 99)),
+        "latency_p999_us": float(np.percentile(latency_us, 99.9)),
+        "latency_max_us": float(latency_us.max()),
+        "heartbeat_lag_p99_us": (
+            float(np.percentile(lag_us, 99)) if len(lag_us) else 0.0
+        ),
+        "heartbeat_lag_max_us": float(lag_us.max()) if len(lag_us) else 0.0,
+        "rss_growth_kib": rss_growth / 1024,
+        "cpu_us_per_event": cpu / max(received, 1) * 1e6,
+    }
+
+
+def bench_rate_sweep(
+    paths=ACQUISITION_PATHS, rates=DEFAULT_RATES, duration: float = 2.0
+) -> list[dict]:
+    """
+    Runs bench_acquisition_path for every path at every rate.
+    """
+    return [
+        bench_acquisition_path(path, rate, duration) for path in paths for rate in rates
+    ]
+
+
+def bench_error_handling(n_polls: int = 100_000, error_rate: float = 0.5) -> dict:
+    """
+    Compares the per-poll cost of handling signal errors by raising (get_frequency, caught and printed
+    like IntervalScheduler used to) with the no-raise path (get_frequency_raw, error codes kept and
+    classified in bulk afterwards), polling the simulated library.
+
+    Args:
+        n_polls (int): Polls per variant.
+        error_rate (float): Fraction of polls that return a signal error.
+
+    Returns:
+        dict: Microseconds per poll of both variants.
+    """
+    wavemeter = WavemeterWS7(wlmData.SIMULATED)
+    wavemeter._api.configure(error_rate=error_rate)
+
+    with open(os.devnull, "w") as devnull:
+        start = time.perf_counter()
+        for _ in range(n_polls):
+            try:
+                wavemeter.get_frequency()
+            except Exception as e:
+                print(f"Error getting frequency: {e}", file=devnull)
+        raising = time.perf_counter() - start
+
+    start = time.perf_counter()
+    values = np.empty(n_polls)
+    for i in range(n_polls):
+        values[i] = wavemeter.get_frequency_raw()
+    counts = count_errors(status_codes(values))
+    raw = time.perf_counter() - start
+    return {
+        "error_rate": error_rate,
+        "raising_us_per_poll": raising / n_polls * 1e6,
+        "raw_us_per_poll": raw / n_polls * 1e6,
+        "error_fraction": counts.error_fraction,
+    }
+
+
+def bench_recording_throughput(n_samples: int = 5_000_000, batch: int = 1000) -> dict:
+    """
+    Feeds a RecordingWriter batches as fast as possible and measures the sustained rate to disk,
+    including the final fsync.
+
+    Args:
+        n_samples (int): The number of samples written.
+        batch (int): Samples per update_many call.
+
+    Returns:
+        dict: Samples and megabytes per second, and the samples dropped on the way.
+    """
+    t = np.arange(batch, dtype=np.int64)
+    values = np.full(batch, 375.0)
+    with tempfile.TemporaryDirectory() as directory:
+        # Let everything queue up: the time until close() returns is then the time to write it all
+        writer = RecordingWriter(
+            os.path.join(directory, "bench.wlmrec"), max_pending=n_samples
+        )
+        start = time.perf_counter()
+        for _ in range(n_samples // batch):
+            writer.update_many(t, values)
+        writer.close()
+        elapsed = time.perf_counter() - start
+    stats = writer.stats
+    return {
+        "samples": n_samples,
+        "samples_per_sec": stats.written / elapsed,
+        "mb_per_sec": stats.bytes_written / elapsed / 1e6,
+        "dropped": stats.dropped,
+    }
+
+
+def bench_recording_slowdown(
+    path: str = "callback", rate: float = 5_000.0, duration: float = 2.0
+) -> dict:
+    """
+    Runs bench_acquisition_path with and without a RecordingWriter attached, to show how much the
+    write load costs the acquisition thread.
+
+    Returns:
+        dict: The acquisition CPU per event, latency p99 and heartbeat lag p99 of both runs.
+    """
+    baseline = bench_acquisition_path(path, rate, duration)
+    with tempfile.TemporaryDirectory() as directory:
+        writer = RecordingWriter(os.path.join(directory, "bench.wlmrec"))
+        recorded = bench_acquisition_path(path, rate, duration, consumers=[writer])
+        writer.close()
+    result = {"path": path, "rate_hz": rate, "written": writer.stats.written}
+    for key in ("cpu_us_per_event", "latency_p99_us", "heartbeat_lag_p99_us"):
+        result[f"{key}_without"] = baseline[key]
+        result[f"{key}_with"] = recorded[key]
+    return result
+
+
+def bench_step_overhead(path: str = "callback", n_steps: int = 1000) -> dict:
+    """
+    Measures the time of one start() + stop() pair, as a scan does at every step, against the simulated
+    library. The "per_step" variant starts and stops a fresh run each time (a new thread for the polling
+    scheduler, a new DLL callback registration for the callback scheduler); the "persistent" variant
+    opens the scheduler once and only arms and disarms it.
+
+    Args:
+        path (str): "callback" (EventDrivenScheduler) or "poll" (IntervalScheduler).
+        n_steps (int): The number of start/stop pairs per variant.
+
+    Returns:
+        dict: Median and 99th percentile microseconds per start/stop pair of both variants.
+    """
+    wavemeter = WavemeterWS7(wlmData.SIMULATED)
+    result: dict = {"path": path, "steps": n_steps}
+    for variant in ("per_step", "persistent"):
+        if path == "callback":
+            scheduler = EventDrivenScheduler(wavemeter, buffer=RingBuffer())
+        else:
+            scheduler = IntervalScheduler(wavemeter, interval=0.001, threaded=True)
+        if variant == "persistent":
+            scheduler.open()
+        step_ns = np.empty(n_steps)
+        for i in range(n_steps):
+            start = time.perf_counter_ns()
+            scheduler.start()
+            scheduler.stop()
+            step_ns[i] = time.perf_counter_ns() - start
+        scheduler.close()
+        result[f"{variant}_p50_us"] = float(np.percentile(step_ns, 50) / 1e3)
+        result[f"{variant}_p99_us"] = float(np.percentile(step_ns, 99) / 1e3)
+    return result
+
+
+def bench_state_snapshot(read_delay: float = 0.002, runs: int = 50) -> dict:
+    """
+    Measures the time to collect every STATE_PARAMETERS value against the simulated library, with each
+    getter taking read_delay seconds: read serially, read concurrently (snapshot_state) and taken from
+    the callback event cache where the events provide them (track_state).
+
+    Returns:
+        dict: Median milliseconds per snapshot of each variant.
+    """
+    wavemeter = WavemeterWS7(wlmData.SIMULATED)
+    wavemeter._api.configure(read_delay=read_delay)
+    readers = [_STATE_READERS[p](1) for p in STATE_PARAMETERS]
+
+    def timed(snapshot) -> float:
+        ms = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            snapshot()
+            ms.append((time.perf_counter() - start) * 1e3)
+        return float(np.median(ms))
+
+    serial = timed(lambda: [wavemeter._call(*reader) for reader in readers])
+    concurrent = timed(wavemeter.snapshot_state)
+    wavemeter.track_state()
+    # Report temperature, pressure and exposure once, as the DLL does when they change
+    wavemeter._api.configure(temperature=24.0, pressure=1013.25, exposure=10)
+    time.sleep(0.05)
+    cached = timed(lambda: wavemeter.snapshot_state(max_age=60.0))
+    wavemeter.untrack_state()
+    return {
+        "read_delay_ms": read_delay * 1e3,
+        "serial_ms": serial,
+        "concurrent_ms": concurrent,
+        "cached_ms": cached,
+    }
+
+
+def bench_stability(n_samples: int = 2_000_000, rate: float = 1000.0) -> dict:
+    """
+    Measures the analysis time of n_samples of white frequency noise on a random walk, sampled at rate:
+    the overlapping Allan deviation at every octave, the Welch PSD and a StreamingAllan fed in batches
+    of 1000.
+
+    Returns:
+        dict: Seconds per analysis and the recommended averaging time.
+    """
+    rng = np.random.default_rng(0)
+    t = (np.arange(n_samples) * (1e9 / rate)).astype(np.int64)
+    value = 375_000.0 + 1e-6 * rng.standard_normal(n_samples)
+    value += np.cumsum(1e-8 * rng.standard_normal(n_samples))
+
+    start = time.perf_counter()
+    allan = overlapping_adev(value, 1 / rate)
+    adev_s = time.perf_counter() - start
+    start = time.perf_counter()
+    welch_psd(value, rate)
+    psd_s = time.perf_counter() - start
+    streaming = StreamingAllan(1 / rate)
+    start = time.perf_counter()
+    for i in range(0, n_samples, 1000):
+        streaming.update_many(t[i : i + 1000], value[i : i + 1000])
+    streaming.result()
+    streaming_s = time.perf_counter() - start
+    return {
+        "samples": n_samples,
+        "taus": len(allan),
+        "adev_s": adev_s,
+        "psd_s": psd_s,
+        "streaming_s": streaming_s,
+        "best_tau_s": allan.best_tau,
+    }
+
+
+# Runs in a fresh interpreter; prints the time.monotonic_ns() of each startup stage as JSON
+_STARTUP_SCRIPT = """
+import json, sys, time
+stages = {"interpreter": time.monotonic_ns()}
+from wavemeter import WavemeterWS7
+from scheduler import EventDrivenScheduler
+stages["imports"] = time.monotonic_ns()
+wavemeter = WavemeterWS7(sys.argv[1])
+stages["load_dll"] = time.monotonic_ns()
+scheduler = EventDrivenScheduler(wavemeter)
+scheduler.start()
+stages["register"] = time.monotonic_ns()
+scheduler.data.get()
+stages["first_sample"] = time.monotonic_ns()
+scheduler.stop()
+print(json.dumps(stages))
+"""
+
+
+def bench_startup(dll_path: str = wlmData.SIMULATED, runs: int = 5) -> dict:
+    """
+    Measures the time to first sample of a newly started acquisition process.
+
+    Args:
+        dll_path (str): Path of the wlmData library, or wlmData.SIMULATED.
+        runs (int): The number of processes to start; the median of each stage is reported.
+
+    Returns:
+        dict: Median milliseconds from process start to the end of each stage.
+    """
+    stage_ms: dict[str, list[float]] = {}
+    for _ in range(runs):
+        spawned = time.monotonic_ns()
+        out = subprocess.run(
+            [sys.executable, "-c", _STARTUP_SCRIPT, dll_path],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        for stage, t in json.loads(out).items():
+            stage_ms.setdefault(stage, []).append((t - spawned) / 1e6)
+    return {
+        "dll": dll_path,
+        "runs": runs,
+        **{f"{stage}_ms": float(np.median(ms)) for stage, ms in stage_ms.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--events", type=int, default=200_000)
+    parser.add_argument(
+        "--rates",
+        default=",".join(str(r) for r in DEFAULT_RATES),
+        help="comma separated event rates of the sweep, in Hz",
+    )
+    parser.add_argument(
+        "--duration", type=float, default=2.0, help="seconds per path and rate"
+    )
+    parser.add_argument(
+        "--paths",
+        default=",".join(ACQUISITION_PATHS),
+        help="comma separated acquisition paths of the sweep",
+    )
+    parser.add_argument(
+        "--dll",
+        default=wlmData.SIMULATED,
+        help="wlmData library used by the startup benchmark",
+    )
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    results = [
+        bench_buffer_backend(use_ring=False, n_events=args.events),
+        bench_buffer_backend(use_ring=True, n_events=args.events),
+    ]
+    sweep = bench_rate_sweep(
+        args.paths.split(","),
+        [float(r) for r in args.rates.split(",")],
+        args.duration,
+    )
+    startup = bench_startup(args.dll)
+    errors = bench_error_handling()
+    recording = bench_recording_throughput()
+    slowdown = bench_recording_slowdown(duration=args.duration)
+    steps = [bench_step_overhead(path) for path in ("callback", "poll")]
+    state = bench_state_snapshot()
+    stability = bench_stability()
+
+    if args.json:
+        print(
+            json.dumps(
+                {
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                    "buffers": results,
+                    "sweep": sweep,
+                    "startup": startup,
+                    "error_handling": errors,
+                    "recording": recording,
+                    "recording_slowdown": slowdown,
+                    "step_overhead": steps,
+                    "state_snapshot": state,
+                    "stability": stability,
+                },
+                indent=2,
+            )
+        )
+        return
+    for r in results:
+        print(
+            f"{r['backend']:>6}: {r['events_per_sec']:>12,.0f} events/s  "
+            f"{r['bytes_per_sample']:>8.1f} bytes/sample"
+        )
+    for r in sweep:
+        print(
+            f"{r['path']:>8} @ {r['rate_hz']:>6.0f} Hz: "
+            f"{r['throughput_per_sec']:>8,.0f}/s  dropped {r['dropped']:>6}  "
+            f"latency p50 {r['latency_p50_us']:8.1f} p99 {r['latency_p99_us']:8.1f} us  "
+            f"heartbeat lag p99 {r['heartbeat_lag_p99_us']:7.1f} us  "
+            f"RSS +{r['rss_growth_kib']:7.0f} KiB  CPU {r['cpu_us_per_event']:6.1f} us/event"
+        )
+    print(
+        f"startup ({startup['dll']}): "
+        + "  ".join(
+            f"{stage[:-3]} {ms:.1f} ms"
+            for stage, ms in startup.items()
+            if stage.endswith("_ms")
+        )
+    )
+    print(
+        f"signal errors ({errors['error_rate']:.0%} of polls): raising "
+        f"{errors['raising_us_per_poll']:.2f} us/poll, raw {errors['raw_us_per_poll']:.2f} us/poll"
+    )
+    print(
+        f"recording: {recording['mb_per_sec']:.0f} MB/s "
+        f"({recording['samples_per_sec']:,.0f} samples/s of {RECORD_DTYPE.itemsize} bytes)"
+    )
+    print(
+        f"recording slowdown ({slowdown['path']} @ {slowdown['rate_hz']:.0f} Hz): "
+        + "  ".join(
+            f"{key} {slowdown[key + '_without']:.1f} -> {slowdown[key + '_with']:.1f}"
+            for key in ("cpu_us_per_event", "latency_p99_us", "heartbeat_lag_p99_us")
+        )
+    )
+    print(
+        f"instrument state ({state['read_delay_ms']:.1f} ms per read): serial {state['serial_ms']:.1f} ms, "
+        f"concurrent {state['concurrent_ms']:.1f} ms, cached events {state['cached_ms']:.1f} ms"
+    )
+    for r in steps:
+        print(
+            f"start/stop per step ({r['path']}): "
+            f"new run p50 {r['per_step_p50_us']:.1f} p99 {r['per_step_p99_us']:.1f} us, "
+            f"persistent p50 {r['persistent_p50_us']:.1f} p99 {r['persistent_p99_us']:.1f} us"
+        )
+    print(
+        f"stability ({stability['samples']:,} samples): Allan deviation at {stability['taus']} taus "
+        f"{stability['adev_s']:.2f} s, Welch PSD {stability['psd_s']:.2f} s, "
+        f"streaming {stability['streaming_s']:.2f} s, best tau {stability['best_tau_s']:.3f} s"
+    )
+
+
+if __name__ == "__main__":
+    main()
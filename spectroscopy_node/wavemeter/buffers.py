@@ -0,0 +1,682 @@
+import queue, tempfile, threading, time
+from dataclasses import dataclass
+from typing import Optional, Union
+
+import numpy as np
+
+from samples import SamplePoint
+
+# Default ring capacity: ten minutes at the WS7's WLM_MAX_MEASUREMENT_RATE (500 Hz)
+DEFAULT_RING_CAPACITY = 300_000
+
+# How long RingQueueAdapter.get sleeps between checks while waiting for a sample
+_GET_POLL_INTERVAL = 0.001
+
+# How long a producer using the "block" policy sleeps between checks for free space
+_BLOCK_POLL_INTERVAL = 0.0001
+
+# What a RingBuffer does with a new sample when it is full (see RingBuffer)
+BUFFER_POLICIES = ("drop_oldest", "drop_newest", "block", "decimate", "spill")
+
+# Row layout of the samples a "spill" RingBuffer writes to disk (packed, 26 bytes per sample)
+_SPILL_DTYPE = np.dtype(
+    [
+        ("t", "<i8"),
+        ("host_t", "<i8"),
+        ("value", "<f8"),
+        ("source", "u1"),
+        ("channel", "u1"),
+    ]
+)
+
+
+@dataclass(frozen=True, slots=True)
+class BufferStats:
+    """
+    Fill level and loss counters of a RingBuffer.
+    """
+
+    capacity: int
+    policy: str
+    size: int  # Unread samples, including spilled ones
+    high_water: int  # Largest number of unread samples held in memory so far
+    overruns: int  # Samples overwritten before being read ("drop_oldest")
+    dropped: int  # Samples rejected because the buffer was full
+    decimated: int  # Samples skipped by the "decimate" policy
+    spilled: int  # Samples written to the spill file ("spill")
+
+
+class RingBuffer:
+    """
+    A preallocated, fixed-capacity sample buffer stored as a struct of NumPy arrays.
+
+    Each sample occupies one slot in every column:
+        - t (int64): timestamp of the sample
+        - host_t (int64): host time of the sample (time.monotonic_ns)
+        - value (float64): frequency value of the sample
+        - source (uint8): interned code of the SamplePoint source string
+        - channel (uint8): wavemeter/switcher channel of the sample
+
+    The buffer is single-producer/single-consumer: exactly one thread (e.g. the DLL callback thread)
+    may write to it and exactly one thread may read from it. Neither side takes a lock:
+        - the producer fills a slot and only then advances the write index
+        - the consumer only reads slots below the write index it observed
+
+    The policy decides what happens to new samples when the consumer falls behind:
+        - "drop_oldest": the producer laps the consumer, the oldest samples are overwritten
+          and counted in `overruns`
+        - "drop_newest": new samples are rejected and counted in `dropped`
+        - "block": the producer waits for free space (up to block_timeout, then drops).
+          Only for producers that own their thread, never for the DLL's callback thread.
+        - "decimate": above high_water_fraction of the capacity only every decimate_by-th sample is
+          kept (the others are counted in `decimated`), and new samples are dropped when full
+        - "spill": new samples go to a temporary file until the consumer has read everything in memory;
+          reads return them in order. The spill file is guarded by a lock that only the producer
+          and the consumer's reads take, and only while spilling.
+    Under every policy, a producer's append costs one comparison until the buffer fills up.
+    """
+
+    def __init__(
+        self,
+        capacity: int = DEFAULT_RING_CAPACITY,
+        policy: str = "drop_oldest",
+        decimate_by: int = 4,
+        high_water_fraction: float = 0.75,
+        block_timeout: Optional[float] = None,
+    ):
+        """
+        Args:
+            capacity (int): The number of samples the buffer can hold in memory.
+            policy (str): One of BUFFER_POLICIES, what to do with new samples when the buffer is full.
+            decimate_by (int): Keep every decimate_by-th sample above the high water mark ("decimate").
+            high_water_fraction (float): Fill level at which "decimate" starts decimating.
+            block_timeout (float, optional): How long "block" waits for free space before dropping the
+                sample. Defaults to None, which waits indefinitely.
+        """
+        if capacity <= 0:
+            raise ValueError("RingBuffer capacity must be positive.")
+        if policy not in BUFFER_POLICIES:
+            raise ValueError(f"Unknown buffer policy: {policy}")
+        if decimate_by < 1:
+            raise ValueError("decimate_by must be at least 1.")
+
+        self._capacity = capacity
+        self._t = np.zeros(capacity, dtype=np.int64)
+        self._host_t = np.zeros(capacity, dtype=np.int64)
+        self._value = np.zeros(capacity, dtype=np.float64)
+        self._source = np.zeros(capacity, dtype=np.uint8)
+        self._channel = np.zeros(capacity, dtype=np.uint8)
+
+        # Monotonic sample counters, the slot of a sample is its counter modulo the capacity
+        self._write = 0  # only advanced by the producer
+        # Counter one past the last slot the producer has started writing (ahead of _write mid-write)
+        self._writing = 0
+        self._read = 0  # only advanced by the consumer
+        self._overruns = 0  # samples overwritten before the consumer read them
+
+        # Interned source strings, the source column stores the index into _sources
+        self._sources: list[str] = []
+        self._source_codes: dict[str, int] = {}
+
+        # Backpressure: appends check the fill level against _limit and apply the policy at or above it
+        self._policy = policy
+        self._decimate_by = decimate_by
+        self._block_timeout = block_timeout
+        if policy == "drop_oldest":
+            self._limit = float("inf")
+        elif policy == "decimate":
+            self._limit = max(int(capacity * high_water_fraction), 1)
+        else:
+            self._limit = capacity
+        self._high_water = 0
+        self._dropped = 0
+        self._decimated = 0
+        self._decimate_phase = 0
+
+        # "spill": producer-side spill file, and spilled rows already taken by the consumer
+        self._spill_lock = threading.Lock()
+        self._spill_file = None
+        self._spilling = False
+        self._spill_size = 0  # rows in the spill file
+        self._spilled = 0
+        self._unspilled = np.zeros(0, dtype=_SPILL_DTYPE)
+        self._unspilled_pos = 0
+
+    # public API
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @property
+    def overruns(self) -> int:
+        # Returns the number of samples that were overwritten before being read.
+        return self._overruns
+
+    @property
+    def policy(self) -> str:
+        return self._policy
+
+    @property
+    def dropped(self) -> int:
+        # Returns the number of samples rejected because the buffer was full.
+        return self._dropped
+
+    @property
+    def high_water(self) -> int:
+        # Returns the largest number of unread samples held in memory so far.
+        return self._high_water
+
+    @property
+    def stats(self) -> BufferStats:
+        return BufferStats(
+            capacity=self._capacity,
+            policy=self._policy,
+            size=len(self),
+            high_water=self._high_water,
+            overruns=self._overruns,
+            dropped=self._dropped,
+            decimated=self._decimated,
+            spilled=self._spilled,
+        )
+
+    def full(self) -> bool:
+        # Returns whether new samples are currently subject to the policy (never for "drop_oldest").
+        return self._spilling or self._write - self._read >= self._limit
+
+    @property
+    def nbytes(self) -> int:
+        # Returns the number of bytes used by the sample columns.
+        return (
+            self._t.nbytes
+            + self._host_t.nbytes
+            + self._value.nbytes
+            + self._source.nbytes
+            + self._channel.nbytes
+        )
+
+    @property
+    def bytes_per_sample(self) -> int:
+        return self.nbytes // self._capacity
+
+    def __len__(self) -> int:
+        # Returns the number of unread samples (in memory capped at the capacity, plus any spilled ones).
+        in_memory = min(self._write - self._read, self._capacity)
+        return in_memory + self._spill_size + len(self._unspilled) - self._unspilled_pos
+
+    def source_code(self, source: str) -> int:
+        """
+        Returns the uint8 code for a source string, interning it on first use.
+        """
+        code = self._source_codes.get(source)
+        if code is None:
+            if len(self._sources) > np.iinfo(np.uint8).max:
+                raise ValueError("RingBuffer supports at most 256 distinct sources.")
+            code = len(self._sources)
+            self._sources.append(source)
+            self._source_codes[source] = code
+        return code
+
+    def source_name(self, code: int) -> str:
+        return self._sources[code]
+
+    # producer side
+    def append(
+        self, t: int, value: float, source: str, channel: int = 0, host_t: int = 0
+    ) -> None:
+        """
+        Writes one sample into the next slot. Called only from the producer thread.
+        """
+        code = self.source_code(source)
+        if self._spilling or self._write - self._read >= self._limit:
+            if not self._make_room(t, value, code, channel, host_t):
+                return
+        i = self._write % self._capacity
+        self._writing = self._write + 1
+        self._t[i] = t
+        self._host_t[i] = host_t
+        self._value[i] = value
+        self._source[i] = code
+        self._channel[i] = channel
+        # Publish the slot only after every column has been written
+        self._write += 1
+        used = self._write - self._read
+        if used > self._high_water:
+            self._high_water = min(used, self._capacity)
+
+    def _make_room(
+        self, t: int, value: float, code: int, channel: int, host_t: int
+    ) -> bool:
+        """
+        Applies the policy to a sample arriving while the buffer is at its limit.
+        Returns whether the sample should be written to the ring.
+        """
+        policy = self._policy
+        if policy == "drop_newest":
+            self._dropped += 1
+            return False
+        if policy == "block":
+            deadline = (
+                None
+                if self._block_timeout is None
+                else time.monotonic() + self._block_timeout
+            )
+            while self._write - self._read >= self._capacity:
+                if deadline is not None and time.monotonic() >= deadline:
+                    self._dropped += 1
+                    return False
+                time.sleep(_BLOCK_POLL_INTERVAL)
+            return True
+        if policy == "decimate":
+            if self._write - self._read >= self._capacity:
+                self._dropped += 1
+                return False
+            self._decimate_phase += 1
+            if self._decimate_phase % self._decimate_by:
+                self._decimated += 1
+                return False
+            return True
+        # spill
+        rows = np.zeros(1, dtype=_SPILL_DTYPE)
+        rows[0] = (t, host_t, value, code, channel)
+        return not self._spill(rows)
+
+    def _spill(self, rows: np.ndarray) -> bool:
+        """
+        Appends rows to the spill file. Returns False, without spilling, if the consumer emptied the
+        spill file and freed space in the ring in the meantime.
+        """
+        with self._spill_lock:
+            if not self._spilling:
+                if self._write - self._read + len(rows) <= self._capacity:
+                    return False
+                if self._spill_file is None:
+                    self._spill_file = tempfile.TemporaryFile(prefix="wavemeter_spill_")
+                self._spilling = True
+            self._spill_file.write(rows.tobytes())
+            self._spill_size += len(rows)
+            self._spilled += len(rows)
+            return True
+
+    def put(self, sample: SamplePoint) -> None:
+        """
+        Writes a SamplePoint into the buffer (same signature as queue.Queue.put).
+        """
+        self.append(sample.t, sample.value, sample.source, 0, sample.host_t)
+
+    def extend(
+        self,
+        t: np.ndarray,
+        value: np.ndarray,
+        source: Union[int, np.ndarray],
+        channel: Union[int, np.ndarray] = 0,
+        host_t: Union[int, np.ndarray] = 0,
+    ) -> None:
+        """
+        Writes a block of samples with one array copy per column. Called only from the producer thread.
+
+        Args:
+            t (np.ndarray): Timestamps of the samples.
+            value (np.ndarray): Values of the samples.
+            source (int | np.ndarray): Source code(s) from source_code(), one per block or one per sample.
+            channel (int | np.ndarray): Channel(s), one per block or one per sample.
+            host_t (int | np.ndarray): Host time(s), one per block or one per sample.
+        """
+        n = len(t)
+        if self._policy == "drop_oldest":
+            self._write_block(t, value, source, channel, host_t)
+            return
+
+        columns = [
+            np.broadcast_to(np.asarray(c), (n,))
+            for c in (t, value, source, channel, host_t)
+        ]
+        fits = 0
+        if not self._spilling:
+            fits = int(min(n, max(self._limit - (self._write - self._read), 0)))
+            if fits:
+                self._write_block(*(c[:fits] for c in columns))
+        if fits == n:
+            return
+        rest = [c[fits:] for c in columns]
+        if self._policy == "spill":
+            rows = np.zeros(n - fits, dtype=_SPILL_DTYPE)
+            for name, c in zip(("t", "value", "source", "channel", "host_t"), rest):
+                rows[name] = c
+            if self._spill(rows):
+                return
+            self._write_block(*rest)
+            return
+        # The policy decides sample by sample (this only runs while the buffer is at its limit)
+        for k in range(n - fits):
+            t_k, value_k, code_k, channel_k, host_t_k = (c[k] for c in rest)
+            if self._write - self._read >= self._limit and not self._make_room(
+                t_k, value_k, code_k, channel_k, host_t_k
+            ):
+                continue
+            self._write_block(*(c[k : k + 1] for c in rest))
+
+    def _write_block(self, t, value, source, channel, host_t) -> None:
+        n = len(t)
+        start = self._write
+        if n > self._capacity:
+            # Only the newest `capacity` samples can survive, skip the rest
+            skip = n - self._capacity
+            t, value = t[skip:], value[skip:]
+            if not np.isscalar(source):
+                source = source[skip:]
+            if not np.isscalar(channel):
+                channel = channel[skip:]
+            if not np.isscalar(host_t):
+                host_t = host_t[skip:]
+            start += skip
+            n = self._capacity
+
+        self._writing = start + n
+        i = start % self._capacity
+        first = min(
+            n, self._capacity - i
+        )  # samples that fit before the end of the arrays
+        for column, data in (
+            (self._t, t),
+            (self._host_t, host_t),
+            (self._value, value),
+            (self._source, source),
+            (self._channel, channel),
+        ):
+            if np.isscalar(data):
+                column[i : i + first] = data
+                column[: n - first] = data
+            else:
+                column[i : i + first] = data[:first]
+                column[: n - first] = data[first:]
+        # Publish the block only after every column has been written
+        self._write = start + n
+        used = self._write - self._read
+        if used > self._high_water:
+            self._high_water = min(used, self._capacity)
+
+    # consumer side
+    def _unread_range(self) -> tuple[int, int]:
+        """
+        Returns the [start, stop) counters of the samples that are still available to the consumer,
+        skipping (and counting) any samples the producer has already overwritten.
+        """
+        stop = self._write
+        writing = self._writing
+        start = self._read
+        # A slot the producer is writing right now counts as overwritten too
+        if writing - start > self._capacity:
+            lapped = min(writing - self._capacity, stop)
+            self._overruns += lapped - start
+            start = lapped
+        return start, stop
+
+    def pop(self) -> Optional[SamplePoint]:
+        """
+        Removes and returns the oldest unread sample as a SamplePoint, or None if the buffer is empty.
+        """
+        if self._unspilled_pos < len(self._unspilled):
+            row = self._unspilled[self._unspilled_pos]
+            self._unspilled_pos += 1
+            return SamplePoint(
+                int(row["t"]),
+                float(row["value"]),
+                self._sources[row["source"]],
+                int(row["host_t"]),
+            )
+
+        start, stop = self._unread_range()
+        if start == stop:
+            self._read = start
+            if self._spilling and self._take_spill(stop):
+                return self.pop()
+            return None
+
+        i = start % self._capacity
+        sample = SamplePoint(
+            int(self._t[i]),
+            float(self._value[i]),
+            self._sources[self._source[i]],
+            int(self._host_t[i]),
+        )
+        # If the producer lapped us while we were copying, the slot was (being) overwritten; retry
+        if self._writing - start > self._capacity:
+            self._read = start
+            return self.pop()
+
+        self._read = start + 1
+        return sample
+
+    def _copy_columns(self, start: int, stop: int, *columns: np.ndarray) -> list:
+        """
+        Copies the samples with counters [start, stop) out of each column, handling the wrap-around.
+        """
+        i, j = start % self._capacity, stop % self._capacity
+        if stop - start == 0:
+            return [column[:0].copy() for column in columns]
+        if i < j:
+            return [column[i:j].copy() for column in columns]
+        # The range wraps past the end of the arrays
+        return [np.concatenate((column[i:], column[:j])) for column in columns]
+
+    def _copy_unread(self, timebase: str) -> tuple[int, np.ndarray, np.ndarray]:
+        """
+        Copies the unread timestamp and value columns without consuming them.
+        Returns the counter one past the last copied sample along with the copies.
+        """
+        start, stop = self._unread_range()
+        t, value = self._copy_columns(
+            start, stop, self._time_column(timebase), self._value
+        )
+
+        # Drop anything the producer overwrote while we were copying
+        lapped = min(self._writing - start - self._capacity, stop - start)
+        if lapped > 0:
+            self._overruns += lapped
+            t, value = t[lapped:], value[lapped:]
+        return stop, t, value
+
+    def _take_spill(self, stop: int) -> bool:
+        """
+        Moves the spilled rows to the consumer side once every sample the ring held before spilling
+        started (counters below stop) has been read, so that samples are returned in order.
+        Returns whether any rows were moved.
+        """
+        with self._spill_lock:
+            if not self._spilling or self._write != stop:
+                return False
+            f = self._spill_file
+            f.flush()
+            f.seek(0)
+            rows = np.frombuffer(f.read(), dtype=_SPILL_DTYPE)
+            f.seek(0)
+            f.truncate()
+            self._unspilled = np.concatenate(
+                (self._unspilled[self._unspilled_pos :], rows)
+            )
+            self._unspilled_pos = 0
+            self._spill_size = 0
+            # From here on the producer writes to the ring again
+            self._spilling = False
+        return len(rows) > 0
+
+    def _take_unspilled(self, timebase: str) -> tuple[np.ndarray, np.ndarray]:
+        rows = self._unspilled[self._unspilled_pos :]
+        self._unspilled = self._unspilled[:0]
+        self._unspilled_pos = 0
+        return rows[self._spill_time_field(timebase)].copy(), rows["value"].copy()
+
+    def _read_spill_file(self) -> np.ndarray:
+        # Returns the rows of the spill file without removing them
+        with self._spill_lock:
+            if self._spill_file is None or not self._spill_size:
+                return np.zeros(0, dtype=_SPILL_DTYPE)
+            f = self._spill_file
+            f.flush()
+            f.seek(0)
+            rows = np.frombuffer(f.read(), dtype=_SPILL_DTYPE)
+            f.seek(0, 2)
+            return rows
+
+    @staticmethod
+    def _spill_time_field(timebase: str) -> str:
+        if timebase == "device":
+            return "t"
+        if timebase == "host":
+            return "host_t"
+        raise ValueError(f"Unknown timebase: {timebase}")
+
+    def _time_column(self, timebase: str) -> np.ndarray:
+        if timebase == "device":
+            return self._t
+        if timebase == "host":
+            return self._host_t
+        raise ValueError(f"Unknown timebase: {timebase}")
+
+    def drain(self, timebase: str = "device") -> tuple[np.ndarray, np.ndarray]:
+        """
+        Removes every unread sample and returns them as (t, value) arrays in one call.
+
+        Args:
+            timebase (str): "device" returns the sample timestamps t, "host" the host times host_t.
+        """
+        if self._policy != "spill":
+            stop, t, value = self._copy_unread(timebase)
+            self._read = stop
+            return t, value
+
+        # Spilled rows taken earlier are older than the ring, rows still in the spill file newer
+        parts = [self._take_unspilled(timebase)]
+        stop, t, value = self._copy_unread(timebase)
+        self._read = stop
+        parts.append((t, value))
+        if self._spilling and self._take_spill(stop):
+            parts.append(self._take_unspilled(timebase))
+        return (
+            np.concatenate([p[0] for p in parts]),
+            np.concatenate([p[1] for p in parts]),
+        )
+
+    def snapshot(
+        self, since: Optional[int] = None, timebase: str = "device"
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the unread samples as (t, value) arrays without removing them.
+
+        Args:
+            since (int, optional): Only return samples with a timestamp >= since.
+            timebase (str): "device" filters and returns t, "host" filters and returns host_t.
+        """
+        _, t, value = self._copy_unread(timebase)
+        if self._policy == "spill":
+            field = self._spill_time_field(timebase)
+            before = self._unspilled[self._unspilled_pos :]
+            after = self._read_spill_file()
+            t = np.concatenate((before[field], t, after[field]))
+            value = np.concatenate((before["value"], value, after["value"]))
+        if since is not None:
+            keep = t >= since
+            t, value = t[keep], value[keep]
+        return t, value
+
+
+def _as_arrays(
+    samples: list[SamplePoint], timebase: str = "device"
+) -> tuple[np.ndarray, np.ndarray]:
+    if timebase not in ("device", "host"):
+        raise ValueError(f"Unknown timebase: {timebase}")
+    times = (
+        (s.t for s in samples) if timebase == "device" else (s.host_t for s in samples)
+    )
+    t = np.fromiter(times, dtype=np.int64, count=len(samples))
+    value = np.fromiter(
+        (s.value for s in samples), dtype=np.float64, count=len(samples)
+    )
+    return t, value
+
+
+def drain_queue(
+    q: queue.Queue, timebase: str = "device"
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Removes every SamplePoint currently in a queue.Queue and returns them as (t, value) arrays.
+    """
+    # Swap the queue's contents out under its own lock instead of calling get() per sample
+    with q.mutex:
+        samples = list(q.queue)
+        q.queue.clear()
+        q.not_full.notify_all()
+    return _as_arrays(samples, timebase)
+
+
+def snapshot_queue(
+    q: queue.Queue, since: Optional[int] = None, timebase: str = "device"
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Returns the SamplePoints currently in a queue.Queue as (t, value) arrays without removing them.
+
+    Args:
+        since (int, optional): Only return samples with a timestamp >= since.
+        timebase (str): "device" filters and returns t, "host" filters and returns host_t.
+    """
+    with q.mutex:
+        samples = list(q.queue)
+    t, value = _as_arrays(samples, timebase)
+    if since is not None:
+        keep = t >= since
+        t, value = t[keep], value[keep]
+    return t, value
+
+
+class RingQueueAdapter:
+    """
+    A queue.Queue compatible view of a RingBuffer.
+
+    Lets existing consumers of `BaseScheduler.data` (get/get_nowait/empty/qsize) keep working
+    when the scheduler stores its samples in a RingBuffer.
+    """
+
+    def __init__(self, ring: RingBuffer):
+        self._ring = ring
+
+    def put(
+        self, item: SamplePoint, block: bool = True, timeout: Optional[float] = None
+    ) -> None:
+        # The ring's policy decides what happens when it is full, block and timeout are accepted for compatibility only
+        self._ring.put(item)
+
+    def put_nowait(self, item: SamplePoint) -> None:
+        self._ring.put(item)
+
+    def get(self, block: bool = True, timeout: Optional[float] = None) -> SamplePoint:
+        """
+        Removes and returns the oldest sample. Raises queue.Empty like queue.Queue.get.
+        """
+        sample = self._ring.pop()
+        if sample is not None:
+            return sample
+        if not block:
+            raise queue.Empty
+
+        # The producer does not signal the consumer (it must never take a lock), so wait by polling
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            time.sleep(_GET_POLL_INTERVAL)
+            sample = self._ring.pop()
+            if sample is not None:
+                return sample
+            if deadline is not None and time.monotonic() >= deadline:
+                raise queue.Empty
+
+    def get_nowait(self) -> SamplePoint:
+        return self.get(block=False)
+
+    def qsize(self) -> int:
+        return len(self._ring)
+
+    def empty(self) -> bool:
+        return len(self._ring) == 0
+
+    def full(self) -> bool:
+        # A "drop_oldest" ring overwrites its oldest samples instead of ever being full
+        return self._ring.full()
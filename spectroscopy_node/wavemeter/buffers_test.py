@@ -0,0 +1,225 @@
+import queue, threading, time
+import pytest
+import numpy as np
+
+import wlmConst
+from buffers import RingBuffer, RingQueueAdapter
+from samples import SamplePoint
+from scheduler import EventDrivenScheduler
+
+
+# TESTING RingBuffer IN ISOLATION:
+class TestRingBuffer:
+    def test_put_then_pop_returns_samples_in_order(self):
+        ring = RingBuffer(8)
+        ring.put(SamplePoint(1, 10.0, "a"))
+        ring.append(2, 20.0, "b")
+
+        assert ring.pop() == SamplePoint(1, 10.0, "a")
+        assert ring.pop() == SamplePoint(2, 20.0, "b")
+        assert ring.pop() is None
+
+    def test_overwrites_oldest_and_counts_overruns(self):
+        ring = RingBuffer(4)
+        for i in range(6):
+            ring.append(i, float(i), "a")
+
+        assert len(ring) == 4
+        assert ring.pop().t == 2
+        assert ring.overruns == 2
+
+    def test_lapped_reader_never_sees_overwritten_slots(self):
+        ring = RingBuffer(8)
+        n = 200_000
+        done = threading.Event()
+
+        def produce():
+            for i in range(n):
+                ring.append(i, float(i), "a")
+            done.set()
+
+        received = []
+        producer = threading.Thread(target=produce)
+        producer.start()
+        while not done.is_set():
+            sample = ring.pop()
+            if sample is not None:
+                received.append((sample.t, sample.value))
+            t, value = ring.drain()
+            received.extend(zip(t.tolist(), value.tolist()))
+        producer.join()
+        t, value = ring.drain()
+        received.extend(zip(t.tolist(), value.tolist()))
+
+        t, value = np.array(received).T
+        assert (t == value).all()  # no slot was read while being overwritten
+        assert (np.diff(t) > 0).all()
+        assert ring.overruns > 0  # the reader was lapped
+        assert len(received) + ring.overruns == n
+
+    def test_bytes_per_sample(self):
+        # int64 t + int64 host_t + float64 value + uint8 source + uint8 channel
+        assert RingBuffer(16).bytes_per_sample == 26
+
+    def test_rejects_non_positive_capacity(self):
+        with pytest.raises(ValueError):
+            RingBuffer(0)
+
+
+# TESTING RingBuffer backpressure policies:
+class TestBufferPolicies:
+    def fill(self, ring, n, start=0):
+        for i in range(start, start + n):
+            ring.append(i, float(i), "a")
+
+    def test_drop_newest_keeps_the_first_samples(self):
+        ring = RingBuffer(4, "drop_newest")
+        self.fill(ring, 6)
+        t, _ = ring.drain()
+        assert t.tolist() == [0, 1, 2, 3]
+        assert ring.stats.dropped == 2
+        assert ring.stats.high_water == 4
+        assert ring.overruns == 0
+
+    def test_drop_newest_extend(self):
+        ring = RingBuffer(4, "drop_newest")
+        ring.extend(np.arange(6), np.arange(6.0), ring.source_code("a"))
+        assert ring.drain()[0].tolist() == [0, 1, 2, 3]
+        assert ring.dropped == 2
+
+    def test_decimate_thins_samples_above_high_water(self):
+        ring = RingBuffer(8, "decimate", decimate_by=2, high_water_fraction=0.5)
+        self.fill(ring, 10)
+        # 4 samples below the high water mark, then every 2nd one until full
+        assert ring.drain()[0].tolist() == [0, 1, 2, 3, 5, 7, 9]
+        assert ring.stats.decimated == 3
+
+    def test_block_waits_for_the_consumer(self):
+        ring = RingBuffer(4, "block")
+        self.fill(ring, 4)
+        consumer = threading.Timer(0.02, ring.drain)
+        consumer.start()
+        start = time.monotonic()
+        ring.append(4, 4.0, "a")
+        assert time.monotonic() - start >= 0.015
+        consumer.join()
+        assert ring.drain()[0].tolist() == [4]
+
+    def test_block_timeout_drops(self):
+        ring = RingBuffer(2, "block", block_timeout=0.01)
+        self.fill(ring, 3)
+        assert ring.dropped == 1
+
+    @pytest.mark.parametrize("use_extend", [False, True])
+    def test_spill_keeps_every_sample_in_order(self, use_extend):
+        ring = RingBuffer(4, "spill")
+        if use_extend:
+            ring.extend(np.arange(10), np.arange(10.0), ring.source_code("a"))
+        else:
+            self.fill(ring, 10)
+        assert ring.stats.spilled == 6
+        assert len(ring) == 10
+        assert ring.snapshot()[0].tolist() == list(range(10))
+
+        # Reads interleaved with writes still return every sample once, in order
+        assert [ring.pop().t for _ in range(5)] == [0, 1, 2, 3, 4]
+        self.fill(ring, 3, start=10)
+        t, value = ring.drain()
+        assert t.tolist() == list(range(5, 13))
+        assert value.tolist() == [float(i) for i in range(5, 13)]
+        assert len(ring) == 0
+
+    def test_rejects_unknown_policy(self):
+        with pytest.raises(ValueError):
+            RingBuffer(4, "drop_everything")
+
+    def test_callback_scheduler_rejects_block(self):
+        with pytest.raises(ValueError):
+            EventDrivenScheduler(None, buffer=RingBuffer(4, "block"))  # type: ignore[arg-type]
+
+
+# TESTING the queue.Queue compatibility adapter:
+class TestRingQueueAdapter:
+    def test_get_nowait_raises_empty(self):
+        with pytest.raises(queue.Empty):
+            RingQueueAdapter(RingBuffer(4)).get_nowait()
+
+    def test_get_with_timeout_raises_empty(self):
+        with pytest.raises(queue.Empty):
+            RingQueueAdapter(RingBuffer(4)).get(timeout=0.01)
+
+    def test_qsize_and_empty(self):
+        adapter = RingQueueAdapter(RingBuffer(4))
+        assert adapter.empty()
+        adapter.put(SamplePoint(1, 1.0, "a"))
+        assert adapter.qsize() == 1
+        assert not adapter.empty()
+
+
+# TESTING EventDrivenScheduler with a RingBuffer:
+class TestEventDrivenSchedulerRing:
+    def test_ring_callback_keeps_only_frequency_events(self):
+        scheduler = EventDrivenScheduler(None, buffer=RingBuffer(8))
+        scheduler.ring_callback_handler(wlmConst.cmiFrequency1, 100, 1.5)
+        scheduler.ring_callback_handler(wlmConst.cmiVersion, 101, 7.0)
+        scheduler.ring_callback_handler(wlmConst.cmiFrequency2, 102, 2.5)
+
+        assert scheduler.data.qsize() == 2
+        sample = scheduler.data.get()
+        assert (sample.t, sample.value, sample.source) == (100, 1.5, "cmiFrequency1")
+        assert sample.host_t > 0
+        assert scheduler.data.get().source == "cmiFrequency2"
+
+    def test_custom_strategy_still_goes_through_callback_handler(self):
+        scheduler = EventDrivenScheduler(
+            None,
+            acquisition_strategy=lambda mode, intval, dblval: SamplePoint(
+                intval, dblval * 2, "custom"
+            ),
+            buffer=RingBuffer(8),
+        )
+        scheduler.callback_handler(wlmConst.cmiVersion, 5, 1.0)
+
+        sample = scheduler.data.get()
+        assert (sample.t, sample.value, sample.source) == (5, 2.0, "custom")
+        assert sample.host_t > 0
+
+
+# TESTING bulk drain/snapshot on both buffer backends:
+@pytest.fixture(params=["queue", "ring"])
+def filled_scheduler(request):
+    buffer = RingBuffer(4) if request.param == "ring" else None
+    scheduler = EventDrivenScheduler(None, buffer=buffer)
+    for t in range(6):
+        scheduler.callback_handler(wlmConst.cmiFrequency1, t, 100.0 + t)
+    return scheduler
+
+
+class TestDrainSnapshot:
+    def test_snapshot_does_not_consume(self, filled_scheduler):
+        t, value = filled_scheduler.snapshot(since=4)
+
+        assert t.tolist() == [4, 5]
+        assert value.tolist() == [104.0, 105.0]
+        assert filled_scheduler.data.qsize() > 0
+
+    def test_drain_returns_arrays_and_empties_buffer(self, filled_scheduler):
+        t, value = filled_scheduler.drain()
+
+        # The ring only holds its last 4 samples
+        assert t[-2:].tolist() == [4, 5]
+        assert value.dtype == np.float64 and t.dtype == np.int64
+        assert filled_scheduler.data.empty()
+        assert len(filled_scheduler.drain()[0]) == 0
+
+    def test_ring_drain_across_wrap_around(self):
+        ring = RingBuffer(4)
+        for t in range(3):
+            ring.append(t, float(t), "a")
+        ring.drain()
+        for t in range(3, 7):
+            ring.append(t, float(t), "a")
+
+        t, value = ring.drain()
+        assert t.tolist() == [3, 4, 5, 6]
+        assert ring.overruns == 0
@@ -0,0 +1,211 @@
+import time
+from typing import Optional
+
+import numpy as np
+
+_NS_PER_MS = 1_000_000
+# The wavemeter's event timestamp (intval) is a signed 32 bit millisecond counter
+_DEVICE_COUNTER_RANGE = 2**32
+
+
+class ClockModel:
+    """
+    Maps the wavemeter's millisecond event counter onto the host's time.monotonic_ns clock.
+
+    Every (device ms, host ns) pair observed by a scheduler is added with update(). Callback latency only
+    ever delays the host timestamp, so out of every `block` pairs the one with the smallest host - device
+    lag is kept as a fit point. The model keeps the last `window` fit points and refits
+    host = host_ref + ns_per_ms * (device - device_ref), i.e. an offset plus a drift between the two
+    clocks, every `refit_blocks` blocks (after every block while it is warming up). Fit points whose residual is more than `reject_sigma` robust standard
+    deviations (scaled MAD) from the median are rejected before the final fit, so a block in which every
+    callback was delayed by the OS or the GIL does not skew the mapping.
+
+    Host timestamps from the model are on the same clock as anything else stamped with
+    time.monotonic_ns (e.g. photodiode DAQ blocks), so the streams can be aligned after the fact.
+    The fitted offset tracks the smallest observed callback latency.
+    """
+
+    def __init__(
+        self,
+        window: int = 256,
+        block: int = 32,
+        refit_blocks: int = 8,
+        reject_sigma: float = 4.0,
+    ):
+        """
+        Args:
+            window (int): The number of fit points (one per block) used for the fit.
+            block (int): The number of pairs reduced to one fit point.
+            refit_blocks (int): Refit after this many blocks. Fitting runs on the acquisition thread,
+                so this bounds its cost per sample.
+            reject_sigma (float): Outlier threshold in robust standard deviations.
+        """
+        if window < 2:
+            raise ValueError("ClockModel window must hold at least 2 fit points.")
+
+        self._window = window
+        self._block = block
+        self._refit_blocks = refit_blocks
+        self._reject_sigma = reject_sigma
+
+        # Fit points, one per block
+        self._device = np.zeros(window, dtype=np.int64)
+        self._host = np.zeros(window, dtype=np.int64)
+        self._count = 0
+
+        # The minimum-lag pair of the block currently being collected
+        self._block_size = 0
+        self._block_lag = 0
+        self._block_pair = (0, 0)
+
+        # Counter unwrapping state
+        self._last_raw: Optional[int] = None
+        self._wrap_offset = 0
+
+        # (device_ref_ms, host_ref_ns, ns_per_ms), replaced as a whole so readers never see a partial fit
+        self._params: Optional[tuple[int, int, float]] = None
+        self._residual_std_ns = 0.0
+        self._rejected = 0
+
+    # public API
+    @property
+    def fitted(self) -> bool:
+        return self._params is not None
+
+    @property
+    def drift_ppm(self) -> float:
+        # Returns how much faster (+) or slower (-) the host clock runs than the wavemeter clock.
+        if self._params is None:
+            return 0.0
+        return (self._params[2] / _NS_PER_MS - 1.0) * 1e6
+
+    @property
+    def residual_std_ns(self) -> float:
+        # Returns the standard deviation of the inlier residuals of the last fit.
+        return self._residual_std_ns
+
+    @property
+    def rejected(self) -> int:
+        # Returns the number of fit points rejected as outliers (counted once per fit).
+        return self._rejected
+
+    def unwrap(self, device_ms: int) -> int:
+        """
+        Returns the device counter with its 32 bit wrap-arounds removed.
+        """
+        if (
+            self._last_raw is not None
+            and device_ms < self._last_raw - _DEVICE_COUNTER_RANGE // 2
+        ):
+            self._wrap_offset += _DEVICE_COUNTER_RANGE
+        self._last_raw = device_ms
+        return device_ms + self._wrap_offset
+
+    def update(self, device_ms: int, host_ns: int) -> int:
+        """
+        Adds one (device ms, host ns) pair. Called only from the acquisition thread.
+
+        Returns:
+            int: The unwrapped device timestamp.
+        """
+        device_ms = self.unwrap(device_ms)
+        lag = host_ns - device_ms * _NS_PER_MS
+        if self._block_size == 0 or lag < self._block_lag:
+            self._block_lag = lag
+            self._block_pair = (device_ms, host_ns)
+        self._block_size += 1
+
+        if self._block_size >= self._block:
+            i = self._count % self._window
+            self._device[i], self._host[i] = self._block_pair
+            self._count += 1
+            self._block_size = 0
+            if self._count >= 2 and (
+                self._count < self._refit_blocks
+                or self._count % self._refit_blocks == 0
+            ):
+                self._fit()
+        return device_ms
+
+    def stamp(self, device_ms: int, host_ns: Optional[int] = None) -> int:
+        """
+        Adds the pair and returns the model's host timestamp (ns) for the event.
+        Falls back to the observed host time until the model has been fitted.
+
+        Args:
+            device_ms (int): The wavemeter's event timestamp.
+            host_ns (int, optional): The host time the event was received. Defaults to now.
+        """
+        if host_ns is None:
+            host_ns = time.monotonic_ns()
+        device_ms = self.update(device_ms, host_ns)
+        params = self._params
+        if params is None:
+            return host_ns
+        device_ref, host_ref, ns_per_ms = params
+        return host_ref + int(ns_per_ms * (device_ms - device_ref))
+
+    def to_host(self, device_ms: int) -> int:
+        """
+        Returns the host time (ns) of an already unwrapped device timestamp.
+        """
+        params = self._params
+        if params is None:
+            raise RuntimeError("ClockModel has not been fitted yet.")
+        device_ref, host_ref, ns_per_ms = params
+        return host_ref + int(ns_per_ms * (device_ms - device_ref))
+
+    def to_host_array(self, device_ms: np.ndarray) -> np.ndarray:
+        """
+        Vectorized to_host for an array of unwrapped device timestamps.
+        """
+        params = self._params
+        if params is None:
+            raise RuntimeError("ClockModel has not been fitted yet.")
+        device_ref, host_ref, ns_per_ms = params
+        offsets = ns_per_ms * (np.asarray(device_ms, dtype=np.int64) - device_ref)
+        return host_ref + offsets.astype(np.int64)
+
+    # fitting
+    def _fit(self) -> None:
+        n = min(self._count, self._window)
+        newest = (self._count - 1) % self._window
+        device_ref = int(self._device[newest])
+        host_ref = int(self._host[newest])
+
+        # Fit relative to the newest pair to keep the float64 arithmetic exact enough
+        x = (self._device[:n] - device_ref).astype(np.float64)
+        y = (self._host[:n] - host_ref).astype(np.float64)
+        fit = self._least_squares(x, y)
+        if fit is None:
+            return
+
+        residuals = y - (fit[0] + fit[1] * x)
+        median = np.median(residuals)
+        robust_std = 1.4826 * np.median(np.abs(residuals - median))
+        if robust_std > 0:
+            inliers = np.abs(residuals - median) <= self._reject_sigma * robust_std
+            self._rejected += int(n - np.count_nonzero(inliers))
+            refit = self._least_squares(x[inliers], y[inliers])
+            if refit is not None:
+                fit = refit
+                residuals = y[inliers] - (fit[0] + fit[1] * x[inliers])
+
+        intercept, ns_per_ms = fit
+        self._residual_std_ns = float(np.std(residuals))
+        self._params = (device_ref, host_ref + int(intercept), float(ns_per_ms))
+
+    @staticmethod
+    def _least_squares(x: np.ndarray, y: np.ndarray) -> Optional[tuple[float, float]]:
+        """
+        Returns (intercept, slope) of the least squares line through (x, y), or None if x has no spread.
+        """
+        if len(x) < 2:
+            return None
+        x_mean, y_mean = x.mean(), y.mean()
+        dx = x - x_mean
+        sxx = np.dot(dx, dx)
+        if sxx == 0:
+            return None
+        slope = np.dot(dx, y - y_mean) / sxx
+        return y_mean - slope * x_mean, slope
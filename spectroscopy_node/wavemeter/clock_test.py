@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from clock import ClockModel
+
+
+def simulated_pairs(n=2000, drift_ppm=50.0, outlier_every=25, seed=0):
+    """Device ms ticks at 500 Hz and the host ns they arrive at (offset, drift, latency and outliers)."""
+    rng = np.random.default_rng(seed)
+    device_ms = 1_000 + 2 * np.arange(n)
+    true_host = 5_000_000_000 + device_ms * 1_000_000 * (1 + drift_ppm * 1e-6)
+    latency = rng.normal(200_000, 20_000, n)  # ~200 us callback latency
+    latency[::outlier_every] += 20_000_000  # a 20 ms stall now and then
+    latency[1000:1100] += 5_000_000  # a long stretch of slow callbacks
+    return device_ms, (true_host + latency).astype(np.int64), true_host
+
+
+# TESTING ClockModel IN ISOLATION:
+class TestClockModel:
+    def test_fit_recovers_drift_and_rejects_outliers(self):
+        clock = ClockModel()
+        device_ms, host_ns, true_host = simulated_pairs()
+        for d, h in zip(device_ms, host_ns):
+            clock.update(int(d), int(h))
+
+        assert clock.drift_ppm == pytest.approx(50.0, abs=5.0)
+        assert clock.rejected > 0
+        # Mapped times sit on the true clock plus the smallest latency, unaffected by the stalls
+        error = clock.to_host_array(device_ms[-100:]) - true_host[-100:]
+        assert np.all((error > 100_000) & (error < 200_000))
+
+    def test_stamp_falls_back_to_host_time_before_the_first_fit(self):
+        clock = ClockModel()
+        assert clock.stamp(10, 123) == 123
+        assert not clock.fitted
+
+    def test_unwraps_the_32_bit_counter(self):
+        clock = ClockModel()
+        assert clock.unwrap(2**31 - 2) == 2**31 - 2
+        assert clock.unwrap(-(2**31) + 1) == 2**31 + 1
+
+    def test_to_host_requires_a_fit(self):
+        with pytest.raises(RuntimeError):
+            ClockModel().to_host(0)
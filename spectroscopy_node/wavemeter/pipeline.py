@@ -0,0 +1,288 @@
+import threading
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+@dataclass(frozen=True, slots=True)
+class Blocks:
+    """
+    A batch of reduced samples, one entry per block in every column.
+    Raw samples enter a pipeline as blocks of count 1 and std 0.
+    """
+
+    t: np.ndarray  # Host time of the block (mean of its samples' times), int64 ns
+    value: np.ndarray  # Reduced value of the block (float64)
+    std: np.ndarray  # Standard deviation of the block's samples (float64, ddof 0)
+    count: np.ndarray  # Number of raw samples in the block (int64)
+
+    def __len__(self) -> int:
+        return len(self.t)
+
+    @classmethod
+    def empty(cls) -> "Blocks":
+        return cls(
+            np.zeros(0, dtype=np.int64),
+            np.zeros(0, dtype=np.float64),
+            np.zeros(0, dtype=np.float64),
+            np.zeros(0, dtype=np.int64),
+        )
+
+    @classmethod
+    def from_samples(cls, t: np.ndarray, value: np.ndarray) -> "Blocks":
+        n = len(t)
+        return cls(
+            np.asarray(t, dtype=np.int64),
+            np.asarray(value, dtype=np.float64),
+            np.zeros(n, dtype=np.float64),
+            np.ones(n, dtype=np.int64),
+        )
+
+    @classmethod
+    def concat(cls, parts: list["Blocks"]) -> "Blocks":
+        if not parts:
+            return cls.empty()
+        return cls(
+            np.concatenate([p.t for p in parts]),
+            np.concatenate([p.value for p in parts]),
+            np.concatenate([p.std for p in parts]),
+            np.concatenate([p.count for p in parts]),
+        )
+
+    def __getitem__(self, index) -> "Blocks":
+        return Blocks(
+            self.t[index], self.value[index], self.std[index], self.count[index]
+        )
+
+
+class BoxcarMean:
+    """
+    Non-overlapping block means, either per `period` seconds of host time (e.g. 0.1 s for 10 Hz output)
+    or per `n` input blocks. Counts and standard deviations are pooled exactly, so chained boxcars give
+    the same result as one long boxcar.
+    """
+
+    def __init__(self, period: Optional[float] = None, n: Optional[int] = None):
+        """
+        Args:
+            period (float, optional): Block length in seconds, blocks are aligned to multiples of it.
+            n (int, optional): Block length in input blocks. Exactly one of period and n must be given.
+        """
+        if (period is None) == (n is None):
+            raise ValueError("BoxcarMean needs exactly one of period and n.")
+        self._period_ns = None if period is None else int(period * 1e9)
+        self._n = n
+        self._index = 0  # number of input blocks seen, for count-based blocks
+        self._ref: Optional[float] = (
+            None  # values are summed relative to this to keep precision
+        )
+        self._pending = Blocks.empty()  # inputs of the block that is still open
+
+    def process(self, blocks: Blocks) -> Blocks:
+        if len(blocks) == 0:
+            return blocks
+        if self._ref is None:
+            self._ref = float(blocks.value[0])
+        blocks = Blocks.concat([self._pending, blocks])
+        if self._period_ns is not None:
+            keys = blocks.t // self._period_ns
+        else:
+            first_index = self._index - len(self._pending)
+            keys = (first_index + np.arange(len(blocks))) // self._n
+        self._index += len(blocks) - len(self._pending)
+
+        # Every block whose key differs from the last one is complete
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        last = starts[-1]
+        if self._n is not None and len(blocks) - last == self._n:
+            last = len(blocks)  # the last count-based block is already full
+        self._pending = blocks[last:]
+        if last == 0:
+            return Blocks.empty()
+        return self._reduce(blocks[:last], starts[starts < last])
+
+    def _reduce(self, blocks: Blocks, starts: np.ndarray) -> Blocks:
+        count = blocks.count.astype(np.float64)
+        dev = blocks.value - self._ref
+        n = np.add.reduceat(count, starts)
+        mean = np.add.reduceat(count * dev, starts) / n
+        # Pooled second moment: sum over the inputs of count * (std^2 + deviation^2)
+        second = np.add.reduceat(count * (blocks.std**2 + dev**2), starts) / n
+        t = np.add.reduceat(count * (blocks.t - blocks.t[0]), starts) / n
+        return Blocks(
+            blocks.t[0] + t.astype(np.int64),
+            mean + self._ref,
+            np.sqrt(np.maximum(second - mean**2, 0.0)),
+            n.astype(np.int64),
+        )
+
+
+class MedianOfN:
+    """
+    Non-overlapping medians of `n` input blocks, robust against single outliers (e.g. a wrong switcher
+    channel). The std column is the standard deviation of the n values, the count the sum of their counts.
+    """
+
+    def __init__(self, n: int):
+        if n < 1:
+            raise ValueError("MedianOfN needs n >= 1.")
+        self._n = n
+        self._pending = Blocks.empty()
+
+    def process(self, blocks: Blocks) -> Blocks:
+        blocks = Blocks.concat([self._pending, blocks])
+        full = len(blocks) // self._n * self._n
+        self._pending = blocks[full:]
+        if full == 0:
+            return Blocks.empty()
+        shape = (full // self._n, self._n)
+        value = blocks.value[:full].reshape(shape)
+        t = blocks.t[:full].reshape(shape)
+        return Blocks(
+            t[:, 0] + (t - t[:, :1]).mean(axis=1).astype(np.int64),
+            np.median(value, axis=1),
+            value.std(axis=1),
+            blocks.count[:full].reshape(shape).sum(axis=1),
+        )
+
+
+class CICDecimator:
+    """
+    CIC-style decimation by `r` with `order` stages: the response of `order` cascaded length-r boxcars,
+    keeping every r-th output. Compared to a plain boxcar this suppresses aliasing of noise near the
+    output rate much more.
+
+    The filter is computed in its FIR form (one convolution with the combined kernel per batch) rather
+    than with integrators and combs, because floating point integrators lose precision on long runs.
+    The std and count columns describe the r input blocks that arrived since the previous output.
+    """
+
+    def __init__(self, r: int, order: int = 3):
+        if r < 1 or order < 1:
+            raise ValueError("CICDecimator needs r >= 1 and order >= 1.")
+        self._r = r
+        kernel = np.ones(1)
+        for _ in range(order):
+            kernel = np.convolve(kernel, np.ones(r))
+        self._kernel = kernel / kernel.sum()
+        self._index = 0  # number of input blocks seen
+        self._ref: Optional[float] = None
+        self._history = Blocks.empty()  # the inputs the next outputs still need
+
+    def process(self, blocks: Blocks) -> Blocks:
+        if len(blocks) == 0:
+            return blocks
+        if self._ref is None:
+            self._ref = float(blocks.value[0])
+        first_index = self._index - len(self._history)
+        self._index += len(blocks)
+        blocks = Blocks.concat([self._history, blocks])
+        length = len(self._kernel)
+        self._history = blocks[max(len(blocks) - length + 1, 0) :]
+        if len(blocks) < length:
+            return Blocks.empty()
+
+        # Window k covers inputs k .. k + length - 1; keep the windows ending on a multiple of r
+        ends = np.arange(length - 1, len(blocks))
+        keep = ends[(first_index + ends + 1) % self._r == 0]
+        if len(keep) == 0:
+            return Blocks.empty()
+        dev = blocks.value - self._ref
+        value = np.convolve(dev, self._kernel[::-1], mode="valid")[keep - length + 1]
+        t0 = blocks.t[0]
+        t = np.convolve(
+            (blocks.t - t0).astype(np.float64), self._kernel[::-1], mode="valid"
+        )[keep - length + 1]
+        recent = sliding_window_view(dev, self._r)[keep - self._r + 1]
+        counts = sliding_window_view(blocks.count, self._r)[keep - self._r + 1]
+        return Blocks(
+            t0 + t.astype(np.int64),
+            value + self._ref,
+            recent.std(axis=1),
+            counts.sum(axis=1),
+        )
+
+
+class Pipeline:
+    """
+    A chain of reduction stages (BoxcarMean, MedianOfN, CICDecimator, ...) fed by a scheduler.
+
+    Attach it with scheduler.add_consumer(pipeline). Raw samples are collected and pushed through the
+    stages `chunk` samples at a time, so the NumPy work is amortized over several samples; the outputs
+    of the last stage are kept for drain() and passed to on_blocks. To keep only the reduced stream,
+    also set scheduler.store_raw = False.
+
+    Example (500 Hz raw -> 10 Hz means with per-block std):
+        pipeline = Pipeline(MedianOfN(5), BoxcarMean(period=0.1))
+        scheduler.add_consumer(pipeline)
+        ...
+        blocks = pipeline.drain()
+    """
+
+    def __init__(
+        self,
+        *stages,
+        chunk: int = 32,
+        on_blocks: Optional[Callable[[Blocks], None]] = None,
+    ):
+        """
+        Args:
+            stages: The stages, applied in order. Each has process(Blocks) -> Blocks.
+            chunk (int): The number of raw samples collected before they are run through the stages.
+            on_blocks (Callable[[Blocks], None], optional): Called on the acquisition thread with
+                every non-empty output of the last stage.
+        """
+        self._stages = stages
+        self._chunk = chunk
+        self._on_blocks = on_blocks
+        self._lock = threading.Lock()
+        self._t: list = []
+        self._value: list = []
+        self._output: list[Blocks] = []
+
+    # SampleConsumer
+    def update(self, t: int, value: float) -> None:
+        with self._lock:
+            self._t.append(t)
+            self._value.append(value)
+            if len(self._t) >= self._chunk:
+                self._run()
+
+    def update_many(self, t: np.ndarray, value: np.ndarray) -> None:
+        with self._lock:
+            self._t.extend(t.tolist())
+            self._value.extend(value.tolist())
+            if len(self._t) >= self._chunk:
+                self._run()
+
+    def flush(self) -> None:
+        """
+        Runs the collected raw samples through the stages without waiting for a full chunk.
+        Blocks the stages have not completed yet stay open.
+        """
+        with self._lock:
+            self._run()
+
+    def drain(self) -> Blocks:
+        """
+        Returns and removes every output block so far (after a flush).
+        """
+        with self._lock:
+            self._run()
+            output, self._output = self._output, []
+        return Blocks.concat(output)
+
+    def _run(self) -> None:
+        if not self._t:
+            return
+        blocks = Blocks.from_samples(np.array(self._t), np.array(self._value))
+        self._t, self._value = [], []
+        for stage in self._stages:
+            blocks = stage.process(blocks)
+            if len(blocks) == 0:
+                return
+        self._output.append(blocks)
+        if self._on_blocks is not None:
+            self._on_blocks(blocks)
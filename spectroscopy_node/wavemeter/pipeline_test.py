@@ -0,0 +1,91 @@
+import pytest
+import numpy as np
+
+import wlmConst
+from pipeline import Blocks, BoxcarMean, CICDecimator, MedianOfN, Pipeline
+from scheduler import EventDrivenScheduler
+
+RATE = 500  # raw samples per second
+F0 = 375.0
+
+
+def raw_stream(n: int, noise: float = 1e-6, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    t = (np.arange(n) * 1e9 / RATE).astype(np.int64)
+    return t, F0 + rng.normal(0, noise, n)
+
+
+def run_in_chunks(stage, t, value, chunk):
+    parts = [
+        stage.process(Blocks.from_samples(t[i : i + chunk], value[i : i + chunk]))
+        for i in range(0, len(t), chunk)
+    ]
+    return Blocks.concat(parts)
+
+
+# TESTING the stages IN ISOLATION:
+@pytest.mark.parametrize("chunk", [7, 64, 5000])
+def test_boxcar_period_matches_numpy_regardless_of_chunking(chunk):
+    t, value = raw_stream(5000)
+    out = run_in_chunks(BoxcarMean(period=0.1), t, value, chunk)
+
+    expected = value.reshape(-1, 50)  # 500 Hz -> 10 Hz
+    assert len(out) == 99  # the last block stays open until a later sample arrives
+    assert (out.count == 50).all()
+    np.testing.assert_allclose(out.value, expected.mean(axis=1)[:99], atol=1e-12)
+    np.testing.assert_allclose(out.std, expected.std(axis=1)[:99], rtol=1e-6)
+
+
+def test_chained_boxcars_pool_exactly():
+    t, value = raw_stream(1000)
+    out = run_in_chunks(BoxcarMean(n=10), t, value, 33)
+    out = BoxcarMean(n=5).process(out)
+
+    expected = value.reshape(-1, 50)
+    assert (out.count == 50).all()
+    np.testing.assert_allclose(out.value, expected.mean(axis=1), atol=1e-12)
+    np.testing.assert_allclose(out.std, expected.std(axis=1), rtol=1e-6)
+
+
+def test_median_of_n_rejects_outliers():
+    t, value = raw_stream(100, noise=0.0)
+    value[::10] = 0.0  # one bad sample in every block of 5 or 10
+    out = run_in_chunks(MedianOfN(5), t, value, 13)
+
+    assert len(out) == 20
+    assert (out.value == F0).all()
+    assert (out.count == 5).all()
+    assert (out.std[::2] > 0).all()
+
+
+def test_cic_decimates_with_unit_gain():
+    t, value = raw_stream(3000)
+    one_shot = CICDecimator(10, order=3).process(Blocks.from_samples(t, value))
+    chunked = run_in_chunks(CICDecimator(10, order=3), t, value, 17)
+
+    assert len(one_shot) == len(chunked) > 290
+    np.testing.assert_allclose(chunked.value, one_shot.value, atol=1e-12)
+    assert np.abs(one_shot.value - F0).max() < 1e-6
+    # Averaging ~19 effective samples reduces the noise accordingly
+    assert one_shot.value.std() < 0.4e-6
+    assert (one_shot.count == 10).all()
+    assert np.diff(one_shot.t).tolist() == [int(10e9 / RATE)] * (len(one_shot) - 1)
+
+
+# TESTING Pipeline attached to a scheduler:
+def test_pipeline_reduces_scheduler_stream_without_raw_storage():
+    scheduler = EventDrivenScheduler(None)  # type: ignore[arg-type]
+    scheduler.store_raw = False
+    received = []
+    pipeline = Pipeline(BoxcarMean(n=50), on_blocks=received.append)
+    scheduler.add_consumer(pipeline)
+
+    for i in range(500):
+        scheduler.callback_handler(wlmConst.cmiFrequency1, i * 2, F0 + (i % 2) * 1e-6)
+
+    out = pipeline.drain()
+    assert len(out) == 10
+    np.testing.assert_allclose(out.value, F0 + 0.5e-6, atol=1e-12)
+    np.testing.assert_allclose(out.std, 0.5e-6, rtol=1e-6)
+    assert sum(len(b) for b in received) == 10
+    assert scheduler.data.empty()
@@ -0,0 +1,285 @@
+"""
+Binary recordings of raw wavemeter streams.
+
+A recording file is a small self-describing header followed by fixed-size records:
+    8 bytes     MAGIC
+    4 bytes     little-endian uint32: length of the JSON header that follows
+    JSON        {"format": 1, "dtype": [...], "created": "...", "channels": {...}, "metadata": {...}},
+                padded with spaces so the records start at a multiple of 64 bytes
+    records     RECORD_DTYPE rows (host time ns, value, channel), appended in chunks
+
+Records are appended in the order the scheduler delivered them, so each channel's samples are in time
+order. A crash can leave at most a partial record at the end, which the reader ignores.
+"""
+
+import datetime, json, os, struct, threading, time
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+MAGIC = b"WLMREC\x00\x01"
+FORMAT_VERSION = 1
+RECORD_DTYPE = np.dtype(
+    [("t", "<i8"), ("value", "<f8"), ("channel", "u1")]
+)  # packed, 17 bytes per sample
+_HEADER_ALIGN = 64
+_LENGTH = struct.Struct("<I")
+
+
+@dataclass(frozen=True, slots=True)
+class WriterStats:
+    written: int  # Samples written to the file
+    dropped: int  # Samples dropped because the writer fell more than max_pending behind
+    bytes_written: int  # Record bytes written (without the header)
+    fsyncs: int  # Number of fsync calls
+
+
+class _ChannelConsumer:
+    """
+    A SampleConsumer that records the samples of one channel into a RecordingWriter.
+    """
+
+    __slots__ = ("_writer", "_channel")
+
+    def __init__(self, writer: "RecordingWriter", channel: int):
+        self._writer = writer
+        self._channel = channel
+
+    def update(self, t: int, value: float) -> None:
+        self._writer._add_row(t, value, self._channel)
+
+    def update_many(self, t: np.ndarray, value: np.ndarray) -> None:
+        self._writer._add_batch(t, value, self._channel)
+
+
+class RecordingWriter:
+    """
+    Appends a scheduler's samples to a recording file from a background thread.
+
+    The acquisition thread only copies each batch into a pending list; the writer thread wakes up once
+    `chunk_size` samples are pending (or every `flush_interval` seconds), writes them as one block and
+    fsyncs the file every `fsync_interval` seconds. If the disk falls more than `max_pending` samples
+    behind, new samples are dropped and counted instead of blocking the acquisition.
+
+    Example, recording two switcher channels:
+        with RecordingWriter("run.wlmrec", metadata={"run": 12}) as writer:
+            scheduler.add_consumer(writer.consumer(1), channel=1)
+            scheduler.add_consumer(writer.consumer(2), channel=2)
+            ...
+    The writer itself is a consumer for channel 0, for single channel schedulers.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        metadata: Optional[dict] = None,
+        channels: Optional[dict[int, str]] = None,
+        chunk_size: int = 8192,
+        flush_interval: float = 0.25,
+        fsync_interval: float = 1.0,
+        max_pending: int = 1_000_000,
+    ):
+        """
+        Args:
+            path (str): The file to create (an existing file is overwritten).
+            metadata (dict, optional): JSON-serializable information stored in the header.
+            channels (dict[int, str], optional): Names of the channel numbers, stored in the header.
+            chunk_size (int): The number of pending samples that wakes the writer thread.
+            flush_interval (float): The longest samples stay pending, in seconds.
+            fsync_interval (float): Seconds between fsync calls.
+            max_pending (int): The number of pending samples beyond which new samples are dropped.
+        """
+        self.path = path
+        self._chunk_size = chunk_size
+        self._flush_interval = flush_interval
+        self._fsync_interval = fsync_interval
+        self._max_pending = max_pending
+
+        self._lock = threading.Lock()
+        self._rows: list = []  # single samples not yet moved into _parts
+        self._parts: list[np.ndarray] = []
+        self._pending = 0
+        self._wakeup = threading.Event()
+        self._stop_event = threading.Event()
+
+        self._written = 0
+        self._dropped = 0
+        self._fsyncs = 0
+
+        self._file = open(path, "wb")
+        self._file.write(
+            _encode_header(
+                {
+                    "format": FORMAT_VERSION,
+                    "dtype": RECORD_DTYPE.descr,
+                    "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                    "timebase": "host time.monotonic_ns",
+                    "channels": {str(k): v for k, v in (channels or {}).items()},
+                    "metadata": metadata or {},
+                }
+            )
+        )
+        self._file.flush()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def __enter__(self) -> "RecordingWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    # public API
+    def consumer(self, channel: int) -> _ChannelConsumer:
+        """
+        Returns a SampleConsumer that records samples under the given channel number (0-255).
+        """
+        if not 0 <= channel <= 255:
+            raise ValueError(f"Channel must be between 0 and 255, got {channel}")
+        return _ChannelConsumer(self, channel)
+
+    @property
+    def stats(self) -> WriterStats:
+        # Returns the counters of the writer.
+        return WriterStats(
+            self._written,
+            self._dropped,
+            self._written * RECORD_DTYPE.itemsize,
+            self._fsyncs,
+        )
+
+    def close(self) -> None:
+        """
+        Writes the pending samples, fsyncs and closes the file. Samples arriving later are dropped.
+        """
+        if self._stop_event.is_set():
+            return
+        self._stop_event.set()
+        self._wakeup.set()
+        self._thread.join()
+        self._write_pending()
+        self._sync()
+        self._file.close()
+
+    # SampleConsumer (channel 0)
+    def update(self, t: int, value: float) -> None:
+        self._add_row(t, value, 0)
+
+    def update_many(self, t: np.ndarray, value: np.ndarray) -> None:
+        self._add_batch(t, value, 0)
+
+    # acquisition thread
+    def _add_row(self, t: int, value: float, channel: int) -> None:
+        with self._lock:
+            if self._stop_event.is_set() or self._pending >= self._max_pending:
+                self._dropped += 1
+                return
+            self._rows.append((t, value, channel))
+            self._pending += 1
+            if self._pending == self._chunk_size:
+                self._wakeup.set()
+
+    def _add_batch(self, t: np.ndarray, value: np.ndarray, channel: int) -> None:
+        n = len(t)
+        records = np.empty(n, dtype=RECORD_DTYPE)
+        records["t"] = t
+        records["value"] = value
+        records["channel"] = channel
+        with self._lock:
+            if self._stop_event.is_set() or self._pending + n > self._max_pending:
+                self._dropped += n
+                return
+            if self._rows:
+                self._parts.append(np.array(self._rows, dtype=RECORD_DTYPE))
+                self._rows = []
+            self._parts.append(records)
+            crossed = self._pending < self._chunk_size <= self._pending + n
+            self._pending += n
+        if crossed:
+            self._wakeup.set()
+
+    # writer thread
+    def _run(self) -> None:
+        last_sync = time.monotonic()
+        while not self._stop_event.is_set():
+            self._wakeup.wait(self._flush_interval)
+            self._wakeup.clear()
+            self._write_pending()
+            if time.monotonic() - last_sync >= self._fsync_interval:
+                self._sync()
+                last_sync = time.monotonic()
+
+    def _write_pending(self) -> None:
+        with self._lock:
+            parts, rows = self._parts, self._rows
+            self._parts, self._rows = [], []
+            self._pending = 0
+        if rows:
+            parts.append(np.array(rows, dtype=RECORD_DTYPE))
+        if not parts:
+            return
+        records = np.concatenate(parts) if len(parts) > 1 else parts[0]
+        self._file.write(memoryview(records).cast("B"))
+        self._written += len(records)
+
+    def _sync(self) -> None:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._fsyncs += 1
+
+
+def _encode_header(header: dict) -> bytes:
+    encoded = json.dumps(header).encode()
+    size = len(MAGIC) + _LENGTH.size + len(encoded)
+    encoded += b" " * (-size % _HEADER_ALIGN)
+    return MAGIC + _LENGTH.pack(len(encoded)) + encoded
+
+
+class Recording:
+    """
+    Read access to a recording file. The records are memory-mapped, not loaded: the columns are views
+    into the file, so opening a multi-gigabyte recording is instant and only the parts used are read.
+    A recording that is still being written can be opened; it shows the records complete at that time.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a wavemeter recording")
+            (length,) = _LENGTH.unpack(f.read(_LENGTH.size))
+            self.header: dict = json.loads(f.read(length))
+        if self.header["format"] != FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported recording format {self.header['format']} in {path}"
+            )
+        self.dtype = np.dtype([tuple(field) for field in self.header["dtype"]])
+        offset = len(MAGIC) + _LENGTH.size + length
+        count = (os.path.getsize(path) - offset) // self.dtype.itemsize
+        if count:
+            self.records = np.memmap(
+                path, dtype=self.dtype, mode="r", offset=offset, shape=(count,)
+            )
+        else:
+            self.records = np.zeros(0, dtype=self.dtype)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @property
+    def metadata(self) -> dict:
+        # Returns the metadata given to the writer.
+        return self.header["metadata"]
+
+    @property
+    def channels(self) -> np.ndarray:
+        # Returns the channel numbers present in the recording.
+        return np.unique(self.records["channel"])
+
+    def channel(self, channel: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the (host time ns, value) arrays of one channel.
+        """
+        selected = self.records[self.records["channel"] == channel]
+        return np.asarray(selected["t"]), np.asarray(selected["value"])
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from recording import MAGIC, RECORD_DTYPE, Recording, RecordingWriter
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "run.wlmrec")
+
+
+# TESTING RecordingWriter AND Recording:
+class TestRecording:
+    def test_round_trip(self, path):
+        t = np.arange(1000, dtype=np.int64)
+        values = 375.0 + t * 1e-9
+        with RecordingWriter(
+            path, metadata={"run": 3}, channels={0: "probe"}
+        ) as writer:
+            writer.update_many(t[:500], values[:500])
+            for i in range(500, 1000):
+                writer.update(int(t[i]), float(values[i]))
+        assert writer.stats.written == 1000
+        assert writer.stats.fsyncs >= 1
+
+        recording = Recording(path)
+        assert len(recording) == 1000
+        assert recording.metadata == {"run": 3}
+        assert recording.header["channels"] == {"0": "probe"}
+        t_out, values_out = recording.channel(0)
+        assert (t_out == t).all()
+        assert (values_out == values).all()
+
+    def test_records_are_aligned_and_memory_mapped(self, path):
+        with RecordingWriter(path) as writer:
+            writer.update_many(np.arange(10), np.zeros(10))
+        recording = Recording(path)
+        assert isinstance(recording.records, np.memmap)
+        assert recording.records.offset % 64 == 0
+        assert recording.dtype == RECORD_DTYPE
+
+    def test_channels_keep_their_order(self, path):
+        with RecordingWriter(path, chunk_size=16) as writer:
+            one, two = writer.consumer(1), writer.consumer(2)
+            for i in range(100):
+                one.update(i, 1.0)
+                two.update_many(np.array([i, i]), np.array([2.0, 2.0]))
+        recording = Recording(path)
+        assert recording.channels.tolist() == [1, 2]
+        t1, v1 = recording.channel(1)
+        t2, v2 = recording.channel(2)
+        assert t1.tolist() == list(range(100))
+        assert t2.tolist() == np.repeat(np.arange(100), 2).tolist()
+        assert (v1 == 1.0).all() and (v2 == 2.0).all()
+
+    def test_partial_trailing_record_is_ignored(self, path):
+        with RecordingWriter(path) as writer:
+            writer.update_many(np.arange(10), np.zeros(10))
+        with open(path, "ab") as f:
+            f.write(b"\x00" * 5)  # a torn write
+        assert len(Recording(path)) == 10
+
+    def test_empty_and_foreign_files(self, path, tmp_path):
+        RecordingWriter(path).close()
+        assert len(Recording(path)) == 0
+        other = tmp_path / "other.bin"
+        other.write_bytes(b"not a recording")
+        with pytest.raises(ValueError):
+            Recording(str(other))
+        assert open(path, "rb").read(len(MAGIC)) == MAGIC
+
+    def test_drops_instead_of_growing_without_bound(self, path):
+        writer = RecordingWriter(path, max_pending=10, flush_interval=10.0)
+        writer.update_many(np.arange(8), np.zeros(8))
+        writer.update_many(np.arange(8), np.zeros(8))
+        writer.close()
+        writer.update(0, 0.0)  # after close
+        assert writer.stats.written == 8
+        assert writer.stats.dropped == 9
@@ -0,0 +1,397 @@
+import threading
+from dataclasses import dataclass, field, replace
+from typing import Optional, Sequence
+
+import numpy as np
+
+import wlmConst
+
+
+@dataclass(frozen=True, slots=True)
+# frozen=True makes the dataclass immutable, slots=True saves memory by using __slots__ (a continous array) instead of a dict for attributes
+class SamplePoint:
+    """
+    A class representing a sample point from the wavemeter.
+    """
+
+    t: int  # Timestamp of the sample point in milliseconds
+    value: float  # Frequency value of the sample point
+    # this keeps the source from being printed when the SamplePoint is printed, but it can still be accessed as an attribute
+    source: str = field(repr=False)
+    # Host time of the sample in time.monotonic_ns nanoseconds (0 if unknown), see clock.ClockModel
+    host_t: int = field(default=0, repr=False)
+
+
+# Status code of a valid sample; otherwise the status column holds the wlmData error code (ErrNoSignal, ...)
+STATUS_OK = 1
+
+
+class SourceTable:
+    """
+    Interns source strings as small integer IDs, so sample batches store a uint16 per sample
+    instead of a Python string.
+    """
+
+    def __init__(self):
+        self._names: list[str] = []
+        self._ids: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def intern(self, name: str) -> int:
+        """
+        Returns the ID of a source name, assigning the next free ID on first use.
+        """
+        source_id = self._ids.get(name)
+        if source_id is None:
+            with self._lock:
+                source_id = self._ids.get(name)
+                if source_id is None:
+                    if len(self._names) > np.iinfo(np.uint16).max:
+                        raise ValueError("SourceTable supports at most 65536 sources.")
+                    source_id = len(self._names)
+                    self._names.append(name)
+                    self._ids[name] = source_id
+        return source_id
+
+    def name(self, source_id: int) -> str:
+        return self._names[source_id]
+
+
+# The table used by SampleBatch
+SOURCES = SourceTable()
+
+# Error classes counted by ErrorCounts, in the order of classify()'s class indices after "ok"
+SIGNAL_ERROR_CODES = (
+    wlmConst.ErrNoSignal,
+    wlmConst.ErrBadSignal,
+    wlmConst.ErrLowSignal,
+    wlmConst.ErrBigSignal,
+)
+_CLASS_OK, _CLASS_OTHER = 0, len(SIGNAL_ERROR_CODES) + 1
+_N_CLASSES = _CLASS_OTHER + 1
+# Class index by STATUS_OK - status, so classify() is a single gather; larger offsets are "other"
+_CLASS_LOOKUP = np.full(STATUS_OK - min(SIGNAL_ERROR_CODES) + 2, _CLASS_OTHER, np.int8)
+_CLASS_LOOKUP[0] = _CLASS_OK
+for _index, _code in enumerate(SIGNAL_ERROR_CODES, start=1):
+    _CLASS_LOOKUP[STATUS_OK - _code] = _index
+
+
+@dataclass(frozen=True, slots=True)
+class ErrorCounts:
+    """
+    Number of samples per status class.
+    """
+
+    ok: int
+    no_signal: int  # ErrNoSignal
+    bad_signal: int  # ErrBadSignal
+    low_signal: int  # ErrLowSignal (underexposed)
+    big_signal: int  # ErrBigSignal (overexposed)
+    other: int  # Any other wlmData error code (ErrNoValue, ErrWlmMissing, ...)
+
+    @property
+    def total(self) -> int:
+        return self.ok + self.errors
+
+    @property
+    def errors(self) -> int:
+        return (
+            self.no_signal
+            + self.bad_signal
+            + self.low_signal
+            + self.big_signal
+            + self.other
+        )
+
+    @property
+    def error_fraction(self) -> float:
+        return self.errors / self.total if self.total else 0.0
+
+
+def classify(status: np.ndarray) -> np.ndarray:
+    """
+    Returns the class index of every status code: 0 for STATUS_OK, 1-4 for the SIGNAL_ERROR_CODES
+    in order, 5 for any other error code.
+    """
+    offset = STATUS_OK - np.asarray(status, dtype=np.int64)
+    return _CLASS_LOOKUP[np.clip(offset, 0, len(_CLASS_LOOKUP) - 1)]
+
+
+def count_errors(
+    status: np.ndarray, counts: Optional[np.ndarray] = None
+) -> ErrorCounts:
+    """
+    Counts the status codes per class.
+
+    Args:
+        status (np.ndarray): Status codes (see status_codes).
+        counts (np.ndarray, optional): How often each status code occurred, if status holds distinct codes.
+    """
+    totals = np.bincount(classify(status), weights=counts, minlength=_N_CLASSES)
+    return ErrorCounts(*(int(n) for n in totals))
+
+
+def count_errors_by_window(
+    t: np.ndarray, status: np.ndarray, edges: np.ndarray
+) -> np.ndarray:
+    """
+    Counts the status codes per class in consecutive time windows.
+
+    Args:
+        t (np.ndarray): Sample times.
+        status (np.ndarray): Status codes of the samples.
+        edges (np.ndarray): Increasing window edges; window k is edges[k] <= t < edges[k + 1].
+
+    Returns:
+        np.ndarray: int64 array of shape (len(edges) - 1, 6), columns in the order of ErrorCounts.
+            Samples outside the edges are not counted.
+    """
+    n_windows = len(edges) - 1
+    window = np.searchsorted(edges, t, side="right") - 1
+    inside = (window >= 0) & (window < n_windows)
+    index = window[inside] * _N_CLASSES + classify(np.asarray(status)[inside])
+    return np.bincount(index, minlength=n_windows * _N_CLASSES).reshape(
+        n_windows, _N_CLASSES
+    )
+
+
+def _optional_column(column, n: int) -> Optional[np.ndarray]:
+    # Broadcasts an optional per-sample quality column to float64, error values (<= 0) become NaN
+    if column is None:
+        return None
+    column = np.broadcast_to(np.asarray(column, dtype=np.float64), (n,))
+    return np.where(column > 0, column, np.nan)
+
+
+@dataclass(frozen=True, slots=True)
+class SampleBatch:
+    """
+    A batch of samples stored as typed columns, one entry per sample in every column.
+
+    Unlike a list of SamplePoints, filtering and averaging work on whole columns:
+        batch = SampleBatch.from_values(t, values, exposure=exposure, uncertainty=uncertainty)
+        good = batch.select(min_exposure=5, max_uncertainty=1e-6)
+        mean, error = good.weighted_mean()
+
+    The optional quality columns (exposure, linewidth, uncertainty) are None if they were not read,
+    and NaN for samples where the wavemeter reported no value.
+    """
+
+    t: np.ndarray  # Host time in time.monotonic_ns nanoseconds (int64)
+    value: np.ndarray  # Measured value, error samples keep the raw error code (float64)
+    channel: np.ndarray  # Switcher channel (uint8, 0 without switcher)
+    mode: (
+        np.ndarray
+    )  # wlmConst measurement mode code of the event, e.g. cmiFrequency1 (int16)
+    status: np.ndarray  # STATUS_OK or the wlmData error code (int16)
+    source: np.ndarray  # Source ID, see SOURCES (uint16)
+    exposure: Optional[np.ndarray] = None  # Exposure time in ms (float64)
+    linewidth: Optional[np.ndarray] = None  # Linewidth from GetLinewidthNum (float64)
+    uncertainty: Optional[np.ndarray] = (
+        None  # Uncertainty from GetMeasurementUncertainty (float64)
+    )
+
+    def __len__(self) -> int:
+        return len(self.t)
+
+    @classmethod
+    def from_values(
+        cls,
+        t: np.ndarray,
+        value: np.ndarray,
+        channel=0,
+        mode=wlmConst.cmiFrequency1,
+        source: str = "",
+        exposure=None,
+        linewidth=None,
+        uncertainty=None,
+    ) -> "SampleBatch":
+        """
+        Builds a batch from time and value arrays. Scalars are broadcast to every sample, and the
+        status column is derived from the values (values <= 0 are wlmData error codes).
+
+        Args:
+            t (np.ndarray): Host times in ns.
+            value (np.ndarray): Values as returned by the wavemeter, including error codes.
+            channel (int | np.ndarray): Switcher channel(s).
+            mode (int | np.ndarray): Measurement mode code(s).
+            source (str): The source name, interned in SOURCES.
+            exposure, linewidth, uncertainty (float | np.ndarray, optional): Quality columns.
+        """
+        value = np.asarray(value, dtype=np.float64)
+        n = len(value)
+        return cls(
+            np.asarray(t, dtype=np.int64),
+            value,
+            np.broadcast_to(np.asarray(channel, dtype=np.uint8), (n,)).copy(),
+            np.broadcast_to(np.asarray(mode, dtype=np.int16), (n,)).copy(),
+            status_codes(value),
+            np.full(n, SOURCES.intern(source), dtype=np.uint16),
+            _optional_column(exposure, n),
+            _optional_column(linewidth, n),
+            _optional_column(uncertainty, n),
+        )
+
+    @classmethod
+    def from_points(cls, points: Sequence[SamplePoint]) -> "SampleBatch":
+        """
+        Converts SamplePoints (host_t is used as the time) into a batch.
+        """
+        batch = cls.from_values(
+            np.fromiter((p.host_t for p in points), np.int64, len(points)),
+            np.fromiter((p.value for p in points), np.float64, len(points)),
+        )
+        source = np.fromiter(
+            (SOURCES.intern(p.source) for p in points), np.uint16, len(points)
+        )
+        return replace(batch, source=source)
+
+    @classmethod
+    def concat(cls, parts: Sequence["SampleBatch"]) -> "SampleBatch":
+        """
+        Concatenates batches. A quality column is kept if any part has it (NaN for the others).
+        """
+        if not parts:
+            return cls.from_values(np.zeros(0), np.zeros(0))
+        columns = {}
+        for name in cls.__dataclass_fields__:
+            values = [getattr(p, name) for p in parts]
+            if all(v is None for v in values):
+                columns[name] = None
+            else:
+                columns[name] = np.concatenate(
+                    [
+                        np.full(len(p), np.nan) if v is None else v
+                        for p, v in zip(parts, values)
+                    ]
+                )
+        return cls(**columns)
+
+    def __getitem__(self, index) -> "SampleBatch":
+        # Applies an index, slice or boolean mask to every column
+        return SampleBatch(
+            *(
+                None if column is None else column[index]
+                for column in (
+                    getattr(self, name) for name in self.__dataclass_fields__
+                )
+            )
+        )
+
+    def source_names(self) -> list[str]:
+        """
+        Returns the source name of every sample.
+        """
+        return [SOURCES.name(i) for i in self.source.tolist()]
+
+    # masking
+    @property
+    def valid(self) -> np.ndarray:
+        # Returns the mask of samples without a wavemeter error.
+        return self.status == STATUS_OK
+
+    def mask(
+        self,
+        valid: bool = True,
+        channel: Optional[int] = None,
+        mode: Optional[int] = None,
+        min_exposure: Optional[float] = None,
+        max_exposure: Optional[float] = None,
+        max_linewidth: Optional[float] = None,
+        max_uncertainty: Optional[float] = None,
+    ) -> np.ndarray:
+        """
+        Returns the boolean mask of the samples meeting every given criterion.
+        Samples whose quality column is NaN fail the criteria on that column.
+
+        Args:
+            valid (bool): Only samples without a wavemeter error.
+            channel (int, optional): Only this switcher channel.
+            mode (int, optional): Only this measurement mode (e.g. cmiFrequency1).
+            min_exposure, max_exposure (float, optional): Exposure time limits in ms.
+            max_linewidth (float, optional): Linewidth limit.
+            max_uncertainty (float, optional): Measurement uncertainty limit.
+        """
+        keep = self.valid if valid else np.ones(len(self), dtype=bool)
+        if channel is not None:
+            keep &= self.channel == channel
+        if mode is not None:
+            keep &= self.mode == mode
+        for column, limit, below in (
+            ("exposure", min_exposure, False),
+            ("exposure", max_exposure, True),
+            ("linewidth", max_linewidth, True),
+            ("uncertainty", max_uncertainty, True),
+        ):
+            if limit is None:
+                continue
+            values = getattr(self, column)
+            if values is None:
+                raise ValueError(f"The batch has no {column} column.")
+            keep &= values <= limit if below else values >= limit
+        return keep
+
+    def select(self, **criteria) -> "SampleBatch":
+        """
+        Returns the samples meeting the criteria of mask().
+        """
+        return self[self.mask(**criteria)]
+
+    # status classification
+    def error_counts(self) -> ErrorCounts:
+        """
+        Returns the number of valid samples and of each error class.
+        """
+        return count_errors(self.status)
+
+    def error_counts_by_window(self, edges: np.ndarray) -> np.ndarray:
+        """
+        Returns the per-class counts in the host time windows between edges, see count_errors_by_window.
+        """
+        return count_errors_by_window(self.t, self.status, edges)
+
+    # averaging
+    def weights(self) -> np.ndarray:
+        """
+        Returns the inverse-variance weight of every sample, 1 / uncertainty^2, or equal weights if
+        there is no uncertainty column. Error samples and samples without uncertainty get weight 0.
+        """
+        if self.uncertainty is None:
+            return self.valid.astype(np.float64)
+        weights = 1.0 / self.uncertainty**2
+        return np.where(self.valid & np.isfinite(weights), weights, 0.0)
+
+    def weighted_mean(self, mask: Optional[np.ndarray] = None) -> tuple[float, float]:
+        """
+        Returns the quality-weighted mean value and its standard error (of the samples in mask).
+
+        With an uncertainty column this is the inverse-variance weighted mean with error
+        1 / sqrt(sum of weights), otherwise the plain mean of the valid samples with error std / sqrt(n).
+        Returns (nan, nan) if no sample has weight.
+        """
+        weights = self.weights()
+        if mask is not None:
+            weights = np.where(mask, weights, 0.0)
+        total = weights.sum()
+        if total <= 0:
+            return float("nan"), float("nan")
+        # Average the deviations from one sample to keep the precision of values like 375 THz
+        used = weights > 0
+        ref = self.value[used][0]
+        dev = np.where(used, self.value - ref, 0.0)
+        mean = float((weights * dev).sum() / total + ref)
+        if self.uncertainty is not None:
+            return mean, float(1.0 / np.sqrt(total))
+        n = int(used.sum())
+        if n < 2:
+            return mean, float("nan")
+        return mean, float(dev[used].std(ddof=1) / np.sqrt(n))
+
+
+def status_codes(value: np.ndarray) -> np.ndarray:
+    """
+    Returns the status column for raw wavemeter values: STATUS_OK for measured values and the
+    wlmData error code for error values (values <= 0).
+    """
+    value = np.asarray(value, dtype=np.float64)
+    return np.where(value > 0, STATUS_OK, value).astype(np.int16)
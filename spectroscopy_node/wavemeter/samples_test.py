@@ -0,0 +1,159 @@
+import numpy as np
+import pytest
+
+import wlmConst
+from samples import (
+    SOURCES,
+    STATUS_OK,
+    ErrorCounts,
+    SampleBatch,
+    SamplePoint,
+    classify,
+    count_errors,
+    count_errors_by_window,
+    status_codes,
+)
+
+
+# TESTING SampleBatch IN ISOLATION:
+class TestSampleBatch:
+    def test_from_values_derives_status_and_broadcasts(self):
+        value = np.array([375.0, wlmConst.ErrNoSignal, 375.1, wlmConst.ErrBigSignal])
+        batch = SampleBatch.from_values(np.arange(4), value, channel=2, source="probe")
+        assert batch.status.tolist() == [
+            STATUS_OK,
+            wlmConst.ErrNoSignal,
+            STATUS_OK,
+            wlmConst.ErrBigSignal,
+        ]
+        assert batch.channel.tolist() == [2] * 4
+        assert batch.mode.tolist() == [wlmConst.cmiFrequency1] * 4
+        assert batch.source_names() == ["probe"] * 4
+        assert batch.exposure is None
+        assert batch.valid.tolist() == [True, False, True, False]
+
+    def test_sources_are_interned(self):
+        assert SOURCES.intern("a") == SOURCES.intern("a")
+        assert SOURCES.intern("a") != SOURCES.intern("b")
+        assert SOURCES.name(SOURCES.intern("b")) == "b"
+
+    def test_from_points(self):
+        points = [SamplePoint(i, 375.0, "cb", host_t=100 + i) for i in range(3)]
+        batch = SampleBatch.from_points(points)
+        assert batch.t.tolist() == [100, 101, 102]
+        assert batch.source_names() == ["cb"] * 3
+
+    def test_quality_columns_mark_errors_as_nan(self):
+        batch = SampleBatch.from_values(
+            np.arange(3), np.full(3, 375.0), exposure=[10, wlmConst.ErrLowSignal, 12]
+        )
+        assert np.isnan(batch.exposure[1])
+        assert batch.mask(min_exposure=5).tolist() == [True, False, True]
+
+    def test_mask_and_select(self):
+        batch = SampleBatch.from_values(
+            np.arange(6),
+            np.array([375.0, -1.0, 375.0, 375.0, 375.0, 375.0]),
+            channel=np.array([1, 1, 2, 1, 2, 1]),
+            linewidth=np.array([1, 1, 1, 9, 1, 1]) * 1e-6,
+        )
+        assert batch.select(channel=1, max_linewidth=5e-6).t.tolist() == [0, 5]
+        assert batch.mask(valid=False, channel=2).tolist() == [
+            False,
+            False,
+            True,
+            False,
+            True,
+            False,
+        ]
+        with pytest.raises(ValueError):
+            batch.mask(max_uncertainty=1.0)
+
+    def test_weighted_mean_uses_uncertainty(self):
+        batch = SampleBatch.from_values(
+            np.arange(3),
+            np.array([375.0, 375.0 + 3e-6, wlmConst.ErrNoSignal]),
+            uncertainty=np.array([1e-6, 2e-6, 1e-6]),
+        )
+        mean, error = batch.weighted_mean()
+        # Weights 1 and 1/4: the mean is 1/5 of the way to the second value
+        assert mean == pytest.approx(375.0 + 0.6e-6, abs=1e-12)
+        assert error == pytest.approx(1e-6 / np.sqrt(1.25))
+
+    def test_weighted_mean_without_uncertainty(self):
+        values = np.array([375.0, 375.0 + 2e-6, -3.0])
+        mean, error = SampleBatch.from_values(np.arange(3), values).weighted_mean()
+        assert mean == pytest.approx(375.0 + 1e-6, abs=1e-12)
+        assert error == pytest.approx(np.std(values[:2] - 375.0, ddof=1) / np.sqrt(2))
+        empty = SampleBatch.from_values(np.arange(1), np.array([-1.0]))
+        assert np.isnan(empty.weighted_mean()[0])
+
+    def test_concat_and_indexing(self):
+        a = SampleBatch.from_values(np.arange(2), np.full(2, 375.0), exposure=10)
+        b = SampleBatch.from_values(np.arange(2, 5), np.full(3, 376.0))
+        batch = SampleBatch.concat([a, b])
+        assert len(batch) == 5
+        assert batch.exposure[:2].tolist() == [10.0, 10.0]
+        assert np.isnan(batch.exposure[2:]).all()
+        assert batch.uncertainty is None
+        assert batch[1:3].value.tolist() == [375.0, 376.0]
+        assert len(SampleBatch.concat([])) == 0
+
+
+def test_status_codes():
+    codes = status_codes(np.array([0.0, -2.0, 1.5]))
+    assert codes.dtype == np.int16
+    assert codes.tolist() == [wlmConst.ErrNoValue, wlmConst.ErrBadSignal, STATUS_OK]
+
+
+# TESTING THE STATUS CLASSIFICATION:
+class TestErrorClassification:
+    STATUS = np.array(
+        [
+            STATUS_OK,
+            wlmConst.ErrNoSignal,
+            wlmConst.ErrBadSignal,
+            wlmConst.ErrLowSignal,
+            wlmConst.ErrBigSignal,
+            wlmConst.ErrNoValue,
+            wlmConst.ErrWlmMissing,
+            wlmConst.ErrTempNotMeasured,
+            STATUS_OK,
+        ]
+    )
+
+    def test_classify(self):
+        assert classify(self.STATUS).tolist() == [0, 1, 2, 3, 4, 5, 5, 5, 0]
+
+    def test_count_errors(self):
+        counts = count_errors(self.STATUS)
+        assert counts == ErrorCounts(2, 1, 1, 1, 1, 3)
+        assert counts.total == 9
+        assert counts.error_fraction == pytest.approx(7 / 9)
+        assert count_errors(np.zeros(0)).error_fraction == 0.0
+
+    def test_count_errors_with_counts(self):
+        counts = count_errors(
+            np.array([STATUS_OK, wlmConst.ErrLowSignal]), np.array([10, 3])
+        )
+        assert counts.ok == 10 and counts.low_signal == 3
+
+    def test_count_errors_by_window(self):
+        t = np.arange(len(self.STATUS))
+        by_window = count_errors_by_window(t, self.STATUS, np.array([1, 4, 8]))
+        assert by_window.tolist() == [[0, 1, 1, 1, 0, 0], [0, 0, 0, 0, 1, 3]]
+
+    def test_batch_error_counts(self):
+        value = np.where(self.STATUS == STATUS_OK, 375.0, self.STATUS)
+        batch = SampleBatch.from_values(np.arange(len(value)) * 10, value)
+        assert batch.error_counts() == count_errors(self.STATUS)
+        assert batch.error_counts_by_window(np.array([0, 45, 90])).sum(
+            axis=0
+        ).tolist() == [
+            2,
+            1,
+            1,
+            1,
+            1,
+            3,
+        ]
@@ -1,21 +1,30 @@
-from wavemeter import WavemeterWS7
-from dataclasses import dataclass, field
-from typing import Optional, Callable, Protocol, Union
-import queue, threading, time
+from wavemeter import (
+    WavemeterWS7,
+    WavemeterWS7Exception,
+    WavemeterWS7BadSignalException,
+    WavemeterWS7HighSignalException,
+    WavemeterWS7LowSignalException,
+    WavemeterWS7NoSignalException,
+)
+import wlmConst
+from samples import STATUS_OK, ErrorCounts, SampleBatch, SamplePoint, count_errors
+from clock import ClockModel
+from streaming import BatchStream
+from buffers import (
+    DEFAULT_RING_CAPACITY,
+    BufferStats,
+    RingBuffer,
+    RingQueueAdapter,
+    drain_queue,
+    snapshot_queue,
+)
+from dataclasses import dataclass, replace
+from typing import AsyncIterator, Optional, Callable, Protocol, Sequence, Union
+import asyncio, logging, math, queue, threading, time
+import numpy as np
 from abc import ABC, abstractmethod
 
-
-@dataclass(frozen=True, slots=True)
-# frozen=True makes the dataclass immutable, slots=True saves memory by using __slots__ (a continous array) instead of a dict for attributes
-class SamplePoint:
-    """
-    A class representing a sample point from the wavemeter.
-    """
-
-    t: int  # Timestamp of the sample point in milliseconds
-    value: float  # Frequency value of the sample point
-    # this keeps the source from being printed when the SamplePoint is printed, but it can still be accessed as an attribute
-    source: str = field(repr=False)
+logger = logging.getLogger(__name__)
 
 
 class PollingStrategy(Protocol):
@@ -40,39 +49,305 @@ class CallbackStrategy(Protocol):
     def __call__(self, mode: int, intval: int, dblval: float) -> SamplePoint: ...
 
 
+class SampleConsumer(Protocol):
+    """
+    A protocol for processing stages that schedulers update as samples arrive (e.g. stats.OnlineStats).
+    Both methods are called from the acquisition thread and must return quickly.
+    """
+
+    # Add one sample, t is the host time of the sample in nanoseconds
+    def update(self, t: int, value: float) -> None: ...
+
+    # Add a block of samples
+    def update_many(self, t: np.ndarray, value: np.ndarray) -> None: ...
+
+
+# Callback modes that carry a frequency measurement, mapped to the source recorded with the sample
+_FREQUENCY_EVENT_SOURCES = {
+    wlmConst.cmiFrequency1: "cmiFrequency1",
+    wlmConst.cmiFrequency2: "cmiFrequency2",
+}
+
+
+# wlmData error code of each exception get_frequency raises, for counting failed polls
+_EXCEPTION_ERROR_CODES = {
+    WavemeterWS7Exception: wlmConst.ErrWlmMissing,  # raised as "WLM inactive"
+    WavemeterWS7NoSignalException: wlmConst.ErrNoSignal,
+    WavemeterWS7BadSignalException: wlmConst.ErrBadSignal,
+    WavemeterWS7LowSignalException: wlmConst.ErrLowSignal,
+    WavemeterWS7HighSignalException: wlmConst.ErrBigSignal,
+}
+
+
+def _wait_until(
+    deadline_ns: int, spin_ns: int, stop_event: Optional[threading.Event] = None
+) -> bool:
+    """
+    Sleeps until spin_ns before a time.monotonic_ns deadline, then busy-waits until the deadline,
+    because sleeping alone can wake up a scheduler tick late.
+    Returns False if stop_event was set while sleeping.
+    """
+    remaining = deadline_ns - time.monotonic_ns() - spin_ns
+    if remaining > 0:
+        if stop_event is None:
+            time.sleep(remaining / 1e9)
+        elif stop_event.wait(remaining / 1e9):
+            return False
+    while time.monotonic_ns() < deadline_ns:
+        pass
+    return True
+
+
+@dataclass(frozen=True, slots=True)
+class StartTiming:
+    """
+    How precisely BaseScheduler.start_at started the acquisition.
+    """
+
+    deadline_ns: int  # The requested start time (time.monotonic_ns)
+    error_ns: int  # How late the wait ended relative to the deadline
+    start_call_ns: int  # How long start() took after the wait (thread start, callback registration)
+
+
+def _check_callback_buffer(buffer: Optional[RingBuffer]) -> None:
+    # Buffers written from the DLL's callback thread must never make it wait
+    if buffer is not None and buffer.policy == "block":
+        raise ValueError(
+            'The "block" policy would block the DLL callback thread, use another buffer policy.'
+        )
+
+
+def frequency_event_strategy(
+    mode: int, intval: int, dblval: float
+) -> Optional[SamplePoint]:
+    """
+    The default CallbackStrategy.
+    Returns a SamplePoint for cmiFrequency1/cmiFrequency2 events (intval is the wavemeter timestamp in ms)
+    and None for every other event mode.
+    """
+    source = _FREQUENCY_EVENT_SOURCES.get(mode)
+    if source is None:
+        return None
+    return SamplePoint(intval, dblval, source)
+
+
 class BaseScheduler(ABC):
     def __init__(
         self,
         device: WavemeterWS7,
         acquisition_strategy: Union[PollingStrategy, CallbackStrategy],
         threaded: bool = False,
+        buffer: Optional[RingBuffer] = None,
     ):
         """
         Initializes the BaseScheduler with a WavemeterWS7 object.
 
         Args:
             device (WavemeterWS7): The wavemeter object to use for frequency events.
+            buffer (RingBuffer, optional): Preallocated storage for the samples, bounded by its capacity
+                and policy (see RingBuffer). Defaults to None, which stores SamplePoint objects in an
+                unbounded queue.Queue.
         """
 
         self._acq_strat = acquisition_strategy
         self._device = device
-        self._data_buffer: queue.Queue[SamplePoint] = queue.Queue()
+        self._data_buffer: Union[queue.Queue[SamplePoint], RingBuffer]
+        if buffer is None:
+            self._data_buffer = queue.Queue()
+            self._data_view = self._data_buffer
+        else:
+            self._data_buffer = buffer
+            # Keeps the queue.Queue interface of the data property working on top of the ring
+            self._data_view = RingQueueAdapter(buffer)
         self._stop_event = threading.Event()
         self._running = False
         self._threaded = threaded
         self._thread = None
+        # Maps device timestamps to host time, set by schedulers whose samples carry a device timestamp
+        self._clock: Optional[ClockModel] = None
+        # Replaced (never mutated) on add/remove, so the acquisition thread can iterate it without a lock
+        self._consumers: tuple[SampleConsumer, ...] = ()
+        # When False, samples only go to the consumers (e.g. a reducing Pipeline), not into the buffer
+        self._store_raw = True
+        # The deadline of the last start_at, for schedulers that align their sampling to it
+        self._start_deadline: Optional[int] = None
+        self._start_timing: Optional[StartTiming] = None
+        # Persistent mode (see open): the worker thread or callback registration outlives start/stop,
+        # _armed gates whether samples are recorded
+        self._persistent = False
+        self._armed = False
+        self._closing = False
+        self._wake = threading.Event()  # arm or close for the persistent worker
+        self._idle = threading.Event()  # the persistent worker is not inside _run_loop
+        self._idle.set()
 
     # public API
     @property
-    def data(self) -> queue.Queue[SamplePoint]:
-        # Returns the queue holding frequency data.
-        return self._data_buffer
+    def data(self) -> Union[queue.Queue[SamplePoint], RingQueueAdapter]:
+        # Returns the queue holding frequency data (a queue.Queue compatible adapter when using a RingBuffer).
+        return self._data_view
 
     @property
     def is_running(self) -> bool:
         # Returns whether the scheduler is currently running.
         return self._running
 
+    @property
+    def store_raw(self) -> bool:
+        # Returns whether raw samples are kept in the scheduler's buffer.
+        return self._store_raw
+
+    @store_raw.setter
+    def store_raw(self, store: bool) -> None:
+        # Set to False to pass samples only to the consumers, e.g. when a Pipeline keeps the reduced stream.
+        self._store_raw = store
+
+    @property
+    def buffer_stats(self) -> Optional[BufferStats]:
+        # Returns the fill level and drop counters of the buffer (None for the unbounded queue.Queue).
+        if isinstance(self._data_buffer, RingBuffer):
+            return self._data_buffer.stats
+        return None
+
+    @property
+    def is_open(self) -> bool:
+        # Returns whether the scheduler is in persistent mode (between open and close).
+        return self._persistent
+
+    @property
+    def start_timing(self) -> Optional[StartTiming]:
+        # Returns the start error of the last start_at (None if it was not started with start_at).
+        return self._start_timing
+
+    @property
+    def device(self) -> WavemeterWS7:
+        # Returns the wavemeter the scheduler acquires from.
+        return self._device
+
+    @property
+    def clock(self) -> Optional[ClockModel]:
+        # Returns the device-to-host clock model (None if the scheduler stamps host time directly).
+        return self._clock
+
+    @clock.setter
+    def clock(self, clock: ClockModel) -> None:
+        # Replaces the clock model while the scheduler is stopped and closed. A ClockModel has a single
+        # writer and fits a single device counter: only share one between schedulers that stamp on the
+        # same thread from the same WLM instance (the callback schedulers of one instance).
+        if self._clock is None:
+            raise ValueError(f"{type(self).__name__} stamps host time directly.")
+        if self._running or self._persistent:
+            raise RuntimeError(
+                "The clock model can only be replaced while stopped and closed."
+            )
+        self._clock = clock
+
+    def add_consumer(self, consumer: SampleConsumer) -> None:
+        """
+        Registers a consumer that is updated with every sample as it is acquired.
+        """
+        self._consumers = self._consumers + (consumer,)
+
+    def remove_consumer(self, consumer: SampleConsumer) -> None:
+        self._consumers = tuple(c for c in self._consumers if c is not consumer)
+
+    def _notify(self, host_t: int, value: float) -> None:
+        for consumer in self._consumers:
+            consumer.update(host_t, value)
+
+    def _notify_many(self, host_t: np.ndarray, value: np.ndarray) -> None:
+        for consumer in self._consumers:
+            consumer.update_many(host_t, value)
+
+    def drain(self, timebase: str = "device") -> tuple[np.ndarray, np.ndarray]:
+        """
+        Removes every buffered sample and returns them as (t, value) NumPy arrays in one call.
+
+        Failed polls and events are kept as their wlmData error codes (values <= 0), so mask them
+        before averaging.
+
+        Example (per-step frequency averaging):
+            t, freq = scheduler.drain()
+            freq = freq[freq > 0]
+            avg_freq, stddev = freq.mean(), freq.std()
+
+        Args:
+            timebase (str): "device" returns the sample timestamps t,
+                "host" returns their host times (time.monotonic_ns).
+        """
+        if isinstance(self._data_buffer, RingBuffer):
+            return self._data_buffer.drain(timebase)
+        return drain_queue(self._data_buffer, timebase)
+
+    def drain_batch(self, source: str = "") -> SampleBatch:
+        """
+        Removes every buffered sample and returns them as a SampleBatch on host time, with the status
+        column derived from the values (error events and polls keep the wlmData error code as value).
+
+        Example (reject noisy steps):
+            batch = scheduler.drain_batch()
+            if batch.error_counts().error_fraction > 0.1:
+                ...
+
+        Args:
+            source (str): The source name stored with the samples.
+        """
+        t, value = self.drain("host")
+        return SampleBatch.from_values(t, value, source=source)
+
+    def snapshot(
+        self, since: Optional[int] = None, timebase: str = "device"
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the buffered samples as (t, value) NumPy arrays without removing them.
+
+        Args:
+            since (int, optional): Only return samples with a timestamp >= since.
+            timebase (str): "device" filters and returns t, "host" filters and returns host times.
+        """
+        if isinstance(self._data_buffer, RingBuffer):
+            return self._data_buffer.snapshot(since, timebase)
+        return snapshot_queue(self._data_buffer, since, timebase)
+
+    async def stream(
+        self,
+        max_batch: int = 256,
+        max_latency: float = 0.05,
+        idle_check: float = 0.1,
+    ) -> AsyncIterator[tuple[np.ndarray, np.ndarray]]:
+        """
+        Yields the samples acquired from now on as (host time ns, value) batches on the running event loop.
+
+        Example:
+            async for t, freq in scheduler.stream(max_batch=100, max_latency=0.02):
+                await send(freq.mean())
+
+        Samples are handed over from the acquisition thread with coalesced call_soon_threadsafe calls
+        (see BatchStream), so no thread has to block on the data queue. The stream ends once the
+        scheduler has stopped and every sample has been yielded.
+
+        Args:
+            max_batch (int): The maximum number of samples per batch.
+            max_latency (float): The longest a sample waits before its batch is yielded, in seconds.
+            idle_check (float): How often to check whether the scheduler stopped while no samples arrive.
+        """
+        batches = BatchStream(asyncio.get_running_loop(), max_batch, max_latency)
+        self.add_consumer(batches)
+        try:
+            while True:
+                batch = await batches.get(idle_check)
+                if batch is not None:
+                    yield batch
+                elif not self._running:
+                    break
+            self.remove_consumer(batches)
+            for batch in batches.close():
+                yield batch
+        finally:
+            # Also reached when the caller stops iterating early
+            self.remove_consumer(batches)
+            batches.close()
+
     @abstractmethod
     def _run_loop(self):
         """Implement this loop in each scheduler subclass.
@@ -80,7 +355,10 @@ class BaseScheduler(ABC):
         ...
 
     def start(self):
-        """Start the scheduler. Optionally runs in a background thread."""
+        """Start the scheduler. Optionally runs in a background thread. Arms it in persistent mode."""
+        if self._persistent:
+            self.arm()
+            return
         self._stop_event.clear()
         self._running = True
 
@@ -90,62 +368,874 @@ class BaseScheduler(ABC):
         else:
             self._run_loop()
 
+    def start_at(
+        self, deadline_ns: int, spin_us: float = 300.0
+    ) -> Optional[StartTiming]:
+        """
+        Starts the scheduler at a time.monotonic_ns deadline, e.g. a start time agreed with another node.
+        Blocks the caller by sleeping until spin_us before the deadline and busy-waiting the rest, then
+        calls start(). Polling schedulers align their first poll to the deadline.
+
+        Args:
+            deadline_ns (int): The start time in time.monotonic_ns nanoseconds.
+            spin_us (float): Busy-wait this many microseconds before the deadline instead of sleeping.
+
+        Returns:
+            StartTiming: The measured start error (also kept in start_timing), or None if stop() was
+                called while waiting.
+        """
+        self._stop_event.clear()
+        if not _wait_until(deadline_ns, int(spin_us * 1e3), self._stop_event):
+            return None
+        woke = time.monotonic_ns()
+        self._start_deadline = deadline_ns
+        self.start()
+        self._start_timing = StartTiming(
+            deadline_ns, woke - deadline_ns, time.monotonic_ns() - woke
+        )
+        return self._start_timing
+
     def stop(self):
-        """Tell the loop to stop. The loop should check this event and exit."""
+        """Tell the loop to stop. The loop should check this event and exit. Disarms in persistent mode."""
+        if self._persistent:
+            self.disarm()
+            return
         self._stop_event.set()
         self._running = False
         # TODO: If running in a thread, join? TODO: check if below is correct
         if self._threaded and self._thread is not None:
             self._thread.join()
 
+    def open(self) -> None:
+        """
+        Switches to persistent mode for many short acquisitions, e.g. one per scan step.
+
+        start() creates a new thread (threaded schedulers) or registers a new callback with the DLL
+        (callback schedulers) every time, and stop() tears it down again. After open(), the worker thread
+        is started or the callback registered once, disarmed; start()/stop() then only arm and disarm
+        it, which costs an event handshake instead of a thread or DLL callback per step:
+            scheduler.open()
+            for step in scan:
+                scheduler.start()  # arm
+                ...
+                scheduler.stop()  # disarm
+                t, freq = scheduler.drain()
+            scheduler.close()
+
+        Raises RuntimeError for a non-threaded scheduler without a persistent callback (e.g. an
+        IntervalScheduler with threaded=False).
+        """
+        if self._persistent:
+            return
+        if self._running:
+            self.stop()
+        self._armed = False
+        self._stop_event.set()
+        if self._threaded:
+            self._closing = False
+            self._wake.clear()
+            self._idle.set()
+            self._thread = threading.Thread(target=self._worker_loop, daemon=True)
+            self._thread.start()
+        else:
+            # Before switching modes, so a scheduler without one is left as it was
+            self._open_callback()
+        self._persistent = True
+
+    def close(self) -> None:
+        """
+        Disarms and leaves persistent mode: stops the worker thread or removes the callback.
+        """
+        if not self._persistent:
+            return
+        self.disarm()
+        self._persistent = False
+        if self._threaded:
+            self._closing = True
+            self._wake.set()
+            if self._thread is not None:
+                self._thread.join()
+        else:
+            self._close_callback()
+
+    def arm(self) -> None:
+        """
+        Starts recording on an opened scheduler (see open). Does nothing if it is already running.
+        """
+        if not self._persistent:
+            raise RuntimeError("open() the scheduler before arming it.")
+        if self._running:
+            return
+        if self._threaded:
+            # A run that ended by itself (e.g. a DurationScheduler's) may still be returning
+            self._idle.wait()
+            self._idle.clear()
+        self._on_arm()
+        self._stop_event.clear()
+        self._running = True
+        self._armed = True
+        if self._threaded:
+            self._wake.set()
+
+    def disarm(self) -> None:
+        """
+        Stops recording on an opened scheduler. For threaded schedulers, returns once the worker's
+        run has ended; callback schedulers drop the events arriving afterwards (an event the DLL's
+        callback thread is handling at that moment is still recorded).
+        """
+        self._armed = False
+        self._stop_event.set()
+        self._running = False
+        if self._threaded:
+            self._idle.wait()
+
+    def _worker_loop(self) -> None:
+        """The persistent worker of threaded schedulers: one _run_loop per arm, until close."""
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            if self._closing:
+                return
+            try:
+                self._run_loop()
+            finally:
+                self._idle.set()
+
+    def _gated(self, handler: Callable) -> Callable:
+        """Wraps a callback handler so it only runs while the scheduler is armed."""
+
+        def gated(*args):
+            if self._armed:
+                handler(*args)
+
+        return gated
+
+    def _open_callback(self) -> None:
+        """Registers the persistent, gated callback of a non-threaded scheduler."""
+        raise RuntimeError(
+            f"{type(self).__name__} has no persistent mode when it is not threaded."
+        )
+
+    def _close_callback(self) -> None:
+        """Removes the persistent callback (only called after _open_callback succeeded)."""
+
+    def _on_arm(self) -> None:
+        """Resets per-run state when the scheduler is armed (threaded ones once the last run ended)."""
+
 
 class EventDrivenScheduler(BaseScheduler):
     """
     A scheduler that uses callback events to acquire data from the wavemeter.
     """
 
-    def __init__(self, wavemeter: WavemeterWS7, acquisition_strategy: CallbackStrategy):
-        super().__init__(wavemeter, acquisition_strategy, threaded=False)
+    def __init__(
+        self,
+        wavemeter: WavemeterWS7,
+        acquisition_strategy: Optional[CallbackStrategy] = None,
+        buffer: Optional[RingBuffer] = None,
+        clock: Optional[ClockModel] = None,
+    ):
+        """
+        Args:
+            wavemeter (WavemeterWS7): The wavemeter object to use for frequency events.
+            acquisition_strategy (CallbackStrategy, optional): Converts callback events into SamplePoints.
+                Defaults to None, which records cmiFrequency1/cmiFrequency2 events (see frequency_event_strategy).
+            buffer (RingBuffer, optional): Preallocated storage for the samples.
+                When given without an acquisition_strategy, events are written straight into the ring
+                without creating a SamplePoint per event. Its policy must not be "block", the
+                callback must never block the DLL's callback thread.
+            clock (ClockModel, optional): Maps the events' millisecond timestamps to host time.
+                Defaults to a new ClockModel; pass a shared one if several schedulers use the same wavemeter.
+        """
+        _check_callback_buffer(buffer)
+        self._direct_to_ring = acquisition_strategy is None and buffer is not None
+        if acquisition_strategy is None:
+            acquisition_strategy = frequency_event_strategy
+        super().__init__(wavemeter, acquisition_strategy, threaded=False, buffer=buffer)
+        self._clock = clock if clock is not None else ClockModel()
 
     def callback_handler(self, mode: int, intval: int, dblval: float) -> None:
         """
         Callback function to handle frequency events from the wavemeter.
         Converts the event data into a SamplePoint and puts it in the queue.
+        Samples without a host time are stamped through the clock model.
         """
         sample_point = self._acq_strat(mode, intval, dblval)
         if sample_point is not None:
             # Ensure the sample point is valid before putting it in the queue
             if isinstance(sample_point, SamplePoint):
                 # TODO: ^may be unnecessary if _acq_strat always returns a SamplePoint
-                self._data_buffer.put(sample_point)
+                if sample_point.host_t == 0:
+                    sample_point = replace(
+                        sample_point, host_t=self._clock.stamp(sample_point.t)
+                    )
+                if self._store_raw:
+                    self._data_buffer.put(sample_point)
+                # Consumers only get measured values, not the wlmData error codes
+                if self._consumers and sample_point.value > 0:
+                    self._notify(sample_point.host_t, sample_point.value)
+
+    def ring_callback_handler(self, mode: int, intval: int, dblval: float) -> None:
+        """
+        Callback function used with a RingBuffer and the default strategy.
+        Writes frequency events straight into the ring's columns, so no object is allocated per event.
+        """
+        source = _FREQUENCY_EVENT_SOURCES.get(mode)
+        if source is not None:
+            host_t = self._clock.stamp(intval)
+            if self._store_raw:
+                self._data_buffer.append(  # type: ignore[union-attr]
+                    intval, dblval, source, 0, host_t
+                )
+            if self._consumers and dblval > 0:
+                self._notify(host_t, dblval)
+
+    def _event_handler(self) -> Callable:
+        """Returns the handler that is registered with the wavemeter."""
+        if self._direct_to_ring:
+            return self.ring_callback_handler
+        return self.callback_handler
+
+    def _register(self, handler: Callable) -> None:
+        self._device.register_frequency_callback(handler)
 
     def _run_loop(self):
         """Run the event-driven loop."""
-        self._device.register_frequency_callback(self.callback_handler)
+        self._register(self._event_handler())
+
+    def _open_callback(self) -> None:
+        self._register(self._gated(self._event_handler()))
+
+    def _close_callback(self) -> None:
+        self._device.unregister_frequency_callback()
 
     def stop(self):
         """Stop the event-driven scheduler."""
+        if self._persistent:
+            super().stop()
+            return
+        self._stop_event.set()  # also cancels a pending start_at
         self._device.unregister_frequency_callback()
         self._running = False
 
 
+class SwitcherScheduler(EventDrivenScheduler):
+    """
+    An event-driven scheduler for a multi-channel fiber switcher.
+
+    Installs the extended callback (CALLBACK_EX_TYPE) and demultiplexes every frequency event into a
+    per-channel RingBuffer inside the callback:
+        - cmiSwitcherChannel events tell us which switcher channel the following measurements belong to
+        - cmiFrequency1/cmiFrequency2 events are recorded in the buffer of the current switcher channel
+    Events for channels that are not in `channels` are dropped.
+
+    The BaseScheduler API (data, drain, snapshot) refers to the first channel in `channels`,
+    use the *_channel methods for the others.
+    """
+
+    def __init__(
+        self,
+        wavemeter: WavemeterWS7,
+        channels: Sequence[int],
+        capacity: int = DEFAULT_RING_CAPACITY,
+        clock: Optional[ClockModel] = None,
+        policy: str = "drop_oldest",
+    ):
+        """
+        Args:
+            wavemeter (WavemeterWS7): The wavemeter object to use for frequency events.
+            channels (Sequence[int]): The switcher channels (1-based) to record.
+            capacity (int): The capacity of each channel's RingBuffer.
+            clock (ClockModel, optional): Maps the events' millisecond timestamps to host time.
+            policy (str): The RingBuffer policy of each channel's buffer (anything but "block").
+        """
+        if not channels:
+            raise ValueError("SwitcherScheduler needs at least one channel.")
+
+        self._channel_buffers = {ch: RingBuffer(capacity, policy) for ch in channels}
+        self._channel_views = {
+            ch: RingQueueAdapter(ring) for ch, ring in self._channel_buffers.items()
+        }
+        self._channel_consumers: dict[int, tuple[SampleConsumer, ...]] = {
+            ch: () for ch in channels
+        }
+        # The switcher channel the next measurement belongs to, updated by cmiSwitcherChannel events
+        self._switcher_channel = channels[0]
+        super().__init__(
+            wavemeter, buffer=self._channel_buffers[channels[0]], clock=clock
+        )
+
+    @property
+    def channels(self) -> list[int]:
+        return list(self._channel_buffers)
+
+    def channel_stats(self, channel: int) -> BufferStats:
+        # Returns the fill level and drop counters of one channel's buffer.
+        return self._channel_buffers[channel].stats
+
+    def channel_data(self, channel: int) -> RingQueueAdapter:
+        # Returns a queue.Queue compatible view of one channel's samples.
+        return self._channel_views[channel]
+
+    def drain_channel(
+        self, channel: int, timebase: str = "device"
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Removes every buffered sample of one channel and returns them as (t, value) arrays."""
+        return self._channel_buffers[channel].drain(timebase)
+
+    def snapshot_channel(
+        self, channel: int, since: Optional[int] = None, timebase: str = "device"
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Returns one channel's buffered samples as (t, value) arrays without removing them."""
+        return self._channel_buffers[channel].snapshot(since, timebase)
+
+    def drain_all(
+        self, timebase: str = "device"
+    ) -> dict[int, tuple[np.ndarray, np.ndarray]]:
+        """Drains every channel, returns {channel: (t, value)}."""
+        return {ch: ring.drain(timebase) for ch, ring in self._channel_buffers.items()}
+
+    def add_consumer(
+        self, consumer: SampleConsumer, channel: Optional[int] = None
+    ) -> None:
+        """
+        Registers a consumer for one channel's samples (defaults to the first channel).
+        """
+        if channel is None:
+            channel = self.channels[0]
+        self._channel_consumers[channel] = self._channel_consumers[channel] + (
+            consumer,
+        )
+
+    def remove_consumer(
+        self, consumer: SampleConsumer, channel: Optional[int] = None
+    ) -> None:
+        if channel is None:
+            channel = self.channels[0]
+        self._channel_consumers[channel] = tuple(
+            c for c in self._channel_consumers[channel] if c is not consumer
+        )
+
+    def latest_frequency(self, channel: int) -> float:
+        """
+        Polls the current frequency of a channel (GetFrequencyNum) without waiting for an event,
+        e.g. to check every laser is locked before starting the acquisition.
+        """
+        return self._device.get_frequency_num(channel)
+
+    def callback_ex_handler(
+        self, ver: int, mode: int, intval: int, dblval: float, res1: int
+    ) -> None:
+        """
+        Extended callback function: routes frequency events to the current switcher channel's buffer.
+        """
+        if mode == wlmConst.cmiSwitcherChannel:
+            self._switcher_channel = intval
+            return
+
+        source = _FREQUENCY_EVENT_SOURCES.get(mode)
+        if source is None:
+            return
+        channel = self._switcher_channel
+        ring = self._channel_buffers.get(channel)
+        if ring is not None:
+            host_t = self._clock.stamp(intval)
+            if self._store_raw:
+                ring.append(intval, dblval, source, channel, host_t)
+            if dblval > 0:
+                for consumer in self._channel_consumers[channel]:
+                    consumer.update(host_t, dblval)
+
+    def _event_handler(self) -> Callable:
+        return self.callback_ex_handler
+
+    def _register(self, handler: Callable) -> None:
+        """Register the extended callback."""
+        self._device.register_frequency_callback_ex(handler)
+
+
+class TriggeredScheduler(BaseScheduler):
+    """
+    A scheduler where every wavemeter measurement is started by a trigger and tagged with the trigger's index.
+
+    start() switches the wavemeter to triggered mode (see WavemeterWS7.start_triggered_mode) and registers
+    the callback, stop() resumes free-running measurement. Measurements are then started either
+        - by software: trigger() starts one measurement and returns its index 0, 1, 2, ...
+        - by an external trigger (external=True): pulses on the WLM's trigger input, e.g. from the DAQ
+          clock, indexed in the order their measurements arrive.
+    The k-th measurement belongs to trigger k, so it pairs one to one with the k-th DAQ sample block,
+    without aligning timestamps:
+        scheduler.start()
+        for k in range(n_blocks):
+            index = scheduler.trigger()  # together with DAQ block k
+        index, t, freq = scheduler.drain_triggered()
+    A failed measurement keeps its index (with the wlmData error code as value), so the pairing never shifts.
+    Only cmiFrequency1 events count as measurements.
+    """
+
+    def __init__(
+        self,
+        wavemeter: WavemeterWS7,
+        external: bool = False,
+        buffer: Optional[RingBuffer] = None,
+        clock: Optional[ClockModel] = None,
+    ):
+        """
+        Args:
+            wavemeter (WavemeterWS7): The wavemeter object to trigger.
+            external (bool): Measurements are triggered by the WLM's trigger input instead of trigger().
+            buffer (RingBuffer, optional): Storage for the samples (drain, snapshot, data), as in
+                EventDrivenScheduler. Its policy must not be "block".
+            clock (ClockModel, optional): Maps the events' millisecond timestamps to host time.
+        """
+        _check_callback_buffer(buffer)
+        super().__init__(
+            wavemeter, frequency_event_strategy, threaded=False, buffer=buffer
+        )
+        self._clock = clock if clock is not None else ClockModel()
+        self._external = external
+        self._trigger_lock = threading.Lock()
+        self._measured = threading.Condition()
+        self._reset_triggers()
+
+    def _reset_triggers(self) -> None:
+        self._sent = 0  # software triggers accepted by the wavemeter
+        self._received = 0  # measurements received, the index of the next one
+        self._stray = 0  # measurements without a trigger, ignored
+        self._index: list[int] = []
+        self._t: list[int] = []
+        self._value: list[float] = []
+
+    @property
+    def triggers_sent(self) -> int:
+        return self._sent
+
+    @property
+    def measurements_received(self) -> int:
+        return self._received
+
+    @property
+    def stray_measurements(self) -> int:
+        # Returns the number of measurements that arrived without an outstanding software trigger.
+        return self._stray
+
+    def trigger(self) -> int:
+        """
+        Starts one measurement and returns its trigger index.
+        Raises WavemeterWS7Exception if the wavemeter rejects the trigger (e.g. ResERR_TriggerPending while
+        the previous measurement is not done; see wait_for_measurement).
+        """
+        if self._external:
+            raise RuntimeError("This TriggeredScheduler is triggered externally.")
+        if not self._running:
+            raise RuntimeError("Start the TriggeredScheduler before triggering.")
+        with self._trigger_lock:
+            index = self._sent
+            # Count the trigger first, its measurement can arrive before TriggerMeasurement returns
+            self._sent += 1
+            ret = self._device.trigger()
+            if ret < 0:
+                self._sent -= 1
+                raise WavemeterWS7Exception(f"Trigger rejected (ResERR {ret})")
+        return index
+
+    def wait_for_measurement(self, index: int, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until the measurement of trigger `index` has arrived. Returns False on timeout.
+        """
+        with self._measured:
+            return self._measured.wait_for(lambda: self._received > index, timeout)
+
+    def drain_triggered(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Removes the measurements received so far and returns them as (trigger index, host time ns, value)
+        arrays. Values <= 0 are the wlmData error codes of failed measurements.
+        """
+        with self._measured:
+            index, t, value = self._index, self._t, self._value
+            self._index, self._t, self._value = [], [], []
+        return (
+            np.array(index, dtype=np.int64),
+            np.array(t, dtype=np.int64),
+            np.array(value, dtype=np.float64),
+        )
+
+    def trigger_callback_handler(self, mode: int, intval: int, dblval: float) -> None:
+        """
+        Callback function: tags each measurement with the index of the trigger that started it.
+        """
+        if mode != wlmConst.cmiFrequency1:
+            return
+        if not self._external and self._received >= self._sent:
+            self._stray += (
+                1  # e.g. the last free-running measurement before the interrupt
+            )
+            return
+        host_t = self._clock.stamp(intval)
+        with self._measured:
+            self._index.append(self._received)
+            self._t.append(host_t)
+            self._value.append(dblval)
+            self._received += 1
+            self._measured.notify_all()
+        if self._store_raw:
+            if isinstance(self._data_buffer, RingBuffer):
+                self._data_buffer.append(intval, dblval, "cmiFrequency1", 0, host_t)
+            else:
+                self._data_buffer.put(
+                    SamplePoint(intval, dblval, "cmiFrequency1", host_t)
+                )
+        if self._consumers and dblval > 0:
+            self._notify(host_t, dblval)
+
+    def _run_loop(self):
+        """Enter triggered mode and register the callback."""
+        self._reset_triggers()
+        self._device.start_triggered_mode()
+        self._device.register_frequency_callback(self.trigger_callback_handler)
+
+    def _open_callback(self) -> None:
+        # Stays in triggered mode until close; measurements arriving while disarmed are dropped
+        self._device.start_triggered_mode()
+        self._device.register_frequency_callback(
+            self._gated(self.trigger_callback_handler)
+        )
+
+    def _close_callback(self) -> None:
+        self._device.unregister_frequency_callback()
+        self._device.stop_triggered_mode()
+
+    def _on_arm(self) -> None:
+        self._reset_triggers()
+
+    def stop(self):
+        """Unregister the callback and resume free-running measurement."""
+        if self._persistent:
+            super().stop()
+            return
+        self._stop_event.set()  # also cancels a pending start_at
+        self._device.unregister_frequency_callback()
+        self._device.stop_triggered_mode()
+        self._running = False
+
+
+class WaitEventScheduler(BaseScheduler):
+    """
+    A scheduler that runs its own acquisition thread over the DLL's wait-event mechanism
+    (WaitForNextWLMEventEx) instead of installing a callback.
+
+    The thread blocks inside the DLL (without holding the GIL) until an event arrives, takes the
+    frequency straight from the event, and collects events into blocks that are published to the
+    RingBuffer with one array write per column. A block is published once it holds `batch_size`
+    events or its oldest event is `max_latency` seconds old.
+
+    The DLL queues the events of every WLM server instance on the host; only those of the device's
+    instance (its version) are kept.
+    """
+
+    def __init__(
+        self,
+        device: WavemeterWS7,
+        buffer: Optional[RingBuffer] = None,
+        batch_size: int = 64,
+        max_latency: float = 0.02,
+        timeout_ms: int = 100,
+        clock: Optional[ClockModel] = None,
+    ):
+        """
+        Args:
+            device (WavemeterWS7): The wavemeter object to use for frequency events.
+            buffer (RingBuffer, optional): Storage for the samples. Defaults to a new RingBuffer.
+            batch_size (int): The number of events collected before a block is published.
+            max_latency (float): The maximum time in seconds an event waits before its block is published.
+            timeout_ms (int): The maximum time a single DLL wait blocks, bounds how long stop() takes.
+                Waits are also capped at max_latency, so a partial block is published when events pause.
+            clock (ClockModel, optional): Maps the events' millisecond timestamps to host time.
+        """
+        if buffer is None:
+            buffer = RingBuffer()
+        super().__init__(device, frequency_event_strategy, threaded=True, buffer=buffer)
+        self._batch_size = batch_size
+        self._max_latency_ns = int(max_latency * 1e9)
+        # The DLL only returns from a wait on an event or on its timeout, so that is when max_latency
+        # is checked
+        self._timeout_ms = max(min(timeout_ms, math.ceil(max_latency * 1e3)), 1)
+        self._clock = clock if clock is not None else ClockModel()
+        # Source codes are resolved once, so the loop only stores small ints
+        self._source_codes = {
+            mode: buffer.source_code(source)
+            for mode, source in _FREQUENCY_EVENT_SOURCES.items()
+        }
+
+    def _publish(self, t: list, value: list, source: list, host_t: list) -> None:
+        value_block = np.array(value, dtype=np.float64)
+        host_t_block = np.array(host_t, dtype=np.int64)
+        if self._store_raw:
+            self._data_buffer.extend(  # type: ignore[union-attr]
+                np.array(t, dtype=np.int64),
+                value_block,
+                np.array(source, dtype=np.uint8),
+                host_t=host_t_block,
+            )
+        if self._consumers:
+            measured = value_block > 0
+            if not measured.all():
+                host_t_block, value_block = (
+                    host_t_block[measured],
+                    value_block[measured],
+                )
+            if len(value_block):
+                self._notify_many(host_t_block, value_block)
+        t.clear()
+        value.clear()
+        source.clear()
+        host_t.clear()
+
+    def _run_loop(self):
+        """
+        Wait for events until the stop event is set, publishing them in blocks.
+        """
+        device = self._device
+        if not self._persistent:
+            device.install_wait_event(self._timeout_ms)
+        device.clear_events()  # drop events queued before the scheduler was started
+
+        source_codes = self._source_codes
+        clock = self._clock
+        version = device.version
+        batch_t: list[int] = []
+        batch_host_t: list[int] = []
+        batch_value: list[float] = []
+        batch_source: list[int] = []
+        batch_started = 0
+
+        try:
+            while not self._stop_event.is_set():
+                ret, ver, mode, intval, dblval, _ = device.wait_for_next_event_ex()
+                if ret < 0:
+                    logger.error(
+                        "Wait-event mechanism is not installed (returned %d)", ret
+                    )
+                    break
+
+                if ret > 0 and ver == version:
+                    code = source_codes.get(mode)
+                    if code is not None:
+                        if not batch_t:
+                            batch_started = time.monotonic_ns()
+                        batch_t.append(intval)
+                        batch_value.append(dblval)
+                        batch_source.append(code)
+                        batch_host_t.append(clock.stamp(intval))
+
+                if batch_t and (
+                    len(batch_t) >= self._batch_size
+                    or time.monotonic_ns() - batch_started >= self._max_latency_ns
+                ):
+                    self._publish(batch_t, batch_value, batch_source, batch_host_t)
+        finally:
+            if batch_t:
+                self._publish(batch_t, batch_value, batch_source, batch_host_t)
+            if not self._persistent:
+                device.remove_wait_event()
+            self._running = False
+
+    def open(self) -> None:
+        """Installs the wait-event mechanism once for all runs (see BaseScheduler.open)."""
+        if self._persistent:
+            return
+        if self._running:
+            self.stop()
+        self._device.install_wait_event(self._timeout_ms)
+        super().open()
+
+    def close(self) -> None:
+        if not self._persistent:
+            return
+        super().close()
+        self._device.remove_wait_event()
+
+
+@dataclass(frozen=True, slots=True)
+class LoopTiming:
+    """
+    Timing statistics of an IntervalScheduler run.
+    Jitter is how late a poll started relative to its deadline.
+    """
+
+    polls: int  # Number of polls made
+    overruns: int  # Number of times a deadline had already passed when the next one was scheduled
+    skipped: int  # Number of deadlines dropped by the "skip" overrun policy
+    jitter_mean_us: float
+    jitter_std_us: float
+    jitter_max_us: float
+
+
+def poll_frequency_strategy(device: WavemeterWS7) -> SamplePoint:
+    """
+    A PollingStrategy that polls get_frequency, raising on signal errors, and stamps the sample with the host time of the poll
+    (t in milliseconds, host_t in nanoseconds, both on time.monotonic_ns).
+    """
+    frequency = device.get_frequency()
+    now = time.monotonic_ns()
+    return SamplePoint(now // 1_000_000, frequency, "IntervalScheduler", now)
+
+
+def poll_raw_frequency_strategy(device: WavemeterWS7) -> SamplePoint:
+    """
+    The default PollingStrategy.
+    Like poll_frequency_strategy, but never raises: failed polls return the wlmData error code as value.
+    """
+    frequency = device.get_frequency_raw()
+    now = time.monotonic_ns()
+    return SamplePoint(now // 1_000_000, frequency, "IntervalScheduler", now)
+
+
 class IntervalScheduler(BaseScheduler):
     """
     An IntervalScheduler that uses the WavemeterWS7 class to poll frequency data at a fixed interval.
     This scheduler will use the get_frequency method to update the frequency data.
+
+    Polls are scheduled on absolute time.monotonic_ns deadlines (start + k * interval), so the time a
+    poll takes does not accumulate into drift. When a poll overruns its slot the overrun_policy decides:
+        - "skip": drop the missed deadlines and continue on the original grid
+        - "catch_up": poll back to back until the missed deadlines have been made up
+    The last spin_us microseconds before each deadline are busy-waited, because sleeping alone can
+    wake up a scheduler tick late, which matters for sub-10 ms intervals.
+
+    Failed polls do not raise: the raw error code is stored as the sample's value (drain_batch() turns
+    it into the status column) and counted in error_counts. Consumers only receive measured values.
+
+    With a quality_channel, every measured poll also reads that switcher channel's exposure, linewidth
+    and measurement uncertainty, which drain_batch() returns as the batch's quality columns:
+        scheduler = IntervalScheduler(wavemeter, interval=0.01, quality_channel=1)
+        ...
+        mean, error = scheduler.drain_batch().select(min_exposure=5).weighted_mean()
     """
 
     def __init__(
         self,
         device: WavemeterWS7,
-        acquisition_strategy: PollingStrategy = lambda device: SamplePoint(
-            0, device.get_frequency(), "IntervalScheduler"
-        ),  # TODO: Fix this deafault strategy to be more meaningful
+        acquisition_strategy: PollingStrategy = poll_raw_frequency_strategy,
         interval: float = 1.0,  # Default to 1 second interval
         threaded: bool = True,
+        overrun_policy: str = "skip",
+        spin_us: float = 300.0,
+        buffer: Optional[RingBuffer] = None,
+        quality_channel: Optional[int] = None,
     ):
-        super().__init__(device, acquisition_strategy, threaded)
+        """
+        Args:
+            device (WavemeterWS7): The wavemeter object to poll.
+            acquisition_strategy (PollingStrategy): Polls the device and returns a SamplePoint.
+            interval (float): The polling period in seconds.
+            threaded (bool): Run the polling loop in a background thread.
+            overrun_policy (str): "skip" or "catch_up", what to do when a poll overruns its slot.
+            spin_us (float): Busy-wait this many microseconds before each deadline instead of sleeping (0 disables).
+            buffer (RingBuffer, optional): Bounded storage for the samples. Defaults to an unbounded queue.Queue.
+            quality_channel (int, optional): The switcher channel whose exposure, linewidth and uncertainty
+                are read with every measured poll (three more DLL calls per poll). Defaults to None, which
+                reads none and leaves the quality columns of drain_batch() empty.
+        """
+        if overrun_policy not in ("skip", "catch_up"):
+            raise ValueError(f"Unknown overrun policy: {overrun_policy}")
+        super().__init__(device, acquisition_strategy, threaded, buffer)
         self._interval = interval
+        self._period_ns = int(interval * 1e9)
+        self._overrun_policy = overrun_policy
+        self._spin_ns = int(spin_us * 1e3)
+        self._quality_channel = quality_channel
+        # Host time, exposure, linewidth and uncertainty of the measured polls not yet drained
+        self._quality: list[tuple[int, float, float, float]] = []
+        self._quality_lock = threading.Lock()
+        self._reset_timing()
+
+    def _reset_timing(self) -> None:
+        self._polls = 0
+        self._overruns = 0
+        self._skipped = 0
+        # Running (Welford) mean and sum of squared deviations of the jitter, in ns
+        self._jitter_mean = 0.0
+        self._jitter_m2 = 0.0
+        self._jitter_max = 0
+        # Number of failed polls by wlmData error code
+        self._error_codes: dict[int, int] = {}
+
+    def _read_quality(self, host_t: int) -> None:
+        device, channel = self._device, self._quality_channel
+        row = (
+            host_t,
+            device.get_exposure_num(channel),
+            device.get_linewidth_num(channel),
+            device.get_measurement_uncertainty(channel),
+        )
+        with self._quality_lock:
+            self._quality.append(row)
+
+    def drain_batch(self, source: str = "") -> SampleBatch:
+        """
+        Like BaseScheduler.drain_batch, with the exposure, linewidth and uncertainty columns filled from
+        the quality_channel readings (NaN for failed polls and where the wavemeter reported an error).
+        """
+        batch = super().drain_batch(source)
+        if self._quality_channel is None:
+            return batch
+        with self._quality_lock:
+            # Readings of samples the buffer dropped go as well; newer ones belong to the next drain
+            last = batch.t[-1] if len(batch) else -1
+            taken = [row for row in self._quality if row[0] <= last]
+            self._quality = [row for row in self._quality if row[0] > last]
+        columns = np.full((3, len(batch)), np.nan)
+        if taken:
+            rows = np.array(taken, dtype=np.float64)
+            t = np.array([row[0] for row in taken], dtype=np.int64)
+            index = np.minimum(np.searchsorted(t, batch.t), len(t) - 1)
+            found = t[index] == batch.t
+            columns[:, found] = rows[index[found], 1:].T
+        # Error codes (<= 0) become NaN, as in SampleBatch.from_values
+        exposure, linewidth, uncertainty = np.where(columns > 0, columns, np.nan)
+        return replace(
+            batch, exposure=exposure, linewidth=linewidth, uncertainty=uncertainty
+        )
+
+    @property
+    def error_counts(self) -> ErrorCounts:
+        # Returns the number of valid and of failed polls per error class in the current/last run.
+        codes = dict(self._error_codes)
+        errors = sum(codes.values())
+        codes[STATUS_OK] = self._polls - errors
+        return count_errors(np.array(list(codes)), np.array(list(codes.values())))
+
+    @property
+    def timing(self) -> LoopTiming:
+        # Returns the jitter and overrun statistics of the current/last run.
+        std = (self._jitter_m2 / self._polls) ** 0.5 if self._polls else 0.0
+        return LoopTiming(
+            polls=self._polls,
+            overruns=self._overruns,
+            skipped=self._skipped,
+            jitter_mean_us=self._jitter_mean / 1e3,
+            jitter_std_us=std / 1e3,
+            jitter_max_us=self._jitter_max / 1e3,
+        )
+
+    def _wait_until(self, deadline_ns: int) -> None:
+        """
+        Sleeps (interruptible by stop) until spin_ns before the deadline, then busy-waits until the deadline.
+        """
+        _wait_until(deadline_ns, self._spin_ns, self._stop_event)
+
+    def _limit_reached(self, deadline_ns: int) -> bool:
+        # Whether the loop should end before polling at deadline_ns; see DurationScheduler
+        return False
+
+    def _record_jitter(self, jitter_ns: int) -> None:
+        self._polls += 1
+        delta = jitter_ns - self._jitter_mean
+        self._jitter_mean += delta / self._polls
+        self._jitter_m2 += delta * (jitter_ns - self._jitter_mean)
+        if jitter_ns > self._jitter_max:
+            self._jitter_max = jitter_ns
 
     def _run_loop(self):
         """
@@ -153,11 +1243,131 @@ class IntervalScheduler(BaseScheduler):
         This loop will run until the stop event is set.
         It will poll the wavemeter for frequency data at the specified interval.
         """
+        self._reset_timing()
+        period = self._period_ns
+        # Poll on a grid starting at the start_at deadline, if there is one
+        deadline = self._start_deadline or time.monotonic_ns()
+        self._start_deadline = None
         while not self._stop_event.is_set():
+            if self._limit_reached(deadline):
+                break
+            self._record_jitter(time.monotonic_ns() - deadline)
             try:
                 sample_point = self._acq_strat(self._device)  # type: ignore
-                self._data_buffer.put(sample_point)
-            # except WavemeterWS7Exception as e:
-            except Exception as e:
-                print(f"Error getting frequency: {e}")
-            time.sleep(self._interval)  # Wait for the specified interval
+            except WavemeterWS7Exception as e:
+                # Raising strategies: count the error the exception stands for
+                code = _EXCEPTION_ERROR_CODES.get(type(e), wlmConst.ErrNoValue)
+                self._error_codes[code] = self._error_codes.get(code, 0) + 1
+            except Exception:
+                # Anything else counts as an "other" error; the polling thread keeps running
+                logger.exception("Polling the wavemeter failed")
+                code = wlmConst.ErrNoValue
+                self._error_codes[code] = self._error_codes.get(code, 0) + 1
+            else:
+                value = sample_point.value
+                if value <= 0:
+                    code = int(value)
+                    self._error_codes[code] = self._error_codes.get(code, 0) + 1
+                if self._store_raw:
+                    # Read before the sample is stored, so a drained sample always has its readings
+                    if self._quality_channel is not None and value > 0:
+                        self._read_quality(sample_point.host_t)
+                    self._data_buffer.put(sample_point)
+                if self._consumers and value > 0:
+                    self._notify(sample_point.host_t, value)
+
+            deadline += period
+            now = time.monotonic_ns()
+            if now >= deadline:
+                self._overruns += 1
+                if self._overrun_policy == "skip":
+                    # Move to the next deadline on the original grid that is still in the future
+                    missed = (now - deadline) // period + 1
+                    self._skipped += missed
+                    deadline += missed * period
+            self._wait_until(deadline)
+
+
+class DurationScheduler(IntervalScheduler):
+    """
+    An IntervalScheduler that stops itself after max_samples polls or after duration seconds,
+    whichever comes first, so no stop() call has to arrive in time.
+
+    The duration counts from the first poll's deadline; with start_at that is the agreed start time,
+    so the acquisition covers exactly [deadline, deadline + duration) on the poll grid:
+        scheduler = DurationScheduler(wavemeter, duration=3.0, interval=0.002)
+        scheduler.start_at(t0)
+        scheduler.wait()
+        t, freq = scheduler.drain()
+    """
+
+    def __init__(
+        self,
+        device: WavemeterWS7,
+        duration: Optional[float] = None,
+        max_samples: Optional[int] = None,
+        interval: float = 1.0,
+        acquisition_strategy: PollingStrategy = poll_raw_frequency_strategy,
+        overrun_policy: str = "skip",
+        spin_us: float = 300.0,
+        buffer: Optional[RingBuffer] = None,
+        quality_channel: Optional[int] = None,
+    ):
+        """
+        Args:
+            device (WavemeterWS7): The wavemeter object to poll.
+            duration (float, optional): Stop after this many seconds.
+            max_samples (int, optional): Stop after this many polls (failed polls included).
+            interval (float): The polling period in seconds.
+            acquisition_strategy, overrun_policy, spin_us, buffer, quality_channel: As for
+                IntervalScheduler.
+        """
+        if duration is None and max_samples is None:
+            raise ValueError("DurationScheduler needs a duration or max_samples.")
+        super().__init__(
+            device,
+            acquisition_strategy,
+            interval,
+            threaded=True,
+            overrun_policy=overrun_policy,
+            spin_us=spin_us,
+            buffer=buffer,
+            quality_channel=quality_channel,
+        )
+        self._duration_ns = None if duration is None else int(duration * 1e9)
+        self._max_samples = max_samples
+        self._end_ns: Optional[int] = None
+        self._done = threading.Event()
+
+    @property
+    def done(self) -> bool:
+        # Returns whether the last run reached its duration or sample limit.
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until the run has reached its limit. Returns False on timeout.
+        """
+        return self._done.wait(timeout)
+
+    def start(self):
+        if not self._persistent:
+            self._on_arm()
+        super().start()
+
+    def _on_arm(self) -> None:
+        self._done.clear()
+        self._end_ns = None
+
+    def _limit_reached(self, deadline_ns: int) -> bool:
+        if self._end_ns is None and self._duration_ns is not None:
+            self._end_ns = deadline_ns + self._duration_ns
+        if self._end_ns is not None and deadline_ns >= self._end_ns:
+            return True
+        return self._max_samples is not None and self._polls >= self._max_samples
+
+    def _run_loop(self):
+        super()._run_loop()
+        if not self._stop_event.is_set():
+            self._running = False
+            self._done.set()
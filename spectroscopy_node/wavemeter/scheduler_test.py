@@ -0,0 +1,384 @@
+import asyncio, threading, time
+import numpy as np
+import pytest
+
+import wlmConst
+from samples import SamplePoint
+from wavemeter import WavemeterWS7Exception
+from scheduler import (
+    DurationScheduler,
+    EventDrivenScheduler,
+    IntervalScheduler,
+    SwitcherScheduler,
+    WaitEventScheduler,
+)
+
+
+# TESTING SwitcherScheduler IN ISOLATION:
+class TestSwitcherScheduler:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        self.scheduler = SwitcherScheduler(None, channels=[1, 3], capacity=16)
+
+    def send(self, mode, intval, dblval):
+        self.scheduler.callback_ex_handler(0, mode, intval, dblval, 0)
+
+    def test_events_are_routed_by_switcher_channel(self):
+        self.send(wlmConst.cmiFrequency1, 10, 100.0)  # before any switch: first channel
+        self.send(wlmConst.cmiSwitcherChannel, 3, 0.0)
+        self.send(wlmConst.cmiFrequency1, 11, 300.0)
+        self.send(wlmConst.cmiFrequency1, 12, 301.0)
+
+        drained = self.scheduler.drain_all()
+        assert drained[1][1].tolist() == [100.0]
+        assert drained[3][1].tolist() == [300.0, 301.0]
+
+    def test_unrecorded_channels_and_modes_are_dropped(self):
+        self.send(wlmConst.cmiSwitcherChannel, 2, 0.0)
+        self.send(wlmConst.cmiFrequency1, 10, 200.0)
+        self.send(wlmConst.cmiSwitcherChannel, 1, 0.0)
+        self.send(wlmConst.cmiVersion, 11, 7.0)
+
+        assert all(len(t) == 0 for t, _ in self.scheduler.drain_all().values())
+
+    def test_base_api_refers_to_first_channel(self):
+        self.send(wlmConst.cmiSwitcherChannel, 1, 0.0)
+        self.send(wlmConst.cmiFrequency2, 10, 100.0)
+
+        assert self.scheduler.snapshot_channel(1)[1].tolist() == [100.0]
+        assert self.scheduler.data.get().value == 100.0
+
+
+class FakeWaitDevice:
+    """Hands out a fixed list of events through the wait-event interface, then times out."""
+
+    def __init__(self, events):
+        self.events = list(events)
+        self.installed = False
+        self.timeout_ms = 0
+        self.version = 0  # the events' ver
+
+    def install_wait_event(self, timeout_ms):
+        self.installed = True
+        self.timeout_ms = timeout_ms
+
+    def remove_wait_event(self):
+        self.installed = False
+
+    def clear_events(self):
+        pass
+
+    def wait_for_next_event_ex(self):
+        if not self.events:
+            time.sleep(self.timeout_ms / 1e3)
+            return 0, 0, 0, 0, 0.0, 0
+        mode, intval, dblval = self.events.pop(0)
+        return 1, 0, mode, intval, dblval, 0
+
+
+# TESTING WaitEventScheduler IN ISOLATION:
+class TestWaitEventScheduler:
+    def test_events_are_published_in_blocks(self):
+        device = FakeWaitDevice(
+            [(wlmConst.cmiFrequency1, t, 100.0 + t) for t in range(5)]
+            + [(wlmConst.cmiVersion, 99, 0.0)]
+        )
+        scheduler = WaitEventScheduler(device, batch_size=2, max_latency=0.005)
+        scheduler.start()
+        time.sleep(0.05)
+        scheduler.stop()
+
+        t, value = scheduler.drain()
+        assert t.tolist() == [0, 1, 2, 3, 4]
+        assert not device.installed
+
+    def test_partial_block_is_published_when_events_pause(self):
+        device = FakeWaitDevice([(wlmConst.cmiFrequency1, 1, 100.0)])
+        scheduler = WaitEventScheduler(device, max_latency=0.02, timeout_ms=100)
+        scheduler.start()
+        start = time.monotonic()
+        while not len(scheduler.snapshot()[0]) and time.monotonic() - start < 1.0:
+            time.sleep(0.001)
+        elapsed = time.monotonic() - start
+        scheduler.stop()
+        assert device.timeout_ms == 20  # waits are capped at max_latency
+        assert elapsed < 0.08  # not the 100 ms DLL timeout
+
+
+# TESTING IntervalScheduler IN ISOLATION:
+class TestIntervalScheduler:
+    @staticmethod
+    def counting_strategy(delay=0.0):
+        def strategy(device):
+            time.sleep(delay)
+            return SamplePoint(time.monotonic_ns(), 1.0, "test")
+
+        return strategy
+
+    def test_deadlines_do_not_drift(self):
+        scheduler = IntervalScheduler(
+            None, self.counting_strategy(delay=0.002), interval=0.01
+        )
+        scheduler.start()
+        time.sleep(0.205)
+        scheduler.stop()
+
+        # 0.002 s of poll time per tick would cost ~4 polls over 0.2 s with sleep-after-poll
+        assert 19 <= scheduler.timing.polls <= 22
+
+    def test_skip_policy_counts_overruns(self):
+        scheduler = IntervalScheduler(
+            None, self.counting_strategy(delay=0.005), interval=0.002
+        )
+        scheduler.start()
+        time.sleep(0.05)
+        scheduler.stop()
+
+        timing = scheduler.timing
+        assert timing.overruns == timing.polls or timing.overruns == timing.polls - 1
+        assert timing.skipped >= timing.overruns
+
+    def test_rejects_unknown_policy(self):
+        with pytest.raises(ValueError):
+            IntervalScheduler(None, interval=0.01, overrun_policy="later")
+
+    @staticmethod
+    def failing_strategy(*errors):
+        errors = list(errors)
+
+        def strategy(device):
+            if errors:
+                raise errors.pop(0)
+            return SamplePoint(time.monotonic_ns(), 1.0, "test")
+
+        return strategy
+
+    def test_unexpected_exceptions_keep_polling(self):
+        scheduler = IntervalScheduler(
+            None,
+            self.failing_strategy(RuntimeError("driver"), WavemeterWS7Exception()),
+            interval=0.002,
+        )
+        scheduler.open()
+        for _ in range(2):
+            scheduler.start()
+            time.sleep(0.02)
+            scheduler.stop()
+            assert len(scheduler.drain()[0]) > 0  # the worker survived the exception
+        assert scheduler.error_counts.other == 0  # counts are per run
+        scheduler.close()
+
+    def test_error_codes_of_raised_exceptions(self):
+        scheduler = IntervalScheduler(
+            None,
+            self.failing_strategy(RuntimeError("driver"), WavemeterWS7Exception()),
+            interval=0.002,
+        )
+        scheduler.start()
+        deadline = time.monotonic() + 2.0
+        while scheduler.timing.polls < 3 and time.monotonic() < deadline:
+            time.sleep(0.002)
+        scheduler.stop()
+        assert scheduler._error_codes == {
+            wlmConst.ErrNoValue: 1,
+            wlmConst.ErrWlmMissing: 1,
+        }
+        assert scheduler.error_counts.other == 2
+
+
+# TESTING SCHEDULED STARTS:
+class TestStartAt:
+    def test_polls_start_on_the_deadline(self):
+        scheduler = IntervalScheduler(
+            None, TestIntervalScheduler.counting_strategy(), interval=0.005
+        )
+        deadline = time.monotonic_ns() + 30_000_000
+        timing = scheduler.start_at(deadline)
+        assert scheduler.start_timing is timing
+        assert 0 <= timing.error_ns < 5_000_000
+        time.sleep(0.02)
+        scheduler.stop()
+        first = scheduler.data.get()
+        # Never early; how late depends on when the OS runs the new worker thread
+        assert 0 <= first.t - deadline < 20_000_000
+
+    def test_stop_while_waiting(self):
+        scheduler = EventDrivenScheduler(FakeCallbackDevice())  # type: ignore[arg-type]
+        threading.Timer(0.01, scheduler.stop).start()
+        assert scheduler.start_at(time.monotonic_ns() + 1_000_000_000) is None
+        assert not scheduler.is_running
+
+
+# TESTING DurationScheduler IN ISOLATION:
+class TestDurationScheduler:
+    def test_stops_after_max_samples(self):
+        scheduler = DurationScheduler(
+            None,
+            max_samples=10,
+            interval=0.001,
+            acquisition_strategy=TestIntervalScheduler.counting_strategy(),
+        )
+        scheduler.start()
+        assert scheduler.wait(1.0)
+        assert scheduler.done and not scheduler.is_running
+        assert scheduler.data.qsize() == 10
+        scheduler.stop()
+
+    def test_stops_after_duration_on_the_grid(self):
+        scheduler = DurationScheduler(
+            None,
+            duration=0.05,
+            interval=0.005,
+            acquisition_strategy=TestIntervalScheduler.counting_strategy(),
+        )
+        scheduler.start_at(time.monotonic_ns() + 5_000_000)
+        assert scheduler.wait(1.0)
+        timing = scheduler.timing
+        # A busy machine may skip grid points, also the one at the end of the duration
+        assert timing.polls <= 10 <= timing.polls + timing.skipped
+
+    def test_needs_a_limit(self):
+        with pytest.raises(ValueError):
+            DurationScheduler(None, interval=0.01)
+
+
+class FakeCallbackDevice:
+    """Keeps the registered callback, so tests can fire events and count registrations."""
+
+    def __init__(self):
+        self.handler = None
+        self.registrations = 0
+
+    def register_frequency_callback(self, handler):
+        self.handler = handler
+        self.registrations += 1
+
+    def unregister_frequency_callback(self):
+        self.handler = None
+
+
+# TESTING PERSISTENT MODE (open/arm/disarm):
+class TestPersistentMode:
+    def test_interval_scheduler_keeps_one_worker(self):
+        scheduler = IntervalScheduler(
+            None, TestIntervalScheduler.counting_strategy(), interval=0.002
+        )
+        scheduler.open()
+        worker = scheduler._thread
+        for _ in range(3):
+            scheduler.start()
+            time.sleep(0.01)
+            scheduler.stop()
+            assert len(scheduler.drain()[0]) > 0
+            time.sleep(0.005)
+            assert scheduler.data.empty()  # nothing is polled while disarmed
+            assert scheduler._thread is worker and worker.is_alive()
+        scheduler.close()
+        assert not worker.is_alive()
+
+    def test_callback_is_registered_once_and_gated(self):
+        device = FakeCallbackDevice()
+        scheduler = EventDrivenScheduler(device)  # type: ignore[arg-type]
+        scheduler.open()
+        for step in range(5):
+            device.handler(wlmConst.cmiFrequency1, step, 1.0)  # disarmed: dropped
+            scheduler.start()
+            device.handler(wlmConst.cmiFrequency1, step, 2.0)
+            scheduler.stop()
+        assert device.registrations == 1
+        assert scheduler.drain()[1].tolist() == [2.0] * 5
+        scheduler.close()
+        assert device.handler is None
+
+    def test_wait_event_stays_installed(self):
+        device = FakeWaitDevice([(wlmConst.cmiFrequency1, 1, 100.0)])
+        scheduler = WaitEventScheduler(device, max_latency=0.001)
+        scheduler.open()
+        scheduler.start()
+        time.sleep(0.02)
+        scheduler.stop()
+        assert device.installed
+        assert scheduler.drain()[0].tolist() == [1]
+        scheduler.close()
+        assert not device.installed
+
+    @pytest.mark.parametrize("method", ["start", "arm"])
+    def test_duration_scheduler_runs_repeatedly(self, method):
+        scheduler = DurationScheduler(
+            None,
+            max_samples=5,
+            interval=0.001,
+            acquisition_strategy=TestIntervalScheduler.counting_strategy(),
+        )
+        scheduler.open()
+        for _ in range(3):
+            getattr(scheduler, method)()
+            assert scheduler.wait(1.0)
+            assert len(scheduler.drain()[0]) == 5
+        scheduler.close()
+
+    def test_open_needs_a_persistent_mode(self):
+        scheduler = IntervalScheduler(
+            None, TestIntervalScheduler.counting_strategy(), threaded=False
+        )
+        with pytest.raises(RuntimeError):
+            scheduler.open()
+        assert not scheduler.is_open
+
+    def test_arm_needs_open(self):
+        scheduler = EventDrivenScheduler(FakeCallbackDevice())  # type: ignore[arg-type]
+        with pytest.raises(RuntimeError):
+            scheduler.arm()
+
+
+# TESTING BaseScheduler.stream:
+def test_stream_batches_samples_from_another_thread():
+    scheduler = EventDrivenScheduler(None)  # type: ignore[arg-type]
+    n = 1000
+
+    def produce():
+        for i in range(n):
+            scheduler.callback_handler(wlmConst.cmiFrequency1, i, float(i + 1))
+            if i % 100 == 0:
+                time.sleep(0.002)
+        scheduler._running = False
+
+    async def consume():
+        batches = []
+        async for t, value in scheduler.stream(max_batch=64, max_latency=0.005):
+            batches.append(value)
+        return batches
+
+    async def run():
+        scheduler._running = True
+        task = asyncio.create_task(consume())
+        await asyncio.sleep(0.01)  # let the stream register as a consumer
+        producer = threading.Thread(target=produce)
+        producer.start()
+        batches = await task
+        producer.join()
+        return batches
+
+    batches = asyncio.run(run())
+    assert all(len(b) <= 64 for b in batches)
+    assert np.concatenate(batches).tolist() == [float(i + 1) for i in range(n)]
+    assert len(batches) < n / 10  # coalesced, not one wakeup per sample
+    assert scheduler._consumers == ()
+
+
+def test_stream_can_be_left_early():
+    scheduler = EventDrivenScheduler(None)  # type: ignore[arg-type]
+    scheduler._running = True
+
+    async def run():
+        async for t, value in scheduler.stream(max_latency=0.001):
+            return value
+
+    async def main():
+        task = asyncio.create_task(run())
+        await asyncio.sleep(0.01)
+        scheduler.callback_handler(wlmConst.cmiFrequency1, 1, 5.0)
+        return await task
+
+    assert asyncio.run(main()).tolist() == [5.0]
+    assert scheduler._consumers == ()
@@ -0,0 +1,474 @@
+import queue, threading, time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+import numpy as np
+
+import wlmConst
+from clock import ClockModel
+from samples import STATUS_OK, SOURCES, SampleBatch
+from scheduler import (
+    BaseScheduler,
+    EventDrivenScheduler,
+    SwitcherScheduler,
+    TriggeredScheduler,
+)
+
+
+@dataclass(frozen=True, slots=True)
+class SessionStats:
+    batches: int  # Batches delivered
+    samples: int  # Samples delivered
+    wakeups: int  # Times the consumer thread woke up to build a batch
+    late: int  # Samples older than the newest sample of an already delivered batch
+
+
+class _Source:
+    """
+    One input of a SampleSession and the SampleConsumer that feeds it. Samples are collected under the
+    session's lock: single samples in lists, update_many arrays as they are.
+    """
+
+    __slots__ = (
+        "_session",
+        "name",
+        "source_id",
+        "channel",
+        "mode",
+        "scheduler",
+        "rows_t",
+        "rows_value",
+        "parts",
+        "latest",
+    )
+
+    def __init__(
+        self,
+        session: "SampleSession",
+        name: str,
+        channel: int,
+        mode: int,
+        scheduler: Optional[BaseScheduler],
+    ):
+        self._session = session
+        self.name = name
+        self.source_id = SOURCES.intern(name)
+        self.channel = channel
+        self.mode = mode
+        self.scheduler = scheduler
+        self.rows_t: list[int] = []
+        self.rows_value: list[float] = []
+        self.parts: list[tuple[np.ndarray, np.ndarray]] = []
+        # Newest host time received; the source's later samples are not expected to be older
+        self.latest: Optional[int] = None
+
+    # SampleConsumer
+    def update(self, t: int, value: float) -> None:
+        session = self._session
+        with session._lock:
+            self.rows_t.append(t)
+            self.rows_value.append(value)
+            if self.latest is None or t > self.latest:
+                self.latest = t
+            session._added(1)
+
+    def update_many(self, t: np.ndarray, value: np.ndarray) -> None:
+        n = len(t)
+        if n == 0:
+            return
+        t = np.asarray(t, dtype=np.int64)
+        value = np.asarray(value, dtype=np.float64)
+        newest = int(t.max())
+        session = self._session
+        with session._lock:
+            self._rows_to_parts()
+            self.parts.append((t, value))
+            if self.latest is None or newest > self.latest:
+                self.latest = newest
+            session._added(n)
+
+    def _rows_to_parts(self) -> None:
+        # Called with the session's lock held
+        if self.rows_t:
+            self.parts.append(
+                (
+                    np.array(self.rows_t, dtype=np.int64),
+                    np.array(self.rows_value, dtype=np.float64),
+                )
+            )
+            self.rows_t, self.rows_value = [], []
+
+    def take(self, watermark: Optional[int]) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Removes and returns the samples with host time <= watermark (all of them for None).
+        Called with the session's lock held.
+        """
+        self._rows_to_parts()
+        parts, self.parts = self.parts, []
+        if not parts:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+        if len(parts) == 1:
+            t, value = parts[0]
+        else:
+            t = np.concatenate([p[0] for p in parts])
+            value = np.concatenate([p[1] for p in parts])
+        if watermark is None or t.max() <= watermark:
+            return t, value
+        ready = t <= watermark
+        held = ~ready
+        self.parts.append((t[held], value[held]))
+        return t[ready], value[ready]
+
+
+class SampleSession:
+    """
+    Acquires several sources into one time-ordered stream: wavemeter schedulers (one per channel or WLM
+    instance), and any other producer of (host time ns, value) samples such as photodiode DAQ blocks.
+
+    Every source delivers into the session instead of its own queue. One consumer thread wakes up once
+    per batch (when max_batch samples are pending or the oldest pending sample is max_latency old),
+    k-way merges the sources' samples by host time and delivers them as one SampleBatch; its source
+    column names the input and its channel column carries the source's switcher channel.
+        session = SampleSession(on_batch=process)
+        session.add("probe", SwitcherScheduler(wavemeter, channels=[1, 2]), channel=1)
+        session.add("repump", switcher_scheduler, channel=2)
+        daq = session.source("photodiode")  # daq.update_many(t_ns, volts) from the DAQ thread
+        session.open()
+        for step in scan:
+            session.start()
+            ...
+            session.stop()  # every sample of the step has been delivered
+        session.close()
+
+    All sources stamp samples with time.monotonic_ns (the event-driven schedulers through their clock
+    model), so the merge needs no alignment. Each source is expected to deliver its own samples in time
+    order. To keep the merged stream ordered across batches, samples newer than the slowest source's
+    newest sample are held back, for at most `lateness` seconds when that source is quiet; samples that
+    still arrive behind an already delivered batch are delivered in the next one and counted as late.
+    """
+
+    def __init__(
+        self,
+        max_batch: int = 4096,
+        max_latency: float = 0.05,
+        lateness: float = 0.1,
+        clock: Optional[ClockModel] = None,
+        on_batch: Optional[Callable[[SampleBatch], None]] = None,
+    ):
+        """
+        Args:
+            max_batch (int): The number of pending samples that triggers a batch.
+            max_latency (float): The longest a sample waits for its batch to be built, in seconds.
+            lateness (float): How long the samples of a quiet source may arrive after newer samples of
+                the other sources, in seconds.
+            clock (ClockModel, optional): A clock model given to the added callback schedulers
+                (EventDrivenScheduler, SwitcherScheduler, TriggeredScheduler) of one WLM instance. They
+                all stamp on the DLL's callback thread from that instance's ms counter, which a
+                ClockModel needs; other schedulers keep their own.
+            on_batch (Callable[[SampleBatch], None], optional): Called on the consumer thread with every
+                batch. Defaults to None, which keeps the batches for get() and drain().
+        """
+        self._max_batch = max_batch
+        self._max_latency = max_latency
+        self._lateness_ns = int(lateness * 1e9)
+        self._clock = clock
+        self._clock_version: Optional[int] = (
+            None  # The WLM instance whose schedulers share the clock
+        )
+        self._clock_shared = False
+        self._on_batch = on_batch
+        self._batches: queue.Queue[SampleBatch] = queue.Queue()
+        self._sources: list[_Source] = []
+
+        self._lock = threading.Lock()
+        # The consumer thread waits on _wakeup, flush() waits on _delivered
+        self._wakeup = threading.Condition(self._lock)
+        self._delivered = threading.Condition(self._lock)
+        self._pending = 0
+        self._batch_started = False
+        self._flush_requested = False
+        self._flush_seq = 0  # flushes requested
+        self._flushed_seq = 0  # flushes completed by the consumer thread
+        self._closing = False
+        self._thread: Optional[threading.Thread] = None
+
+        self._last_t: Optional[int] = None  # newest host time delivered
+        self._n_batches = 0
+        self._n_samples = 0
+        self._wakeups = 0
+        self._late = 0
+
+    def __enter__(self) -> "SampleSession":
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    # public API
+    @property
+    def clock(self) -> Optional[ClockModel]:
+        # Returns the clock model shared by the added callback schedulers (None if they keep their own).
+        return self._clock
+
+    @property
+    def sources(self) -> list[str]:
+        return [source.name for source in self._sources]
+
+    @property
+    def stats(self) -> SessionStats:
+        # Returns the delivery counters of the session.
+        return SessionStats(self._n_batches, self._n_samples, self._wakeups, self._late)
+
+    def add(
+        self,
+        name: str,
+        scheduler: BaseScheduler,
+        channel: Optional[int] = None,
+        mode: int = wlmConst.cmiFrequency1,
+    ) -> None:
+        """
+        Adds a scheduler's samples as a source. The session starts and stops the scheduler.
+
+        Args:
+            name (str): The source name of the samples in the batches.
+            scheduler (BaseScheduler): The scheduler, not yet started.
+            channel (int, optional): For a SwitcherScheduler, the switcher channel to add (the first of
+                its channels by default); add each channel under its own name.
+            mode (int): The measurement mode stored with the samples.
+        """
+        if isinstance(scheduler, SwitcherScheduler) and channel is None:
+            channel = scheduler.channels[0]
+        if self._clock is not None and isinstance(
+            scheduler, (EventDrivenScheduler, TriggeredScheduler)
+        ):
+            self._share_clock(scheduler)
+        source = self._add_source(name, channel or 0, mode, scheduler)
+        if isinstance(scheduler, SwitcherScheduler):
+            scheduler.add_consumer(source, channel=channel)
+        else:
+            scheduler.add_consumer(source)
+
+    def _share_clock(self, scheduler: BaseScheduler) -> None:
+        version = getattr(scheduler.device, "version", None)
+        if self._clock_shared and version != self._clock_version:
+            raise ValueError(
+                f"The session's clock model is shared by WLM version {self._clock_version}, "
+                f"not {version}; give this scheduler its own."
+            )
+        scheduler.clock = self._clock  # type: ignore[assignment]
+        self._clock_version = version
+        self._clock_shared = True
+
+    def source(self, name: str, channel: int = 0, mode: int = 0):
+        """
+        Returns a SampleConsumer for a source that is not a scheduler, e.g. a DAQ stream. Feed it
+        host times (time.monotonic_ns) and values with update/update_many from any thread.
+        """
+        return self._add_source(name, channel, mode, None)
+
+    def open(self) -> None:
+        """
+        Starts the consumer thread and opens every scheduler in persistent mode (see BaseScheduler.open).
+        """
+        if self._thread is not None:
+            return
+        self._closing = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        for scheduler in self._schedulers():
+            scheduler.open()
+
+    def start(self) -> None:
+        """
+        Starts (arms) every scheduler, opening the session first if needed.
+        """
+        self.open()
+        for scheduler in self._schedulers():
+            scheduler.start()
+
+    def stop(self) -> None:
+        """
+        Stops (disarms) every scheduler and returns once all of their samples have been delivered.
+        """
+        for scheduler in self._schedulers():
+            scheduler.stop()
+        self.flush()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Delivers every pending sample without waiting for the batch to fill or for slower sources.
+        Returns False on timeout.
+        """
+        with self._lock:
+            if self._thread is None:
+                return True
+            self._flush_seq += 1
+            target = self._flush_seq
+            self._wakeup.notify()
+            return self._delivered.wait_for(
+                lambda: self._flushed_seq >= target, timeout
+            )
+
+    def close(self) -> None:
+        """
+        Closes the schedulers, delivers the remaining samples and stops the consumer thread.
+        """
+        if self._thread is None:
+            return
+        for scheduler in self._schedulers():
+            scheduler.close()
+        with self._lock:
+            self._closing = True
+            self._wakeup.notify()
+        self._thread.join()
+        self._thread = None
+
+    def get(self, timeout: Optional[float] = None) -> Optional[SampleBatch]:
+        """
+        Returns the next batch, or None if none was delivered within timeout.
+        """
+        try:
+            return self._batches.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def drain(self) -> SampleBatch:
+        """
+        Removes every delivered batch and returns them as one SampleBatch.
+        """
+        batches = []
+        while True:
+            try:
+                batches.append(self._batches.get_nowait())
+            except queue.Empty:
+                return SampleBatch.concat(batches)
+
+    # sources
+    def _add_source(
+        self,
+        name: str,
+        channel: int,
+        mode: int,
+        scheduler: Optional[BaseScheduler],
+    ) -> _Source:
+        if name in self.sources:
+            raise ValueError(f"The session already has a source named {name!r}.")
+        source = _Source(self, name, channel, mode, scheduler)
+        with self._lock:
+            self._sources = self._sources + [source]
+        return source
+
+    def _schedulers(self) -> list[BaseScheduler]:
+        # Each scheduler once, even if several of its switcher channels were added
+        schedulers: list[BaseScheduler] = []
+        for source in self._sources:
+            if source.scheduler is not None and not any(
+                s is source.scheduler for s in schedulers
+            ):
+                schedulers.append(source.scheduler)
+        return schedulers
+
+    def _added(self, n: int) -> None:
+        # Called by the sources with the lock held: wakes the consumer when a batch starts or fills up
+        self._pending += n
+        if not self._batch_started:
+            self._batch_started = True
+            self._wakeup.notify()
+        elif self._pending >= self._max_batch and not self._flush_requested:
+            self._flush_requested = True
+            self._wakeup.notify()
+
+    # consumer thread
+    def _run(self) -> None:
+        max_latency = self._max_latency
+        while True:
+            with self._lock:
+                self._wakeup.wait_for(
+                    lambda: self._batch_started
+                    or self._closing
+                    or self._flush_seq > self._flushed_seq
+                )
+                # Give the batch max_latency to fill up, unless it is full or a flush is due
+                self._wakeup.wait_for(
+                    lambda: self._flush_requested
+                    or self._closing
+                    or self._flush_seq > self._flushed_seq,
+                    max_latency,
+                )
+                self._wakeups += 1
+                closing = self._closing
+                flush_seq = self._flush_seq
+                everything = closing or flush_seq > self._flushed_seq
+                parts = self._take(everything)
+            if parts:
+                self._deliver(parts)
+            with self._lock:
+                if everything:
+                    self._flushed_seq = flush_seq
+                    self._delivered.notify_all()
+            if closing:
+                return
+
+    def _take(self, everything: bool) -> list[tuple[_Source, np.ndarray, np.ndarray]]:
+        """
+        Removes the samples that can be delivered from every source. Called with the lock held.
+        """
+        watermark = None
+        if not everything:
+            # A source's later samples are not older than its newest one, or, if it is quiet, than
+            # now - lateness
+            floor = time.monotonic_ns() - self._lateness_ns
+            watermark = min(
+                (
+                    floor if source.latest is None else max(source.latest, floor)
+                    for source in self._sources
+                ),
+                default=None,
+            )
+        parts = []
+        held = 0
+        for source in self._sources:
+            t, value = source.take(watermark)
+            if len(t):
+                parts.append((source, t, value))
+            held += len(source.rows_t) + sum(len(p[0]) for p in source.parts)
+        self._pending = held
+        self._flush_requested = False
+        # Samples held back for slower sources start the next batch right away
+        self._batch_started = held > 0
+        return parts
+
+    def _deliver(self, parts: list[tuple[_Source, np.ndarray, np.ndarray]]) -> None:
+        counts = [len(t) for _, t, _ in parts]
+        t = np.concatenate([p[1] for p in parts])
+        value = np.concatenate([p[2] for p in parts])
+        # The sources' samples are sorted runs: the stable sort (timsort) finds the runs and merges
+        # them, a k-way merge in O(n log k); equal times keep the order the sources were added in
+        order = np.argsort(t, kind="stable")
+        # Schedulers only hand their consumers measured values; failed measurements stay in their own
+        # buffers (drain_batch, error_counts)
+        status = np.full(len(t), STATUS_OK, dtype=np.int16)
+        batch = SampleBatch(
+            t[order],
+            value[order],
+            np.repeat(np.array([p[0].channel for p in parts], dtype=np.uint8), counts)[
+                order
+            ],
+            np.repeat(np.array([p[0].mode for p in parts], dtype=np.int16), counts)[
+                order
+            ],
+            status[order],
+            np.repeat(
+                np.array([p[0].source_id for p in parts], dtype=np.uint16), counts
+            )[order],
+        )
+        if self._last_t is not None:
+            self._late += int(np.count_nonzero(batch.t < self._last_t))
+        self._last_t = max(int(batch.t[-1]), self._last_t or 0)
+        self._n_batches += 1
+        self._n_samples += len(batch)
+        if self._on_batch is not None:
+            self._on_batch(batch)
+        else:
+            self._batches.put(batch)
@@ -0,0 +1,151 @@
+import threading, time
+import numpy as np
+import pytest
+
+import wlmConst
+from clock import ClockModel
+from samples import STATUS_OK, SamplePoint
+from scheduler import (
+    EventDrivenScheduler,
+    IntervalScheduler,
+    SwitcherScheduler,
+    WaitEventScheduler,
+)
+from session import SampleSession
+
+
+def counting_strategy(value):
+    def strategy(device):
+        return SamplePoint(time.monotonic_ns(), value, "test")
+
+    return strategy
+
+
+class FakeExDevice:
+    """Keeps the registered extended callback, so tests can fire switcher events."""
+
+    def __init__(self, version=5000):
+        self.version = version
+        self.handler = None
+
+    def register_frequency_callback_ex(self, handler):
+        self.handler = handler
+
+    def unregister_frequency_callback(self):
+        self.handler = None
+
+
+# TESTING SampleSession IN ISOLATION:
+class TestSampleSession:
+    def test_sources_are_merged_in_time_order(self):
+        session = SampleSession(max_batch=256, max_latency=0.005, lateness=0.01)
+        sources = [session.source(name) for name in ("a", "b", "c")]
+        n = 2000
+
+        def produce(source, offset):
+            for i in range(0, n, 50):
+                t = time.monotonic_ns() + np.arange(50) * 1000 + offset
+                source.update_many(t, np.full(50, float(offset + 1)))
+                time.sleep(0.0005)
+
+        session.open()
+        threads = [
+            threading.Thread(target=produce, args=(source, k))
+            for k, source in enumerate(sources)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        session.close()
+
+        batch = session.drain()
+        assert len(batch) == 3 * n
+        assert (np.diff(batch.t) >= 0).all()
+        assert sorted(set(batch.source_names())) == ["a", "b", "c"]
+        assert (batch.status == STATUS_OK).all()
+        stats = session.stats
+        assert stats.samples == 3 * n and stats.late == 0
+        assert stats.wakeups < 3 * n / 50  # one wakeup per batch, not per update
+
+    def test_quiet_source_holds_newer_samples_for_lateness(self):
+        session = SampleSession(max_latency=0.001, lateness=0.05)
+        fast = session.source("fast")
+        slow = session.source("slow")
+        session.open()
+        slow.update(time.monotonic_ns(), 1.0)
+        fast.update(time.monotonic_ns(), 2.0)
+        first = session.get(timeout=0.02)
+        assert first is not None and first.value.tolist() == [1.0]
+        assert session.get(timeout=0.2).value.tolist() == [2.0]
+        session.close()
+
+    def test_schedulers_are_driven_by_the_session(self):
+        session = SampleSession(max_latency=0.005)
+        for name, interval in (("fast", 0.002), ("slow", 0.005)):
+            session.add(
+                name,
+                IntervalScheduler(None, counting_strategy(interval), interval=interval),
+            )
+        with session:
+            for _ in range(2):
+                session.start()
+                time.sleep(0.03)
+                session.stop()
+                batch = session.drain()
+                names = np.array(batch.source_names())
+                assert (np.diff(batch.t) >= 0).all()
+                assert 0 < (names == "slow").sum() < (names == "fast").sum()
+
+    def test_switcher_channels_are_separate_sources(self):
+        device = FakeExDevice()
+        switcher = SwitcherScheduler(device, channels=[1, 2])  # type: ignore[arg-type]
+        session = SampleSession(max_latency=0.001)
+        session.add("probe", switcher, channel=1)
+        session.add("repump", switcher, channel=2)
+        session.start()
+        for k, channel in enumerate((1, 2, 1)):
+            device.handler(0, wlmConst.cmiSwitcherChannel, channel, 0.0, 0)
+            device.handler(0, wlmConst.cmiFrequency1, k, 100.0 * channel, 0)
+        session.stop()
+        session.close()
+        batch = session.drain()
+        assert len(batch) == 3
+        assert dict(zip(batch.source_names(), batch.channel.tolist())) == {
+            "probe": 1,
+            "repump": 2,
+        }
+        assert device.handler is None
+
+    def test_source_names_are_unique(self):
+        session = SampleSession()
+        session.source("a")
+        with pytest.raises(ValueError):
+            session.source("a")
+
+    def test_clock_is_shared_by_callback_schedulers_of_one_instance(self):
+        clock = ClockModel()
+        session = SampleSession(clock=clock)
+        device = FakeExDevice()
+        callback = EventDrivenScheduler(device)  # type: ignore[arg-type]
+        switcher = SwitcherScheduler(device, channels=[1, 2])  # type: ignore[arg-type]
+        waiting = WaitEventScheduler(device)  # type: ignore[arg-type]
+        session.add("callback", callback)
+        session.add("switcher", switcher)
+        session.add("wait", waiting)
+        assert callback.clock is clock and switcher.clock is clock
+        assert waiting.clock is not clock  # stamps on its own thread
+
+        other = EventDrivenScheduler(FakeExDevice(6000))  # type: ignore[arg-type]
+        with pytest.raises(ValueError):
+            session.add("other", other)
+        assert other.clock is not clock
+
+    def test_clock_is_only_replaced_while_closed(self):
+        scheduler = SwitcherScheduler(FakeExDevice(), channels=[1])  # type: ignore[arg-type]
+        scheduler.open()
+        with pytest.raises(RuntimeError):
+            scheduler.clock = ClockModel()
+        scheduler.close()
+        with pytest.raises(ValueError):
+            IntervalScheduler(None, interval=0.01).clock = ClockModel()
@@ -0,0 +1,270 @@
+import collections, logging, math, threading
+from concurrent.futures import Future, TimeoutError
+from dataclasses import dataclass, replace
+from typing import TYPE_CHECKING, Optional
+
+import numpy as np
+
+from stats import FrequencyStats, OnlineStats
+
+if TYPE_CHECKING:
+    from wavemeter import InstrumentState
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class StabilityThresholds:
+    """
+    Limits used to decide when the laser has settled after a step and when averaging can stop.
+    Frequencies are in the wavemeter's units (THz), times in seconds.
+
+    The defaults follow the fixed timing of the reference scan config (0.5 s stabilization,
+    3 s averaging), which become the upper bounds instead of the fixed durations.
+    """
+
+    max_std: float = (
+        1e-6  # Std over the settle window below which the laser counts as settled (1 MHz)
+    )
+    max_slope: float = 2e-6  # |Slope| over the settle window, per second (2 MHz/s)
+    settle_window: float = 0.1  # Length of the sliding settle window
+    max_settle_time: float = 0.5  # Give up waiting and start averaging after this long
+    target_sem: float = (
+        1e-7  # Stop averaging once the standard error of the mean is this small (100 kHz)
+    )
+    min_samples: int = 10  # Never stop averaging with fewer samples than this
+    max_avg_time: float = (
+        3.0  # Stop averaging after this long even if target_sem was not reached
+    )
+
+    @classmethod
+    def from_dict(cls, thresholds: dict) -> "StabilityThresholds":
+        # Builds thresholds from a config dict (e.g. get_stability_thresholds()), missing keys keep their defaults.
+        return cls(**{k: v for k, v in thresholds.items() if k in cls.__slots__})
+
+
+@dataclass(frozen=True, slots=True)
+class SettleResult:
+    """
+    The outcome of one step: how long settling and averaging took, why each phase ended,
+    the statistics of the averaged samples and the instrument state recorded during the step.
+    """
+
+    settle_time: float  # Seconds from the first sample to the start of averaging
+    settle_reason: str  # "settled" or "timeout"
+    avg_time: float  # Seconds spent averaging
+    avg_reason: str  # "target_sem" or "timeout"
+    stats: FrequencyStats
+    state: Optional["InstrumentState"] = None  # See start_step's state argument
+
+    @property
+    def settled(self) -> bool:
+        return self.settle_reason == "settled"
+
+
+class _SlidingLine:
+    """
+    Running sums over a sliding time window giving its std and least squares slope in O(1) per sample.
+    Times and values are stored relative to the first sample to keep the sums well conditioned.
+    """
+
+    def __init__(self, span: float):
+        self._span = span
+        self._samples: collections.deque = collections.deque()
+        self._n = 0
+        self._st = self._sv = self._stt = self._svv = self._stv = 0.0
+        self._v0: Optional[float] = None
+
+    def add(self, t: float, v: float) -> None:
+        if self._v0 is None:
+            self._v0 = v
+        v -= self._v0
+        self._samples.append((t, v))
+        self._add(t, v, 1)
+        while self._samples and t - self._samples[0][0] > self._span:
+            old_t, old_v = self._samples.popleft()
+            self._add(old_t, old_v, -1)
+
+    def _add(self, t: float, v: float, sign: int) -> None:
+        self._n += sign
+        self._st += sign * t
+        self._sv += sign * v
+        self._stt += sign * t * t
+        self._svv += sign * v * v
+        self._stv += sign * t * v
+
+    @property
+    def duration(self) -> float:
+        if len(self._samples) < 2:
+            return 0.0
+        return self._samples[-1][0] - self._samples[0][0]
+
+    @property
+    def std(self) -> float:
+        if self._n < 2:
+            return math.inf
+        mean = self._sv / self._n
+        return math.sqrt(max(self._svv / self._n - mean * mean, 0.0))
+
+    @property
+    def slope(self) -> float:
+        if self._n < 2:
+            return math.inf
+        sxx = self._stt - self._st * self._st / self._n
+        if sxx <= 0:
+            return math.inf
+        return (self._stv - self._st * self._sv / self._n) / sxx
+
+
+class SettleDetector:
+    """
+    Ends a step's wavemeter averaging as soon as the data allows instead of after fixed waits.
+
+    Attach it to a scheduler with add_consumer and call start_step() after each voltage step:
+        1. Settling: the laser counts as settled once the std and |slope| over the last settle_window
+           seconds are below max_std/max_slope (or after max_settle_time).
+        2. Averaging: samples are accumulated until the standard error of the mean reaches target_sem
+           (with at least min_samples), or after max_avg_time.
+    wait() returns the SettleResult once averaging has ended. Every decision is logged with its reason.
+    """
+
+    def __init__(self, thresholds: Optional[StabilityThresholds] = None):
+        self._thresholds = thresholds or StabilityThresholds()
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._result: Optional[SettleResult] = None
+        self._step = 0
+        self.start_step()
+
+    # public API
+    @property
+    def thresholds(self) -> StabilityThresholds:
+        return self._thresholds
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def start_step(self, state: Optional[Future] = None) -> None:
+        """
+        Resets the detector for a new step, the step's clock starts at its first sample.
+
+        Args:
+            state (Future, optional): An instrument-state snapshot taken during the step
+                (WavemeterWS7.snapshot_state_async), attached to the step's result by wait().
+        """
+        with self._lock:
+            self._step += 1
+            self._state = state
+            self._t0: Optional[int] = None
+            self._settled_at: Optional[float] = None
+            self._settle_reason = ""
+            self._line = _SlidingLine(self._thresholds.settle_window)
+            self._avg = OnlineStats()
+            self._result = None
+            self._done.clear()
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[SettleResult]:
+        """
+        Blocks until averaging has ended, returns the step's result (None on timeout).
+        """
+        if not self._done.wait(timeout):
+            return None
+        result = self._result
+        if self._state is not None and result is not None and result.state is None:
+            # Normally done long before averaging ends; only waits if the reads outlast the step
+            try:
+                state = self._state.result(timeout)
+            except TimeoutError:
+                logger.warning("step %d: instrument state not read in time", self._step)
+            except Exception as e:
+                # The step's result stands without the state
+                logger.warning("step %d: instrument state not read: %s", self._step, e)
+            else:
+                result = self._result = replace(result, state=state)
+        return result
+
+    def update(self, t: int, value: float) -> None:
+        with self._lock:
+            if self._done.is_set():
+                return
+            if self._t0 is None:
+                self._t0 = t
+            self._add(t, (t - self._t0) * 1e-9, value)
+
+    def update_many(self, t: np.ndarray, value: np.ndarray) -> None:
+        with self._lock:
+            if self._done.is_set() or len(t) == 0:
+                return
+            if self._t0 is None:
+                self._t0 = int(t[0])
+            elapsed = (np.asarray(t, dtype=np.int64) - self._t0) * 1e-9
+            for i in range(len(t)):
+                self._add(int(t[i]), float(elapsed[i]), float(value[i]))
+                if self._done.is_set():
+                    return
+
+    # decision logic
+    def _add(self, t: int, elapsed: float, value: float) -> None:
+        th = self._thresholds
+        if self._settled_at is None:
+            self._line.add(elapsed, value)
+            if self._line.duration >= th.settle_window:
+                std, slope = self._line.std, self._line.slope
+                if std <= th.max_std and abs(slope) <= th.max_slope:
+                    self._start_averaging(
+                        elapsed,
+                        "settled",
+                        f"std {std:.3g} <= {th.max_std:.3g} and |slope| {abs(slope):.3g} <= {th.max_slope:.3g}",
+                    )
+            if self._settled_at is None and elapsed >= th.max_settle_time:
+                self._start_averaging(
+                    elapsed,
+                    "timeout",
+                    f"not settled after {th.max_settle_time} s "
+                    f"(std {self._line.std:.3g}, slope {self._line.slope:.3g})",
+                )
+            return
+
+        self._avg.update(t, value)
+        avg_time = elapsed - self._settled_at
+        if self._avg.count >= th.min_samples and self._avg.sem <= th.target_sem:
+            self._finish(
+                avg_time,
+                "target_sem",
+                f"sem {self._avg.sem:.3g} <= {th.target_sem:.3g} after {self._avg.count} samples",
+            )
+        elif avg_time >= th.max_avg_time:
+            self._finish(
+                avg_time,
+                "timeout",
+                f"sem {self._avg.sem:.3g} after {th.max_avg_time} s ({self._avg.count} samples)",
+            )
+
+    def _start_averaging(self, elapsed: float, reason: str, detail: str) -> None:
+        self._settled_at = elapsed
+        self._settle_reason = reason
+        logger.info(
+            "step %d: averaging after %.3f s, %s: %s",
+            self._step,
+            elapsed,
+            reason,
+            detail,
+        )
+
+    def _finish(self, avg_time: float, reason: str, detail: str) -> None:
+        self._result = SettleResult(
+            settle_time=self._settled_at,
+            settle_reason=self._settle_reason,
+            avg_time=avg_time,
+            avg_reason=reason,
+            stats=self._avg.result(),
+        )
+        logger.info(
+            "step %d: averaging done after %.3f s, %s: %s",
+            self._step,
+            avg_time,
+            reason,
+            detail,
+        )
+        self._done.set()
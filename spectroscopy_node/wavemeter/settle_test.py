@@ -0,0 +1,98 @@
+from concurrent.futures import Future
+import pytest
+import numpy as np
+
+from settle import SettleDetector, StabilityThresholds
+
+RATE = 1000  # samples per second
+F0 = 375_000.0
+
+
+def step_response(duration: float, tau: float, jump: float, noise: float, seed=0):
+    """
+    Host times (ns) and values of a laser relaxing exponentially onto F0 after a step of `jump`.
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(duration * RATE)) / RATE
+    values = F0 + jump * np.exp(-t / tau) + rng.normal(0, noise, len(t))
+    return (t * 1e9).astype(np.int64) + 10**12, values
+
+
+def feed(detector, t, values, block=1):
+    for i in range(0, len(t), block):
+        if block == 1:
+            detector.update(int(t[i]), float(values[i]))
+        else:
+            detector.update_many(t[i : i + block], values[i : i + block])
+        if detector.done:
+            break
+
+
+@pytest.mark.parametrize("block", [1, 50])
+def test_settles_then_stops_at_target_sem(block):
+    detector = SettleDetector()
+    t, values = step_response(5.0, tau=0.02, jump=1e-4, noise=2e-7)
+    feed(detector, t, values, block)
+
+    result = detector.wait(timeout=0)
+    assert result is not None
+    assert result.settled
+    assert result.settle_time < 0.5  # earlier than the fixed stabilization time
+    assert result.avg_reason == "target_sem"
+    assert result.avg_time < 3.0  # earlier than the fixed averaging time
+    assert result.stats.avg_freq == pytest.approx(F0, abs=3e-7)
+    assert result.stats.stddev / np.sqrt(result.stats.num_samples) <= 1e-7
+
+
+def test_timeouts_bound_both_phases():
+    detector = SettleDetector(StabilityThresholds(max_avg_time=1.0))
+    # Slowly relaxing and noisy: never settles and never reaches the target sem
+    t, values = step_response(5.0, tau=10.0, jump=1e-4, noise=1e-5)
+    feed(detector, t, values)
+
+    result = detector.wait(timeout=0)
+    assert result.settle_reason == "timeout"
+    assert result.settle_time == pytest.approx(0.5, abs=2 / RATE)
+    assert result.avg_reason == "timeout"
+    assert result.avg_time == pytest.approx(1.0, abs=2 / RATE)
+
+
+def test_start_step_resets():
+    detector = SettleDetector()
+    t, values = step_response(5.0, tau=0.02, jump=1e-4, noise=2e-7)
+    feed(detector, t, values)
+    assert detector.done
+
+    detector.start_step()
+    assert not detector.done
+    assert detector.wait(timeout=0) is None
+    feed(detector, t + 10**10, values)
+    assert detector.wait(timeout=0).settled
+
+
+def test_instrument_state_is_attached_to_the_result():
+    detector = SettleDetector()
+    state = Future()
+    detector.start_step(state=state)
+    t, values = step_response(5.0, tau=0.02, jump=1e-4, noise=2e-7)
+    feed(detector, t, values)
+    assert detector.wait(timeout=0.01).state is None  # not read yet: not attached
+    state.set_result("state")
+    assert detector.wait(timeout=0).state == "state"
+
+
+def test_failed_instrument_state_keeps_the_result():
+    detector = SettleDetector()
+    state = Future()
+    state.set_exception(RuntimeError("WLM read failed"))
+    detector.start_step(state=state)
+    t, values = step_response(5.0, tau=0.02, jump=1e-4, noise=2e-7)
+    feed(detector, t, values)
+    result = detector.wait(timeout=0)
+    assert result.settled and result.state is None
+
+
+def test_thresholds_from_dict():
+    thresholds = StabilityThresholds.from_dict({"max_std": 5e-6, "unrelated": 1})
+    assert thresholds.max_std == 5e-6
+    assert thresholds.max_avg_time == StabilityThresholds().max_avg_time
@@ -0,0 +1,317 @@
+"""
+Frequency stability analysis of wavemeter streams: overlapping Allan deviation and Welch power spectral
+density, in NumPy only.
+
+Both work on the (host time ns, value) arrays of BaseScheduler.drain("host"), a TimeIndexedStore window or
+Recording.channel(). Samples with values <= 0 (wlmData error codes) are dropped, and the remaining samples
+are treated as evenly spaced at their median interval tau0, so a few missing samples shorten the time axis
+slightly instead of breaking the analysis.
+
+The Allan deviation is evaluated at octave-spaced averaging times tau = m * tau0 (m = 1, 2, 4, ...) from the
+cumulative sum of the frequency (the phase), so each tau is one vectorized pass over the data:
+    AVAR(m) = mean((x[i + 2m] - 2 x[i + m] + x[i]) ** 2) / (2 m**2)
+It is the deviation of a frequency averaged for tau from the next such average, in the units of the values
+(THz as delivered; divide by the frequency for fractional deviations). Its minimum is the averaging time
+after which longer averaging stops helping, because drift of the laser lock takes over from white noise:
+    report = analyze(t, freq)
+    config["wavemeter_avg_time"] = report.recommended_avg_time
+
+StreamingAllan computes the same Allan deviation incrementally as a SampleConsumer, for live monitoring.
+"""
+
+import math, threading
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Only averaging times with at least this many independent averages in the data are reported
+DEFAULT_MIN_AVERAGES = 10
+
+
+@dataclass(frozen=True, slots=True)
+class AllanResult:
+    """
+    Overlapping Allan deviation at octave-spaced averaging times.
+    """
+
+    tau: np.ndarray  # Averaging times in seconds
+    adev: np.ndarray  # Allan deviation at each tau, in the units of the values
+    # Approximate 1-sigma uncertainty of adev: adev / sqrt(samples / m)
+    error: np.ndarray
+    count: np.ndarray  # Number of overlapping differences behind each value
+    tau0: float  # Sample interval in seconds
+
+    def __len__(self) -> int:
+        return len(self.tau)
+
+    @property
+    def best_tau(self) -> float:
+        # Returns the averaging time with the smallest Allan deviation (nan if there is none).
+        return float(self.tau[np.argmin(self.adev)]) if len(self.tau) else math.nan
+
+    @property
+    def min_adev(self) -> float:
+        return float(self.adev.min()) if len(self.adev) else math.nan
+
+
+@dataclass(frozen=True, slots=True)
+class StabilityReport:
+    """
+    The Allan deviation and power spectral density of one stream, and the averaging time they suggest.
+    """
+
+    allan: AllanResult
+    freq: np.ndarray  # Fourier frequencies of the PSD in Hz
+    psd: np.ndarray  # One-sided power spectral density, in value units**2 per Hz
+    samples: int  # Valid samples analyzed
+
+    @property
+    def recommended_avg_time(self) -> float:
+        # Returns the averaging time that minimizes the Allan deviation.
+        return self.allan.best_tau
+
+
+def _valid(t: np.ndarray, value: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # Drops the wlmData error codes (values <= 0)
+    t = np.asarray(t, dtype=np.int64)
+    value = np.asarray(value, dtype=np.float64)
+    valid = value > 0
+    if not valid.all():
+        t, value = t[valid], value[valid]
+    return t, value
+
+
+def sample_interval(t: np.ndarray) -> float:
+    """
+    Returns the median interval in seconds of host times in ns.
+    """
+    if len(t) < 2:
+        raise ValueError("At least 2 samples are needed to find the sample interval.")
+    return float(np.median(np.diff(t))) * 1e-9
+
+
+def _octaves(n: int, min_averages: int) -> np.ndarray:
+    # m = 1, 2, 4, ... with at least min_averages averages of m samples and one full difference
+    m = 1 << np.arange(max(int(math.log2(max(n, 1))), 0) + 1)
+    return m[(n // m >= min_averages) & (2 * m <= n)]
+
+
+def overlapping_adev(
+    value: np.ndarray, tau0: float, min_averages: int = DEFAULT_MIN_AVERAGES
+) -> AllanResult:
+    """
+    Returns the overlapping Allan deviation of evenly spaced frequency samples at octave-spaced taus.
+
+    Args:
+        value (np.ndarray): The frequency samples.
+        tau0 (float): The sample interval in seconds.
+        min_averages (int): Only report taus with at least this many independent averages.
+    """
+    value = np.asarray(value, dtype=np.float64)
+    n = len(value)
+    m = _octaves(n, min_averages)
+    # Phase as a cumulative sum, relative to the first value so 375 THz does not swamp the noise
+    x = np.empty(n + 1)
+    x[0] = 0.0
+    if n:
+        np.cumsum(value - value[0], out=x[1:])
+    avar = np.empty(len(m))
+    for k, mk in enumerate(m):
+        d = x[2 * mk :] - 2.0 * x[mk:-mk] + x[: -2 * mk]
+        avar[k] = np.dot(d, d) / (len(d) * 2.0 * mk * mk)
+    adev = np.sqrt(avar)
+    return AllanResult(m * tau0, adev, adev / np.sqrt(n // m), n - 2 * m + 1, tau0)
+
+
+def _default_nperseg(n: int) -> int:
+    # The largest power of two giving at least 8 segments, from 16 to 65536
+    return min(1 << max(int(math.log2(max(n // 8, 1))), 4), 65536)
+
+
+def welch_psd(
+    value: np.ndarray,
+    fs: float,
+    nperseg: Optional[int] = None,
+    overlap: float = 0.5,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Returns the one-sided power spectral density (freq in Hz, psd in value units**2 per Hz) of evenly
+    spaced samples with Welch's method: Hann-windowed segments with their mean removed, averaged.
+
+    Args:
+        value (np.ndarray): The samples.
+        fs (float): The sample rate in Hz.
+        nperseg (int, optional): Samples per segment. Defaults to the largest power of two giving at
+            least 8 segments, at most 65536.
+        overlap (float): The fraction of each segment shared with the next.
+    """
+    value = np.asarray(value, dtype=np.float64)
+    n = len(value)
+    if nperseg is None:
+        nperseg = _default_nperseg(n)
+    if n < nperseg:
+        raise ValueError(f"Welch PSD needs at least {nperseg} samples, got {n}.")
+    step = max(int(nperseg * (1 - overlap)), 1)
+    segments = sliding_window_view(value, nperseg)[::step]
+    # Symmetric Hann window of nperseg + 2 points without its zero end points
+    window = np.hanning(nperseg + 2)[1:-1]
+    spectra = np.fft.rfft(
+        (segments - segments.mean(axis=1, keepdims=True)) * window, axis=1
+    )
+    psd = (spectra.real**2 + spectra.imag**2).mean(axis=0) / (
+        fs * np.dot(window, window)
+    )
+    # One-sided: fold the negative frequencies in, except at 0 and (even nperseg) Nyquist
+    psd[1 : (nperseg + 1) // 2] *= 2.0
+    return np.fft.rfftfreq(nperseg, 1.0 / fs), psd
+
+
+def analyze(
+    t: np.ndarray,
+    value: np.ndarray,
+    min_averages: int = DEFAULT_MIN_AVERAGES,
+    nperseg: Optional[int] = None,
+) -> StabilityReport:
+    """
+    Returns the Allan deviation, PSD and recommended averaging time of a (host time ns, value) stream.
+
+    Example (a recorded run):
+        t, freq = Recording("run.wlmrec").channel(1)
+        report = analyze(t, freq)
+        print(report.recommended_avg_time, report.allan.min_adev)
+    """
+    t, value = _valid(t, value)
+    tau0 = sample_interval(t)
+    n = len(value)
+    if nperseg is None:
+        nperseg = _default_nperseg(n)
+    if n >= nperseg:
+        freq, psd = welch_psd(value, 1.0 / tau0, nperseg)
+    else:
+        # Too short for one segment: only the Allan deviation
+        freq, psd = np.zeros(0), np.zeros(0)
+    return StabilityReport(overlapping_adev(value, tau0, min_averages), freq, psd, n)
+
+
+class StreamingAllan:
+    """
+    A SampleConsumer computing the overlapping Allan deviation of a live stream, e.g. to watch a laser
+    lock while it runs:
+        allan = StreamingAllan(tau0=1 / 500)
+        scheduler.add_consumer(allan)
+        ...
+        allan.result().best_tau
+
+    Each sample costs a few operations per octave, and memory is bounded by the history the longest
+    tau needs (2 * 2**(octaves - 1) phase values). The result equals overlapping_adev over every sample
+    received so far. Samples are processed in chunks of `chunk`; result() includes the pending ones.
+    """
+
+    def __init__(
+        self,
+        tau0: Optional[float] = None,
+        octaves: int = 16,
+        min_averages: int = DEFAULT_MIN_AVERAGES,
+        chunk: int = 256,
+    ):
+        """
+        Args:
+            tau0 (float, optional): The sample interval in seconds. Defaults to the median interval of
+                the first chunk's host times.
+            octaves (int): The number of taus tracked, m = 1, 2, ..., 2**(octaves - 1).
+            min_averages (int): Only report taus with at least this many independent averages.
+            chunk (int): The number of samples collected before they are processed.
+        """
+        self._tau0 = tau0
+        self._m = 1 << np.arange(octaves)
+        self._min_averages = min_averages
+        self._chunk = chunk
+        self._lock = threading.Lock()
+        self._t: list = []
+        self._value: list = []
+        self._ref: Optional[float] = None
+        self._n = 0
+        # The last 2 * max(m) + 1 phase values; x[0] = 0 before the first sample
+        self._history = np.zeros(1)
+        self._sum = np.zeros(octaves)
+        self._count = np.zeros(octaves, dtype=np.int64)
+
+    # SampleConsumer
+    def update(self, t: int, value: float) -> None:
+        with self._lock:
+            self._t.append(t)
+            self._value.append(value)
+            if len(self._value) >= self._chunk:
+                self._run()
+
+    def update_many(self, t: np.ndarray, value: np.ndarray) -> None:
+        with self._lock:
+            self._t.extend(t.tolist())
+            self._value.extend(value.tolist())
+            if len(self._value) >= self._chunk:
+                self._run()
+
+    @property
+    def samples(self) -> int:
+        return self._n
+
+    def result(self) -> AllanResult:
+        """
+        Returns the Allan deviation of every valid sample so far.
+        """
+        with self._lock:
+            self._run()
+            m, n = self._m, self._n
+            keep = (self._count > 0) & (n // m >= self._min_averages)
+            avar = self._sum[keep] / (self._count[keep] * 2.0 * m[keep] ** 2)
+            adev = np.sqrt(avar)
+            tau0 = self._tau0 if self._tau0 is not None else math.nan
+            return AllanResult(
+                m[keep] * tau0,
+                adev,
+                adev / np.sqrt(n // m[keep]),
+                self._count[keep],
+                tau0,
+            )
+
+    def reset(self) -> None:
+        """
+        Forgets every sample, e.g. after the lock point changed.
+        """
+        with self._lock:
+            self._t, self._value = [], []
+            self._ref = None
+            self._n = 0
+            self._history = np.zeros(1)
+            self._sum[:] = 0.0
+            self._count[:] = 0
+
+    def _run(self) -> None:
+        if not self._value:
+            return
+        t, value = _valid(np.array(self._t), np.array(self._value))
+        if self._tau0 is None and len(t) < 2:
+            return  # keep collecting until the interval can be estimated
+        self._t, self._value = [], []
+        if len(value) == 0:
+            return
+        if self._tau0 is None:
+            self._tau0 = sample_interval(t)
+        if self._ref is None:
+            self._ref = float(value[0])
+        history = self._history
+        x = np.concatenate([history, history[-1] + np.cumsum(value - self._ref)])
+        h = len(history)
+        # Add the differences x[i + 2m] - 2 x[i + m] + x[i] that end in the new samples
+        for k, m in enumerate(self._m):
+            start = max(h - 2 * m, 0)
+            stop = len(x) - 2 * m
+            if stop <= start:
+                continue
+            d = x[start + 2 * m :] - 2.0 * x[start + m : stop + m] + x[start:stop]
+            self._sum[k] += np.dot(d, d)
+            self._count[k] += len(d)
+        self._history = x[-(2 * int(self._m[-1]) + 1) :]
+        self._n += len(value)
@@ -0,0 +1,108 @@
+import time
+import numpy as np
+import pytest
+
+from stability import StreamingAllan, analyze, overlapping_adev, welch_psd
+
+FREQUENCY = 384.2304844685  # THz
+RATE = 1000.0  # Hz
+
+
+def stream(n, white=1e-6, walk=0.0, seed=1):
+    rng = np.random.default_rng(seed)
+    t = (np.arange(n) * (1e9 / RATE)).astype(np.int64) + 10**12
+    value = FREQUENCY + white * rng.standard_normal(n)
+    if walk:
+        value += np.cumsum(walk * rng.standard_normal(n))
+    return t, value
+
+
+# TESTING overlapping_adev IN ISOLATION:
+class TestOverlappingAdev:
+    def test_white_noise_averages_down(self):
+        _, value = stream(200_000)
+        result = overlapping_adev(value, 1 / RATE)
+        assert result.tau[:4].tolist() == [0.001, 0.002, 0.004, 0.008]
+        expected = 1e-6 / np.sqrt(result.tau / result.tau0)
+        assert np.allclose(result.adev[:8], expected[:8], rtol=0.05)
+        assert (200_000 // (result.tau / result.tau0) >= 10).all()
+
+    def test_best_tau_where_drift_takes_over(self):
+        # avar = w**2 / m + r**2 * m / 3 is smallest at m = sqrt(3) * w / r = 173
+        _, value = stream(400_000, white=1e-6, walk=1e-8)
+        result = overlapping_adev(value, 1 / RATE)
+        assert 0.064 <= result.best_tau <= 0.512
+        assert result.min_adev == result.adev.min()
+
+    def test_millions_of_samples_in_seconds(self):
+        t, value = stream(2_000_000)
+        start = time.perf_counter()
+        report = analyze(t, value)
+        assert time.perf_counter() - start < 5.0
+        assert report.samples == 2_000_000 and len(report.allan) == 18
+
+
+# TESTING welch_psd IN ISOLATION:
+class TestWelchPsd:
+    def test_white_noise_level(self):
+        _, value = stream(100_000)
+        freq, psd = welch_psd(value, RATE, nperseg=1024)
+        assert freq[0] == 0 and freq[-1] == RATE / 2 and len(psd) == 513
+        # One-sided white noise: 2 sigma**2 / fs
+        assert np.median(psd[1:-1]) == pytest.approx(2e-12 / RATE, rel=0.05)
+
+    def test_finds_a_modulation(self):
+        t, value = stream(50_000)
+        value += 1e-5 * np.sin(2 * np.pi * 50.0 * (t - t[0]) * 1e-9)
+        freq, psd = welch_psd(value, RATE)
+        assert freq[np.argmax(psd)] == pytest.approx(50.0, abs=RATE / 4096)
+
+    def test_needs_a_full_segment(self):
+        with pytest.raises(ValueError):
+            welch_psd(np.ones(100), RATE, nperseg=256)
+
+
+# TESTING analyze IN ISOLATION:
+def test_analyze_drops_error_codes_and_finds_the_rate():
+    t, value = stream(20_000, walk=1e-8)
+    value[::100] = -3.0  # ErrLowSignal
+    report = analyze(t, value)
+    assert report.samples == 19_800
+    assert report.allan.tau0 == pytest.approx(1 / RATE)
+    assert report.recommended_avg_time == report.allan.best_tau
+    assert len(report.freq) == len(report.psd) > 0
+
+
+def test_analyze_short_stream_has_no_psd():
+    t, value = stream(12)
+    report = analyze(t, value, min_averages=2)
+    assert report.samples == 12 and len(report.allan) > 0
+    assert len(report.freq) == len(report.psd) == 0
+
+
+# TESTING StreamingAllan IN ISOLATION:
+class TestStreamingAllan:
+    def test_matches_the_batch_result(self):
+        t, value = stream(50_000, walk=1e-8)
+        allan = StreamingAllan(octaves=12)
+        for i in range(0, 49_000, 700):
+            allan.update_many(t[i : i + 700], value[i : i + 700])
+        for i in range(49_000, 50_000):
+            allan.update(int(t[i]), float(value[i]))
+
+        live, batch = allan.result(), overlapping_adev(value, 1 / RATE)
+        assert allan.samples == 50_000
+        assert live.tau0 == pytest.approx(batch.tau0)
+        assert np.array_equal(live.count, batch.count[:12])
+        assert np.allclose(live.adev, batch.adev[:12], rtol=1e-6)
+
+    def test_reset_forgets_samples(self):
+        t, value = stream(5_000)
+        allan = StreamingAllan(tau0=1 / RATE, octaves=4)
+        allan.update_many(t, value + 1.0)
+        allan.reset()
+        allan.update_many(t, value)
+        assert allan.samples == 5_000
+        assert np.allclose(
+            allan.result().adev, overlapping_adev(value, 1 / RATE).adev[:4]
+        )
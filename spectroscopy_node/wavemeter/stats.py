@@ -0,0 +1,176 @@
+import math, threading
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass(frozen=True, slots=True)
+class FrequencyStats:
+    """
+    Summary of one averaging window, the numbers the controller reports in its frequency response.
+    """
+
+    avg_freq: float
+    stddev: float  # Population standard deviation (same as np.std)
+    num_samples: int
+    min_freq: float
+    max_freq: float
+    drift: float  # Least squares slope of the frequency over the window, per second
+
+
+class OnlineStats:
+    """
+    Constant-memory running statistics of a sample stream, updated as samples arrive.
+
+    Keeps count, mean and variance (Welford), min/max and the least squares slope of value vs. time
+    (a running drift estimate), so a window's statistics are ready the moment it closes without
+    keeping its samples. Attach it to a scheduler with BaseScheduler.add_consumer.
+
+    update/update_many are called from the acquisition thread and close_window from the consumer;
+    both hold a lock only for the few arithmetic operations of one update.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._count = 0
+        self._mean = 0.0
+        self._m2 = 0.0  # sum of squared deviations of the values
+        self._min = math.inf
+        self._max = -math.inf
+        # Time is kept in seconds relative to the first sample of the window
+        self._t0 = None
+        self._t_mean = 0.0
+        self._t_m2 = 0.0  # sum of squared deviations of the times
+        self._co_m2 = 0.0  # sum of products of time and value deviations
+
+    # public API
+    @property
+    def count(self) -> int:
+        return self._count
+
+    @property
+    def mean(self) -> float:
+        return self._mean if self._count else math.nan
+
+    @property
+    def variance(self) -> float:
+        # Population variance (ddof=0), like np.var.
+        return self._m2 / self._count if self._count else math.nan
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+    @property
+    def sem(self) -> float:
+        # Standard error of the mean.
+        return self.std / math.sqrt(self._count) if self._count else math.nan
+
+    @property
+    def min(self) -> float:
+        return self._min
+
+    @property
+    def max(self) -> float:
+        return self._max
+
+    @property
+    def drift(self) -> float:
+        # Least squares slope of value vs. time, in value units per second.
+        if self._t_m2 == 0:
+            return 0.0
+        return self._co_m2 / self._t_m2
+
+    def update(self, t: int, value: float) -> None:
+        """
+        Adds one sample.
+
+        Args:
+            t (int): Host time of the sample in nanoseconds (time.monotonic_ns).
+            value (float): The sample value.
+        """
+        with self._lock:
+            if self._t0 is None:
+                self._t0 = t
+            ts = (t - self._t0) * 1e-9
+            self._count += 1
+            n = self._count
+
+            dv = value - self._mean
+            dt = ts - self._t_mean
+            self._mean += dv / n
+            self._t_mean += dt / n
+            self._m2 += dv * (value - self._mean)
+            self._t_m2 += dt * (ts - self._t_mean)
+            self._co_m2 += dt * (value - self._mean)
+
+            if value < self._min:
+                self._min = value
+            if value > self._max:
+                self._max = value
+
+    def update_many(self, t: np.ndarray, value: np.ndarray) -> None:
+        """
+        Adds a block of samples by merging its statistics into the running ones (Chan et al.).
+
+        Args:
+            t (np.ndarray): Host times of the samples in nanoseconds.
+            value (np.ndarray): The sample values.
+        """
+        m = len(value)
+        if m == 0:
+            return
+        value = np.asarray(value, dtype=np.float64)
+        with self._lock:
+            if self._t0 is None:
+                self._t0 = int(t[0])
+            ts = (np.asarray(t, dtype=np.int64) - self._t0) * 1e-9
+
+            b_mean, b_t_mean = float(value.mean()), float(ts.mean())
+            dv_b, dt_b = value - b_mean, ts - b_t_mean
+            b_m2 = float(np.dot(dv_b, dv_b))
+            b_t_m2 = float(np.dot(dt_b, dt_b))
+            b_co_m2 = float(np.dot(dt_b, dv_b))
+
+            n = self._count
+            total = n + m
+            dv = b_mean - self._mean
+            dt = b_t_mean - self._t_mean
+            self._mean += dv * m / total
+            self._t_mean += dt * m / total
+            self._m2 += b_m2 + dv * dv * n * m / total
+            self._t_m2 += b_t_m2 + dt * dt * n * m / total
+            self._co_m2 += b_co_m2 + dt * dv * n * m / total
+            self._count = total
+
+            self._min = min(self._min, float(value.min()))
+            self._max = max(self._max, float(value.max()))
+
+    def result(self) -> FrequencyStats:
+        """
+        Returns the statistics of the current window without closing it.
+        """
+        with self._lock:
+            return self._result()
+
+    def close_window(self) -> FrequencyStats:
+        """
+        Returns the statistics of the current window and starts a new one.
+        """
+        with self._lock:
+            result = self._result()
+            self._reset()
+            return result
+
+    def _result(self) -> FrequencyStats:
+        return FrequencyStats(
+            avg_freq=self.mean,
+            stddev=self.std,
+            num_samples=self._count,
+            min_freq=self._min,
+            max_freq=self._max,
+            drift=self.drift,
+        )
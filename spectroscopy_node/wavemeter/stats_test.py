@@ -0,0 +1,69 @@
+import math
+
+import numpy as np
+import pytest
+
+import wlmConst
+from buffers import RingBuffer
+from scheduler import EventDrivenScheduler
+from stats import OnlineStats
+
+
+def drifting_stream(n=1000, drift=2.5, seed=1):
+    """A 500 Hz stream drifting by `drift` per second, with host times in ns."""
+    rng = np.random.default_rng(seed)
+    t = (np.arange(n) * 2_000_000).astype(np.int64)
+    value = 375_000.0 + drift * t * 1e-9 + rng.normal(0, 1e-3, n)
+    return t, value
+
+
+# TESTING OnlineStats IN ISOLATION:
+class TestOnlineStats:
+    def test_matches_numpy(self):
+        t, value = drifting_stream()
+        stats = OnlineStats()
+        for ti, vi in zip(t, value):
+            stats.update(int(ti), float(vi))
+
+        result = stats.result()
+        assert result.num_samples == len(value)
+        assert result.avg_freq == pytest.approx(value.mean(), rel=1e-12)
+        assert result.stddev == pytest.approx(value.std(), rel=1e-9)
+        assert (result.min_freq, result.max_freq) == (value.min(), value.max())
+        assert result.drift == pytest.approx(np.polyfit(t * 1e-9, value, 1)[0])
+
+    def test_update_many_equals_update(self):
+        t, value = drifting_stream()
+        single, blocks = OnlineStats(), OnlineStats()
+        for ti, vi in zip(t, value):
+            single.update(int(ti), float(vi))
+        for i in range(0, len(t), 64):
+            blocks.update_many(t[i : i + 64], value[i : i + 64])
+
+        assert blocks.mean == pytest.approx(single.mean, rel=1e-12)
+        assert blocks.variance == pytest.approx(single.variance, rel=1e-9)
+        assert blocks.drift == pytest.approx(single.drift, rel=1e-9)
+
+    def test_close_window_resets(self):
+        stats = OnlineStats()
+        stats.update(0, 1.0)
+        stats.update(1, 3.0)
+
+        assert stats.close_window().avg_freq == 2.0
+        assert stats.count == 0
+        assert math.isnan(stats.mean)
+
+
+# TESTING OnlineStats attached to a scheduler:
+def test_scheduler_updates_consumers():
+    scheduler = EventDrivenScheduler(None, buffer=RingBuffer(16))
+    stats = OnlineStats()
+    scheduler.add_consumer(stats)
+    for t in range(4):
+        scheduler.ring_callback_handler(wlmConst.cmiFrequency1, t, 10.0 + t)
+    scheduler.ring_callback_handler(wlmConst.cmiVersion, 5, 99.0)
+    scheduler.remove_consumer(stats)
+    scheduler.ring_callback_handler(wlmConst.cmiFrequency1, 6, 99.0)
+
+    assert stats.count == 4
+    assert stats.mean == 11.5
@@ -0,0 +1,178 @@
+import bisect, time
+from typing import Optional
+
+import numpy as np
+
+from stats import FrequencyStats, OnlineStats
+
+# Samples per chunk: ~2 minutes at the WS7's 500 Hz, 1 MiB per chunk for both columns
+DEFAULT_CHUNK_SIZE = 65_536
+
+# How long wait_until sleeps between checks
+_WAIT_POLL_INTERVAL = 0.001
+
+
+class _Chunk:
+    """
+    Fixed-size time and value columns; `size` is only advanced by the writer after a slot is filled.
+    """
+
+    __slots__ = ("t", "value", "size")
+
+    def __init__(self, capacity: int):
+        self.t = np.empty(capacity, dtype=np.int64)
+        self.value = np.empty(capacity, dtype=np.float64)
+        self.size = 0
+
+
+class TimeIndexedStore:
+    """
+    A SampleConsumer that records a scheduler's samples continuously and answers time-range queries.
+
+    Instead of starting and stopping a scheduler at every scan step, start it once, attach a store and
+    ask it for each step's samples afterwards:
+        store = TimeIndexedStore(retention=600)
+        scheduler.add_consumer(store)
+        scheduler.start()
+        ...
+        t_step = time.monotonic_ns()          # the step is applied
+        ...
+        store.wait_until(t_end)
+        t, freq = store.window(t_step + stabilization_ns, t_end)
+    The samples of the stabilization period stay available for diagnostics (window(t_step, ...)).
+
+    Samples are kept in host-time order (time.monotonic_ns) in a list of fixed-size chunks, so appends
+    never copy old data and window() is a bisect over the chunks plus a searchsorted inside them.
+    Chunks older than `retention` seconds are released as a whole.
+
+    One thread writes (the scheduler's acquisition thread), any thread may query. The writer publishes
+    a sample by advancing the chunk's size after filling the slot, and replaces (never mutates) the
+    chunk list, so queries need no lock.
+    """
+
+    def __init__(
+        self, retention: Optional[float] = 600.0, chunk_size: int = DEFAULT_CHUNK_SIZE
+    ):
+        """
+        Args:
+            retention (float, optional): Seconds of samples to keep. Defaults to ten minutes;
+                None keeps everything.
+            chunk_size (int): The number of samples per chunk.
+        """
+        self._retention_ns = None if retention is None else int(retention * 1e9)
+        self._chunk_size = chunk_size
+        self._chunks: tuple[_Chunk, ...] = ()
+        # Start time of each chunk, parallel to _chunks, for bisecting
+        self._starts: tuple[int, ...] = ()
+        self._last_t: Optional[int] = None
+
+    # public API
+    def __len__(self) -> int:
+        return sum(chunk.size for chunk in self._chunks)
+
+    @property
+    def latest(self) -> Optional[int]:
+        # Returns the host time of the newest sample (None if empty).
+        return self._last_t
+
+    @property
+    def earliest(self) -> Optional[int]:
+        # Returns the host time of the oldest sample still kept (None if empty).
+        chunks = self._chunks
+        return int(chunks[0].t[0]) if chunks else None
+
+    def wait_until(self, t: int, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until a sample at or after host time t has been recorded, so window(..., t) is complete.
+        Returns False on timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._last_t is None or self._last_t < t:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(_WAIT_POLL_INTERVAL)
+        return True
+
+    def window(self, t0: int, t1: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns copies of the samples with t0 <= host time < t1 as (t, value) arrays.
+
+        Args:
+            t0 (int): Start of the window in time.monotonic_ns.
+            t1 (int): End of the window (exclusive) in time.monotonic_ns.
+        """
+        chunks, starts = self._chunks, self._starts
+        if not chunks or t1 <= t0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+        # Samples at t0 can only be in the chunks from the last one starting before t0 onwards
+        first = max(bisect.bisect_left(starts, t0) - 1, 0)
+        last = bisect.bisect_left(starts, t1)
+        t_parts, value_parts = [], []
+        for chunk in chunks[first:last]:
+            size = chunk.size
+            t = chunk.t[:size]
+            i, j = np.searchsorted(t, (t0, t1), side="left")
+            t_parts.append(t[i:j])
+            value_parts.append(chunk.value[i:j])
+        if not t_parts:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+        return np.concatenate(t_parts), np.concatenate(value_parts)
+
+    def window_stats(self, t0: int, t1: int) -> FrequencyStats:
+        """
+        Returns the statistics of the samples in [t0, t1).
+        """
+        stats = OnlineStats()
+        stats.update_many(*self.window(t0, t1))
+        return stats.result()
+
+    # SampleConsumer
+    def update(self, t: int, value: float) -> None:
+        # Keep the time column sorted: the clock model can step host times back by a few microseconds
+        if self._last_t is not None and t < self._last_t:
+            t = self._last_t
+        chunks = self._chunks
+        if not chunks or chunks[-1].size == self._chunk_size:
+            chunks = self._add_chunk(t)
+        chunk = chunks[-1]
+        i = chunk.size
+        chunk.t[i] = t
+        chunk.value[i] = value
+        chunk.size = i + 1
+        self._last_t = t
+
+    def update_many(self, t: np.ndarray, value: np.ndarray) -> None:
+        n = len(t)
+        if n == 0:
+            return
+        t = np.maximum.accumulate(np.asarray(t, dtype=np.int64))
+        if self._last_t is not None:
+            t = np.maximum(t, self._last_t)
+        done = 0
+        while done < n:
+            chunks = self._chunks
+            if not chunks or chunks[-1].size == self._chunk_size:
+                chunks = self._add_chunk(int(t[done]))
+            chunk = chunks[-1]
+            i = chunk.size
+            k = min(n - done, self._chunk_size - i)
+            chunk.t[i : i + k] = t[done : done + k]
+            chunk.value[i : i + k] = value[done : done + k]
+            chunk.size = i + k
+            done += k
+        self._last_t = int(t[-1])
+
+    def _add_chunk(self, t: int) -> tuple[_Chunk, ...]:
+        chunks, starts = self._chunks, self._starts
+        # Release the chunks whose newest sample is older than the retention
+        if self._retention_ns is not None:
+            horizon = t - self._retention_ns
+            keep = 0
+            while (
+                keep < len(chunks) and chunks[keep].t[chunks[keep].size - 1] < horizon
+            ):
+                keep += 1
+            chunks, starts = chunks[keep:], starts[keep:]
+        self._chunks = chunks + (_Chunk(self._chunk_size),)
+        self._starts = starts + (t,)
+        return self._chunks
@@ -0,0 +1,82 @@
+import threading
+
+import numpy as np
+import pytest
+
+from store import TimeIndexedStore
+
+
+# TESTING TimeIndexedStore IN ISOLATION:
+class TestTimeIndexedStore:
+    def test_window_returns_samples_in_range(self):
+        store = TimeIndexedStore(retention=None, chunk_size=16)
+        t = np.arange(100, dtype=np.int64) * 10
+        store.update_many(t, t * 0.5)
+
+        t_out, values = store.window(200, 300)
+        assert t_out.tolist() == list(range(200, 300, 10))
+        assert values.tolist() == (np.arange(200, 300, 10) * 0.5).tolist()
+        assert len(store) == 100
+
+    def test_window_spans_chunks_and_single_updates(self):
+        store = TimeIndexedStore(retention=None, chunk_size=8)
+        for i in range(50):
+            store.update(i, float(i))
+        t_out, _ = store.window(3, 45)
+        assert t_out.tolist() == list(range(3, 45))
+        assert len(store.window(50, 60)[0]) == 0
+        assert len(store.window(-10, 0)[0]) == 0
+
+    def test_window_with_repeated_timestamps_at_chunk_borders(self):
+        store = TimeIndexedStore(retention=None, chunk_size=4)
+        store.update_many(np.array([0, 5, 5, 5, 5, 5, 5, 5, 9]), np.ones(9))
+        assert len(store.window(5, 6)[0]) == 7
+
+    def test_timestamps_are_kept_sorted(self):
+        store = TimeIndexedStore(retention=None)
+        store.update(100, 1.0)
+        store.update(90, 2.0)  # stepped back by a clock refit
+        store.update_many(np.array([95, 110]), np.array([3.0, 4.0]))
+        t_out, _ = store.window(0, 1000)
+        assert t_out.tolist() == [100, 100, 100, 110]
+
+    def test_retention_releases_old_chunks(self):
+        store = TimeIndexedStore(retention=1.0, chunk_size=10)
+        t = np.arange(100, dtype=np.int64) * 100_000_000  # 10 samples per second
+        store.update_many(t, np.zeros(100))
+        assert store.earliest >= t[-1] - 2_000_000_000
+        assert store.latest == t[-1]
+        assert len(store) < 30
+
+    def test_window_stats(self):
+        store = TimeIndexedStore()
+        store.update_many(np.arange(10), np.array([1.0] * 5 + [3.0] * 5))
+        assert store.window_stats(0, 5).avg_freq == 1.0
+        assert store.window_stats(0, 10).avg_freq == 2.0
+        assert store.window_stats(0, 10).num_samples == 10
+
+    def test_wait_until(self):
+        store = TimeIndexedStore()
+        assert not store.wait_until(10, timeout=0.01)
+        timer = threading.Timer(0.02, store.update, (20, 1.0))
+        timer.start()
+        assert store.wait_until(10, timeout=1.0)
+        timer.join()
+
+    def test_concurrent_reads_see_complete_samples(self):
+        store = TimeIndexedStore(retention=None, chunk_size=64)
+        n = 20_000
+
+        def write():
+            for i in range(0, n, 10):
+                t = np.arange(i, i + 10, dtype=np.int64)
+                store.update_many(t, t.astype(np.float64))
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        while writer.is_alive():
+            t_out, values = store.window(0, n)
+            assert (t_out == values).all()
+            assert (np.diff(t_out) == 1).all()
+        writer.join()
+        assert len(store.window(0, n)[0]) == n
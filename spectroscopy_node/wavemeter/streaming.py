@@ -0,0 +1,118 @@
+import asyncio, threading
+from typing import Optional
+
+import numpy as np
+
+
+class BatchStream:
+    """
+    A SampleConsumer that hands samples from the acquisition thread to an asyncio event loop in batches.
+
+    Samples are collected under a lock on the acquisition thread. The event loop is woken with
+    call_soon_threadsafe at most twice per batch: once when a batch starts (to arm a max_latency timer)
+    and once if it fills up to max_batch before the timer fires. So the loop sees one wakeup per batch
+    instead of one per sample, and a sample waits at most max_latency before it is delivered.
+
+    Use it through BaseScheduler.stream().
+    """
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        max_batch: int = 256,
+        max_latency: float = 0.05,
+    ):
+        """
+        Args:
+            loop (asyncio.AbstractEventLoop): The event loop the batches are delivered to.
+            max_batch (int): The maximum number of samples per batch.
+            max_latency (float): The longest a sample waits for its batch to be delivered, in seconds.
+        """
+        self._loop = loop
+        self._max_batch = max_batch
+        self._max_latency = max_latency
+        self._batches: asyncio.Queue = asyncio.Queue()
+
+        self._lock = threading.Lock()
+        self._t: list = []
+        self._value: list = []
+        # A batch has started and its timer was requested
+        self._timer_requested = False
+        # The batch filled up and an immediate flush was requested
+        self._flush_requested = False
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._closed = False
+
+    # acquisition thread
+    def update(self, t: int, value: float) -> None:
+        with self._lock:
+            self._t.append(t)
+            self._value.append(value)
+            self._request_wakeup()
+
+    def update_many(self, t: np.ndarray, value: np.ndarray) -> None:
+        with self._lock:
+            self._t.extend(t.tolist())
+            self._value.extend(value.tolist())
+            self._request_wakeup()
+
+    def _request_wakeup(self) -> None:
+        # Called with the lock held
+        if self._closed:
+            return
+        try:
+            if not self._timer_requested:
+                self._timer_requested = True
+                self._loop.call_soon_threadsafe(self._start_timer)
+            if len(self._t) >= self._max_batch and not self._flush_requested:
+                self._flush_requested = True
+                self._loop.call_soon_threadsafe(self._flush)
+        except RuntimeError:
+            self._closed = True  # the event loop was closed
+
+    # event loop
+    def _start_timer(self) -> None:
+        if self._timer is None:
+            self._timer = self._loop.call_later(self._max_latency, self._flush)
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        with self._lock:
+            t, value = self._t, self._value
+            self._t, self._value = [], []
+            self._timer_requested = False
+            self._flush_requested = False
+        n = self._max_batch
+        for i in range(0, len(t), n):
+            self._batches.put_nowait(
+                (
+                    np.asarray(t[i : i + n], dtype=np.int64),
+                    np.asarray(value[i : i + n], dtype=np.float64),
+                )
+            )
+
+    async def get(
+        self, timeout: Optional[float] = None
+    ) -> Optional[tuple[np.ndarray, np.ndarray]]:
+        """
+        Returns the next batch of (host time ns, value) arrays, or None if none arrived within timeout.
+        """
+        try:
+            return await asyncio.wait_for(self._batches.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self) -> list[tuple[np.ndarray, np.ndarray]]:
+        """
+        Stops requesting wakeups and returns the batches not yet taken, including the pending samples.
+        Must be called on the event loop.
+        """
+        with self._lock:
+            self._closed = True
+        self._flush()
+        remaining = []
+        while not self._batches.empty():
+            remaining.append(self._batches.get_nowait())
+        return remaining
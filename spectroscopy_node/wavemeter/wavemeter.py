@@ -1,6 +1,7 @@
-import sys, weakref
+import contextlib, sys, weakref, ctypes
 import queue, threading, time
-from typing import Optional, Callable, Protocol, TYPE_CHECKING
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, Callable, Protocol, Sequence, TYPE_CHECKING
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
 
@@ -8,7 +9,6 @@ from dataclasses import dataclass, field
 import wlmConst
 import wlmData
 
-
 # Set the callback thread priority here:
 CALLBACK_THREAD_PRIORITY = 2  # TODO: look into what value I should use here. ALSO move this to a config file if needed.
 
@@ -34,6 +34,231 @@ class WavemeterWS7HighSignalException(WavemeterWS7Exception):
     pass
 
 
+class _NotificationDispatcher:
+    """
+    The wlmData library has one notification callback per process. So that several WavemeterWS7 objects
+    (e.g. one per WLM server instance) can have callbacks at the same time, one extended callback is
+    installed for all of them, and every event is dispatched on its Ver argument, the version of the
+    WLM instance that produced it.
+
+    Dispatching is a dict lookup on the DLL's callback thread; each handler feeds its own scheduler's
+    buffers, so an instance that measures much faster than another cannot crowd out the other's samples.
+
+    Observers (e.g. a WavemeterWS7's instrument-state cache) see the events of a version next to its
+    handler, without replacing it.
+
+    There is one dispatcher per library handle (see _dispatcher_for). It also tracks which instance
+    PresetWLMIndex selected for the WavemeterWS7 objects sharing the handle (see selected()).
+    """
+
+    def __init__(self, api):
+        self._api = api
+        self.lock = threading.RLock()
+        # version -> cb(ver, mode, intval, dblval, res1); replaced, never mutated, so the
+        # callback thread reads it without locking
+        self._handlers: dict[int, Callable] = {}
+        # version -> observers, replaced in the same way
+        self._observers: dict[int, tuple[Callable, ...]] = {}
+        self._cfunc = None
+        # The instance PresetWLMIndex selected last, and the number of calls running on it
+        self._selection = threading.Condition(threading.Lock())
+        self._selected: Optional[int] = None
+        self._active = 0
+
+    @contextlib.contextmanager
+    def selected(self, version: Optional[int]):
+        """
+        Selects a WLM instance with PresetWLMIndex for the wlmData calls in the with-block. Calls on the
+        selected instance run concurrently (e.g. the reads of snapshot_state); a call for another
+        instance waits until they are done. With version None the block has the library to itself, to
+        preset instances on its own.
+        """
+        with self._selection:
+            while self._active and (version is None or version != self._selected):
+                self._selection.wait()
+            if version is None or version != self._selected:
+                if version is not None:
+                    self._api.PresetWLMIndex(version)
+                self._selected = version
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._selection:
+                self._active -= 1
+                if not self._active:
+                    self._selection.notify_all()
+
+    def set_handler(self, version: int, handler: Callable) -> None:
+        with self.lock:
+            self._handlers = {**self._handlers, version: handler}
+            self._update_callback()
+
+    def remove_handler(self, version: int) -> None:
+        with self.lock:
+            handlers = dict(self._handlers)
+            handlers.pop(version, None)
+            self._handlers = handlers
+            self._update_callback()
+
+    def add_observer(self, version: int, observer: Callable) -> None:
+        with self.lock:
+            self._observers = {
+                **self._observers,
+                version: self._observers.get(version, ()) + (observer,),
+            }
+            self._update_callback()
+
+    def remove_observer(self, version: int, observer: Callable) -> None:
+        with self.lock:
+            observers = dict(self._observers)
+            remaining = tuple(
+                o for o in observers.pop(version, ()) if o is not observer
+            )
+            if remaining:
+                observers[version] = remaining
+            self._observers = observers
+            self._update_callback()
+
+    def _update_callback(self) -> None:
+        # Installs the DLL callback while there are handlers or observers. Called with the lock held.
+        needed = bool(self._handlers or self._observers)
+        if needed and self._cfunc is None:
+            # TODO: add CALLBACK_THREAD_PRIORITY as an argument to this method
+            self._cfunc = wlmData.CALLBACK_EX_TYPE(self._dispatch)
+            self._api.Instantiate(
+                wlmConst.cInstNotification,
+                wlmConst.cNotifyInstallCallbackEx,
+                self._cfunc,
+                CALLBACK_THREAD_PRIORITY,
+            )
+        elif not needed and self._cfunc is not None:
+            self._api.Instantiate(
+                wlmConst.cInstNotification, wlmConst.cNotifyRemoveCallback, None, 0
+            )
+            self._cfunc = None
+
+    def _dispatch(self, ver, mode, intval, dblval, res1) -> None:
+        handler = self._handlers.get(ver)
+        if handler is not None:
+            handler(ver, mode, intval, dblval, res1)
+        observers = self._observers
+        if observers:
+            for observer in observers.get(ver, ()):
+                observer(ver, mode, intval, dblval, res1)
+
+
+# One dispatcher per loaded library, dropped with the library
+_dispatchers: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_dispatchers_lock = threading.Lock()
+
+
+def _dispatcher_for(api) -> _NotificationDispatcher:
+    with _dispatchers_lock:
+        dispatcher = _dispatchers.get(api)
+        if dispatcher is None:
+            dispatcher = _dispatchers[api] = _NotificationDispatcher(api)
+        return dispatcher
+
+
+# Instrument-state parameters of snapshot_state, and the wlmData call reading each for a switcher channel.
+# Negative results are wlmData error codes (GetTemperature and GetPressure: ErrTemperature + code, ...).
+STATE_PARAMETERS = (
+    "temperature",
+    "pressure",
+    "exposure",
+    "linewidth",
+    "switcher_channel",
+)
+_STATE_READERS: dict[str, Callable[[int], tuple]] = {
+    "temperature": lambda channel: ("GetTemperature", 0.0),
+    "pressure": lambda channel: ("GetPressure", 0.0),
+    "exposure": lambda channel: ("GetExposureNum", channel, 1, 0),
+    "linewidth": lambda channel: ("GetLinewidthNum", channel, 0.0),
+    "switcher_channel": lambda channel: ("GetSwitcherChannel", 0),
+}
+
+# Events that report instrument-state changes: mode -> (parameter, switcher channel or 0 for every
+# channel, whether the value is intval rather than dblval). Exposure events are those of CCD array 1.
+_STATE_EVENTS: dict[int, tuple[str, int, bool]] = {
+    wlmConst.cmiTemperature: ("temperature", 0, False),
+    wlmConst.cmiPressure: ("pressure", 0, False),
+    wlmConst.cmiSwitcherChannel: ("switcher_channel", 0, True),
+    **{
+        mode: ("exposure", channel, True)
+        for channel, mode in enumerate(
+            (
+                wlmConst.cmiExposureValue11,
+                wlmConst.cmiExposureValue12,
+                wlmConst.cmiExposureValue13,
+                wlmConst.cmiExposureValue14,
+                wlmConst.cmiExposureValue15,
+                wlmConst.cmiExposureValue16,
+                wlmConst.cmiExposureValue17,
+                wlmConst.cmiExposureValue18,
+            ),
+            start=1,
+        )
+    },
+}
+_CHANNEL_PARAMETERS = ("exposure", "linewidth")
+
+_state_pool: Optional[ThreadPoolExecutor] = None
+_state_pool_lock = threading.Lock()
+
+
+def _state_executor() -> ThreadPoolExecutor:
+    # The threads reading instrument state, shared by every WavemeterWS7 and created on first use.
+    # ctypes releases the GIL during each DLL call, so the reads overlap.
+    global _state_pool
+    with _state_pool_lock:
+        if _state_pool is None:
+            _state_pool = ThreadPoolExecutor(
+                max_workers=len(STATE_PARAMETERS), thread_name_prefix="wlm-state"
+            )
+        return _state_pool
+
+
+@dataclass(frozen=True, slots=True)
+class InstrumentState:
+    """
+    A snapshot of instrument parameters (see STATE_PARAMETERS), e.g. to store next to a step's frequency.
+    """
+
+    t: int  # Host time (time.monotonic_ns) the snapshot was requested
+    values: dict[
+        str, float
+    ]  # Parameter -> value; negative values are wlmData error codes
+    ages: dict[
+        str, float
+    ]  # Parameter -> seconds between the value's event and t (0.0 if read)
+
+    def __getitem__(self, parameter: str) -> float:
+        return self.values[parameter]
+
+
+class _StateCache:
+    """
+    Observer keeping the latest instrument-state event values with their host arrival times.
+    Written on the DLL's callback thread, read by snapshot_state; each entry is replaced as a whole.
+    """
+
+    __slots__ = ("entries",)
+
+    def __init__(self):
+        # (parameter, channel or 0) -> (value, host time ns)
+        self.entries: dict[tuple[str, int], tuple[float, int]] = {}
+
+    def __call__(self, ver, mode, intval, dblval, res1) -> None:
+        event = _STATE_EVENTS.get(mode)
+        if event is not None:
+            parameter, channel, is_int = event
+            self.entries[(parameter, channel)] = (
+                float(intval) if is_int else dblval,
+                time.monotonic_ns(),
+            )
+
+
 class WavemeterWS7:
     """
     Wraps access to the wavemeter DLL or API for polling frequency data.
@@ -45,29 +270,303 @@ class WavemeterWS7:
     _CALLBACK_TYPE = (
         wlmData.CALLBACK_TYPE
     )  # Define the callback type for the wavemeter API
+    _CALLBACK_EX_TYPE = (
+        wlmData.CALLBACK_EX_TYPE
+    )  # Extended callback type, also reports the WLM version and a reserved value
 
-    def __init__(self):
+    def __init__(self, dll_path: Optional[str] = None, version: Optional[int] = None):
         """
         Initializes the WavemeterWS7 object.
         This may include loading the DLL or API and setting up the handle.
+
+        Args:
+            dll_path (str, optional): Path of the wlmData library, or wlmData.SIMULATED to run against
+                the simulated wavemeter (wlmSim). Defaults to the platform's library name.
+            version (int, optional): The version number of the WLM server instance to use, when several
+                run on this host (see versions()). Defaults to the version of the instance the library
+                addresses by default (the first one), resolved here.
         """
         try:
-            self._api = wlmData.LoadDLL()
-            # self._api = wlmData.LoadDLL('/path/to/your/libwlmData.so')
+            api = wlmData.LoadDLL(dll_path)
         except OSError as err:
             sys.exit(f"{err}\nPlease check if the wlmData DLL is installed correctly!")
 
         # Check the number of WLM server instances
-        if self._api.GetWLMCount(0) == 0:
+        if api.GetWLMCount(0) == 0:
             sys.exit("There is no running WLM server instance.")
 
-        self._cb_cfunc = None  # Callback function for frequency updates
+        try:
+            self._setup(api, version)
+        except WavemeterWS7Exception as err:
+            sys.exit(str(err))
+
+    def _setup(self, api, version: Optional[int]) -> None:
+        dispatcher = _dispatcher_for(api)
+        if version is None:
+            # Pin the default instance now: once any object has preset another instance, the library's
+            # selection no longer is the default one
+            with dispatcher.selected(None):
+                api.PresetWLMIndex(0)
+                version = api.GetWLMVersion(1)
+        elif api.GetWLMIndex(version) < 0:
+            raise WavemeterWS7Exception(
+                f"There is no running WLM server instance with version {version}."
+            )
+        self._api = api
+        self._version: int = version
+        self._dispatcher = dispatcher
+        self._callback_registered = False
+        self._state_cache: Optional[_StateCache] = None
+        # Interval mode before start_triggered_mode, restored by stop_triggered_mode
+        self._interval_mode = False
+
+    def instance(self, version: int) -> "WavemeterWS7":
+        """
+        Returns a WavemeterWS7 for another WLM server instance on the same library handle.
+        Raises WavemeterWS7Exception if no WLM server instance with this version is running.
+
+        Example (two WLM servers on one host, a scheduler for each):
+            wavemeter = WavemeterWS7()
+            a, b = (wavemeter.instance(v) for v in wavemeter.versions())
+            schedulers = [EventDrivenScheduler(a), EventDrivenScheduler(b)]
+        """
+        other = WavemeterWS7.__new__(WavemeterWS7)
+        other._setup(self._api, version)
+        return other
+
+    def versions(self) -> list[int]:
+        """
+        Returns the version numbers of the running WLM server instances.
+        """
+        with self._dispatcher.selected(None):
+            versions = []
+            for index in range(self._api.GetWLMCount(0)):
+                self._api.PresetWLMIndex(index)
+                versions.append(self._api.GetWLMVersion(1))
+            return versions
+
+    @property
+    def version(self) -> int:
+        # Returns the version of the WLM instance this object addresses.
+        return self._version
+
+    def _call(self, function: str, *args):
+        """
+        Calls a wlmData function on this object's WLM instance.
+        The instance is selected with PresetWLMIndex first, through the dispatcher shared by every
+        WavemeterWS7 on the library handle, so calls for different instances do not interleave.
+        """
+        with self._dispatcher.selected(self._version):
+            return getattr(self._api, function)(*args)
 
     def get_frequency(self) -> float:
         """
         Returns the current laser frequency in Hz (or MHz if preferred).
         """
-        frequency = self._api.GetFrequency(0.0)
+        return self._check_frequency(self._call("GetFrequency", 0.0))
+
+    def get_frequency_num(self, channel: int) -> float:
+        """
+        Returns the current laser frequency of a switcher channel (1-based), in the same units as get_frequency.
+        """
+        return self._check_frequency(self._call("GetFrequencyNum", channel, 0.0))
+
+    def get_frequency_raw(self, channel: Optional[int] = None) -> float:
+        """
+        Returns the frequency (of a switcher channel, if given) without checking for errors:
+        values <= 0 are the wlmData error codes (ErrNoSignal, ...). For polling at high rates,
+        where raising and catching an exception per failed poll is too slow.
+        """
+        if channel is None:
+            return self._call("GetFrequency", 0.0)
+        return self._call("GetFrequencyNum", channel, 0.0)
+
+    def get_exposure_num(self, channel: int, array: int = 1) -> int:
+        """
+        Returns the exposure time in ms of one CCD array (1 or 2) of a switcher channel.
+        Values <= 0 are wlmData error codes; this does not raise.
+        """
+        return self._call("GetExposureNum", channel, array, 0)
+
+    def get_linewidth_num(self, channel: int) -> float:
+        """
+        Returns the linewidth of a switcher channel as reported by GetLinewidthNum.
+        Values <= 0 are wlmData error codes; this does not raise.
+        """
+        return self._call("GetLinewidthNum", channel, 0.0)
+
+    def get_measurement_uncertainty(self, channel: int) -> float:
+        """
+        Returns the measurement uncertainty of a switcher channel's frequency, in the units of get_frequency.
+        Values <= 0 are wlmData error codes; this does not raise.
+        """
+        return self._call(
+            "GetMeasurementUncertainty", wlmConst.cReturnFrequency, channel, 0.0
+        )
+
+    # ---------Instrument state-------------
+
+    def track_state(self) -> None:
+        """
+        Starts caching the instrument-state values reported by callback events (cmiTemperature,
+        cmiPressure, cmiSwitcherChannel, cmiExposureValue1x), so snapshot_state can skip reading them.
+        Installs the DLL callback if no scheduler has. The DLL only reports changes, so a value that has
+        not changed for longer than snapshot_state's max_age is read anyway.
+        """
+        if self._state_cache is None:
+            self._state_cache = _StateCache()
+            self._dispatcher.add_observer(self._version, self._state_cache)
+
+    def untrack_state(self) -> None:
+        if self._state_cache is not None:
+            self._dispatcher.remove_observer(self._version, self._state_cache)
+            self._state_cache = None
+
+    def snapshot_state_async(
+        self,
+        parameters: Sequence[str] = STATE_PARAMETERS,
+        channel: int = 1,
+        max_age: float = 1.0,
+    ) -> "Future[InstrumentState]":
+        """
+        Starts an instrument-state snapshot and returns a Future of the InstrumentState, without blocking.
+
+        Values cached from events (see track_state) at most max_age seconds old are used as they are;
+        the others are read in a thread pool, each read in its own thread. Started together with a
+        step's acquisition, the snapshot is taken during the dwell instead of before or after it:
+            state = wavemeter.snapshot_state_async()
+            detector.start_step(state=state)  # attached to the step's SettleResult
+
+        Reads of other WLM instances wait for these (see _call), and these for theirs.
+
+        Args:
+            parameters (Sequence[str]): The parameters to record, out of STATE_PARAMETERS.
+            channel (int): The switcher channel of exposure and linewidth.
+            max_age (float): The oldest cached value used, in seconds; 0 reads every value.
+        """
+        unknown = set(parameters) - set(_STATE_READERS)
+        if unknown:
+            raise ValueError(f"Unknown instrument-state parameters: {sorted(unknown)}")
+        now = time.monotonic_ns()
+        values: dict[str, float] = {}
+        ages: dict[str, float] = {}
+        entries = self._state_cache.entries if self._state_cache is not None else {}
+        to_read = []
+        for parameter in parameters:
+            key = (parameter, channel if parameter in _CHANNEL_PARAMETERS else 0)
+            cached = entries.get(key)
+            if cached is not None and now - cached[1] <= max_age * 1e9:
+                values[parameter] = cached[0]
+                ages[parameter] = (now - cached[1]) / 1e9
+            else:
+                to_read.append(parameter)
+
+        def snapshot() -> InstrumentState:
+            # In the order the parameters were asked for
+            return InstrumentState(
+                now,
+                {p: values[p] for p in parameters},
+                {p: ages[p] for p in parameters},
+            )
+
+        result: Future = Future()
+        if not to_read:
+            result.set_result(snapshot())
+            return result
+
+        executor = _state_executor()
+        reads = [
+            executor.submit(self._call, *_STATE_READERS[parameter](channel))
+            for parameter in to_read
+        ]
+        remaining = [len(reads)]
+        lock = threading.Lock()
+
+        def read_done(_) -> None:
+            with lock:
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+            try:
+                for parameter, read in zip(to_read, reads):
+                    values[parameter] = float(read.result())
+                    ages[parameter] = 0.0
+            except Exception as e:
+                result.set_exception(e)
+            else:
+                result.set_result(snapshot())
+
+        for read in reads:
+            read.add_done_callback(read_done)
+        return result
+
+    def snapshot_state(
+        self,
+        parameters: Sequence[str] = STATE_PARAMETERS,
+        channel: int = 1,
+        max_age: float = 1.0,
+    ) -> InstrumentState:
+        """
+        Returns an instrument-state snapshot, reading the values not cached concurrently.
+        See snapshot_state_async for the arguments.
+        """
+        return self.snapshot_state_async(parameters, channel, max_age).result()
+
+    # ---------Triggered measurement-------------
+
+    def trigger_measurement(self, action: int) -> int:
+        """
+        Calls TriggerMeasurement with one of the cCtrlMeasurement* actions and returns its ResERR code.
+        """
+        return self._call("TriggerMeasurement", action)
+
+    def get_trigger_state(self) -> int:
+        """
+        Returns the trigger state (GetTriggerState): cCtrlMeasurementContinue when measuring freely,
+        cCtrlMeasurementInterrupt when waiting for triggers, cCtrlMeasurementTriggerPoll while a
+        triggered measurement is pending.
+        """
+        return self._call("GetTriggerState", 0)
+
+    def set_interval_mode(self, enabled: bool) -> int:
+        """
+        Switches the WLM's interval mode (measuring at fixed intervals) on or off, returns the ResERR code.
+        """
+        return self._call("SetIntervalMode", enabled)
+
+    def start_triggered_mode(self) -> None:
+        """
+        Stops free-running measurement: afterwards the wavemeter measures once per trigger()
+        (or per pulse on its trigger input). Interval mode is switched off and restored by stop_triggered_mode.
+        """
+        self._interval_mode = self._call("GetIntervalMode", False)
+        self.set_interval_mode(False)
+        ret = self.trigger_measurement(wlmConst.cCtrlMeasurementInterrupt)
+        if ret < 0:
+            raise WavemeterWS7Exception(
+                f"Could not enter triggered mode (ResERR {ret})"
+            )
+
+    def stop_triggered_mode(self) -> None:
+        """
+        Resumes free-running measurement.
+        """
+        self.trigger_measurement(wlmConst.cCtrlMeasurementContinue)
+        if self._interval_mode:
+            self.set_interval_mode(True)
+
+    def trigger(self) -> int:
+        """
+        Starts one measurement in triggered mode (cCtrlMeasurementTriggerPoll). Returns the ResERR code:
+        ResERR_NoErr, or e.g. ResERR_TriggerPending if the previous triggered measurement is not done yet.
+        """
+        return self.trigger_measurement(wlmConst.cCtrlMeasurementTriggerPoll)
+
+    @staticmethod
+    def _check_frequency(frequency: float) -> float:
+        """
+        Raises the matching exception if the frequency is one of the DLL's error values.
+        """
         match frequency:  # TODO: replace with a cleaner/briefer way to handle errors
             case wlmConst.ErrWlmMissing:
                 raise WavemeterWS7Exception("WLM inactive")
@@ -82,28 +581,25 @@ class WavemeterWS7:
 
         return frequency
 
-    def _register_callback(self, cb: _CALLBACK_TYPE) -> None:
-        # TODO: add CALLBACK_THREAD_PRIORITY as an argument to this method
-        """
-        Registers the frequency callback function with the wavemeter API.
-        This function is called to set up the callback for frequency updates.
+    def _register_callback(
+        self, handler: Callable[[int, int, int, float, int], None]
+    ) -> None:
         """
+        Registers an extended-signature handler for this object's WLM instance with the library's
+        notification dispatcher, replacing the handler registered before.
 
-        self._api.Instantiate(
-            wlmConst.cInstNotification,
-            wlmConst.cNotifyInstallCallback,
-            cb,
-            CALLBACK_THREAD_PRIORITY,
-        )
+        Args:
+            handler: Called with (ver, mode, intval, dblval, res1) for every event of this instance.
+        """
+        self._dispatcher.set_handler(self._version, handler)
+        self._callback_registered = True
 
     def _unregister_callback(self) -> None:
         """
-        Unregisters the frequency callback function from the wavemeter API.
-        This function is called to remove the callback for frequency updates.
+        Removes this object's handler; the DLL callback is removed with the last handler.
         """
-        self._api.Instantiate(
-            wlmConst.cInstNotification, wlmConst.cNotifyRemoveCallback, None, 0
-        )
+        self._dispatcher.remove_handler(self._version)
+        self._callback_registered = False
 
     # ---------Public Helper Methods-------------
 
@@ -115,37 +611,106 @@ class WavemeterWS7:
         This method is used to set up the callback for frequency updates.
 
         Args:
-            cb (_CALLBACK_TYPE): The callback function to register.
+            cb (Callable[[int, int, float], None]): The callback function to register, cb(mode, intval, dblval).
 
         DOCUMENTATION:
         Order of Operations:
         1. An event occurs in the wavemeter (e.g., a frequency update).
-        2. The wavemeter API calls the _wrapper function with the event data.
-            - The _wrapper function is NOT a bound method (it does not have a hidden self argument) so it has the proper C-style callback signature.
-        3. The _wrapper function calls the user-defined callback function (cb) (which MAY be a bound method with a hidden self argument) with the event data.
-        4. The user-defined callback function processes the event data as needed.
+        2. The wavemeter API calls the dispatcher's C callback (_NotificationDispatcher._dispatch) with the event data.
+            - It is shared by every WavemeterWS7 on the library, so several WLM instances can have callbacks at once.
+        3. The dispatcher calls the _wrapper of the WavemeterWS7 whose WLM version matches the event's Ver.
+        4. The _wrapper function calls the user-defined callback function (cb) (which MAY be a bound method with a hidden self argument) with the event data.
         5. Repeat
         """
 
-        def _wrapper(mode, intval, dblval):
-            """
-            A wrapper function to call the user-defined callback with the frequency value.
-
-            """
+        def _wrapper(ver, mode, intval, dblval, res1):
+            # convert the extended signature to the plain callback signature
             cb(mode, intval, dblval)
-            # convert the cb signature to match the wavemeter callback signature
 
-        self._cb_cfunc = self._CALLBACK_TYPE(_wrapper)
-        # Register the callback function with the wavemeter API
-        self._register_callback(self._cb_cfunc)
+        self._register_callback(_wrapper)
+
+    def register_frequency_callback_ex(
+        self, cb: Callable[[int, int, int, float, int], None]
+    ) -> None:
+        """
+        Public method to register an extended frequency callback function (CALLBACK_EX_TYPE).
+        The extended callback additionally receives the WLM version (ver) and a reserved value (res1):
+            cb(ver, mode, intval, dblval, res1)
+
+        Only one callback (plain or extended) can be registered per WavemeterWS7 at a time.
+        Remove it with unregister_frequency_callback.
+
+        Args:
+            cb (Callable[[int, int, int, float, int], None]): The callback function to register.
+        """
+        self._register_callback(cb)
 
     def unregister_frequency_callback(self) -> None:
         """
         Public method to unregister the frequency callback function.
         This method is used to remove the callback for frequency updates.
         """
-        if (
-            self._cb_cfunc is not None
-        ):  # TODO: make sure this ^ wont ever happen if the callback is registered
+        if self._callback_registered:
             self._unregister_callback()
-            self._cb_cfunc = None
+
+    def install_wait_event(self, timeout_ms: int) -> None:
+        """
+        Installs the DLL's wait-event mechanism (cNotifyInstallWaitEventEx).
+        Afterwards wait_for_next_event_ex blocks for at most timeout_ms per call.
+        Like the callback, the mechanism exists once per process and reports the events of every WLM
+        instance; filter on the returned ver, or use callbacks for several instances.
+
+        Args:
+            timeout_ms (int): The maximum time a single wait blocks, in milliseconds.
+        """
+        # Out-parameters reused by every wait, so waiting does not allocate ctypes objects per event
+        self._wait_ver = ctypes.c_int32()
+        self._wait_mode = ctypes.c_int32()
+        self._wait_intval = ctypes.c_int32()
+        self._wait_dblval = ctypes.c_double()
+        self._wait_res1 = ctypes.c_int32()
+        self._api.Instantiate(
+            wlmConst.cInstNotification,
+            wlmConst.cNotifyInstallWaitEventEx,
+            timeout_ms,
+            0,
+        )
+
+    def remove_wait_event(self) -> None:
+        """
+        Removes the DLL's wait-event mechanism.
+        """
+        self._api.Instantiate(
+            wlmConst.cInstNotification, wlmConst.cNotifyRemoveWaitEvent, None, 0
+        )
+
+    def clear_events(self) -> None:
+        """
+        Discards the events the DLL has queued for the wait-event mechanism.
+        """
+        self._api.ClearWLMEvents()
+
+    def wait_for_next_event_ex(self) -> tuple[int, int, int, int, float, int]:
+        """
+        Blocks until the next WLM event or the timeout given to install_wait_event.
+        The DLL releases the GIL while blocking, so other Python threads keep running.
+
+        Returns:
+            (ret, ver, mode, intval, dblval, res1): ret is 1 if an event was received,
+            0 on timeout and negative if the wait-event mechanism is not installed.
+        """
+        ret = self._api.WaitForNextWLMEventEx(
+            ctypes.byref(self._wait_ver),
+            ctypes.byref(self._wait_mode),
+            ctypes.byref(self._wait_intval),
+            ctypes.byref(self._wait_dblval),
+            ctypes.byref(self._wait_res1),
+        )
+        return (
+            ret,
+            self._wait_ver.value,
+            self._wait_mode.value,
+            self._wait_intval.value,
+            self._wait_dblval.value,
+            self._wait_res1.value,
+        )
@@ -1,200 +1,495 @@
-import threading
+import ctypes, ctypes.util
 import time
 import pytest
-from typing import Generator
-from spectroscopy_node.wavemeter import wlmConst
-from spectroscopy_node.wavemeter.wavemeter import (
+import numpy as np
+
+import wlmConst
+import wlmData
+from wavemeter import (
+    STATE_PARAMETERS,
     WavemeterWS7,
-    IntervalScheduler,
-    CbEventDrivenScheduler,
-    SamplePoint,
     WavemeterWS7Exception,
+    WavemeterWS7NoSignalException,
+    WavemeterWS7LowSignalException,
 )
+from scheduler import (
+    EventDrivenScheduler,
+    IntervalScheduler,
+    SwitcherScheduler,
+    TriggeredScheduler,
+    WaitEventScheduler,
+    poll_frequency_strategy,
+)
+from buffers import RingBuffer
+from samples import STATUS_OK
+from settle import SettleDetector, StabilityThresholds
+from stats import OnlineStats
+from store import TimeIndexedStore
 
-
-def fake_get_frequency(self) -> Generator[float, None, None]:
-    frequency = 10000.0
-    while True:
-        yield frequency
-        frequency += 0.1  # Simulate changing frequency
-
-
-def fake_get_timestamp() -> Generator[float, None, None]:
-    """Simulate a timestamp generator."""
-    time = 90000  # milliseconds
-    while True:
-        yield time
-        time += 1
+RATE = 1000  # simulated measurements per second
 
 
-# This function will simulate an event that triggers the callback function
-def simulate_callback_events(
-    wavemeter: WavemeterWS7, stop_event: threading.Event, interval: float = 0.1
-):
+def wait_for(condition, timeout: float = 2.0) -> bool:
     """
-    wavemeter: WavemeterWS7 instance to call the callback on.
-    stop_event: A threading.Event to control when to stop the simulation.
-    interval: Time in seconds between simulated callback events.
-
+    Polls condition() until it is true or the timeout expires.
     """
-    # simulates waiting for the callback function to be set/intialized/registered
-    while not hasattr(wavemeter, "_cb_cfunc") or wavemeter._cb_cfunc is None:
-        if stop_event.is_set():
-            return
-        time.sleep(0.05)
-    # When callback function is set, the above loop will exit
-
-    fake_mode = wlmConst.cmiFrequency1
-
-    # Until the callback function is unregistered, periodically call it with new data
-    while not stop_event.is_set():
-        # Simulate different modes for the callback
-        if fake_mode == wlmConst.cmiFrequency1:
-            fake_mode = wlmConst.cmiFrequency2
-        if fake_mode == wlmConst.cmiFrequency2:
-            fake_mode = wlmConst.cmiVersion  # This should not be used by the callback function, so a value should be missing every third time
-
-        # fake_intval = int(time.time() * 1000)  # the current time in milliseconds
-        fake_intval = fake_get_timestamp()
-        fake_dblval = wavemeter.get_frequency()  # Use the fake get_frequency
-
-        # Call the callback function with the fake data
-        wavemeter._cb_cfunc(fake_mode, fake_intval, fake_dblval)
-
-        time.sleep(interval)
-
-
-# Lambda for starting the event simulation thread
-
-
-# def start_event_monitor():
-#     stop_event = threading.Event()
-#     # stop_event.clear()  # Ensure the stop event is clear before starting the thread
-#     event_monitor_thread = threading.Thread(
-#         target=simulate_callback_events, args=(None, stop_event), daemon=True
-#     )
-#     event_monitor_thread.start()
-
-
-# # lambda for stopping the event simulation thread
-# def stop_event_monitor():
-#     """
-#     Stop the event monitor thread by setting the stop event.
-#     """
-#     stop_event.set()
-#     event_monitor_thread.join()  # Wait for the thread to finish
-#     # Reset the stop event for future use
-#     stop_event.clear()
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
 
 
 @pytest.fixture
-def mock_wavemeter(monkeypatch):
-    # Create a fake WavemeterWS7 instance
-    wm = WavemeterWS7()
-
-    stop_event_monitor_flag = threading.Event()
-    event_monitor_thread = threading.Thread(
-        target=simulate_callback_events,
-        args=(wm, stop_event_monitor_flag),
-        daemon=True,
-    )
-
-    # Monkeypatch the init method to avoid loading the DLL
-    monkeypatch.setattr(
-        WavemeterWS7, "__init__", lambda self: setattr(self, "_cb_cfunc", None)
-    )
+def wavemeter():
+    # A WavemeterWS7 running against the simulated wlmData library instead of the DLL
+    wm = WavemeterWS7(wlmData.SIMULATED)
+    wm._api.configure(rate=RATE, noise=1e-6)
+    yield wm
+    wm.unregister_frequency_callback()
 
-    # Monkeypatch the methods that call the DLL to use fake implementations
-    monkeypatch.setattr(wm, "get_frequency", fake_get_frequency)
 
-    # TODO:TODO:TODO: instead of lambda, I need to use a function that starts a thread that listens for the callback events
-    # Override _register_callback to just store the callback.
-    # TODO: I actually need to mock the the non-private versions because the private register callback includes formatting for C compatibility
+# TESTING THE SIMULATED LIBRARY:
+def test_load_dll_selects_simulation_from_environment(monkeypatch):
+    monkeypatch.setenv("WLMDATA_SIMULATED", "1")
+    api = wlmData.LoadDLL()
+    assert api.GetWLMCount(0) == 1
+    assert wlmData.dll is api
 
-    # def mock_register_callback(cb):
-    #     # Start a thread to simulate callback events
 
-    # def mock_unregister_callback():
-    #     # Stop the event simulation thread
-    #     stop_event_monitor_flag.set()
-
-    monkeypatch.setattr(
-        wm,
-        "_register_callback",
-        lambda: (stop_event_monitor_flag.clear(), event_monitor_thread.start()),
+@pytest.mark.skipif(
+    ctypes.util.find_library("c") is None, reason="needs a C library to load"
+)
+def test_load_dll_binds_prototypes_lazily_and_caches_the_handle(monkeypatch):
+    # Any shared library exercises the loading path; give one of its functions a prototype
+    monkeypatch.setattr(wlmData, "_handles", {})
+    monkeypatch.setattr(wlmData, "dll", None)
+    monkeypatch.setitem(wlmData._PROTOTYPES, "labs", (ctypes.c_long, (ctypes.c_long,)))
+    path = ctypes.util.find_library("c")
+    api = wlmData.LoadDLL(path)
+
+    assert "labs" not in vars(api)
+    assert api.labs(-3) == 3
+    assert api.labs.argtypes == (ctypes.c_long,)
+    assert "labs" in vars(api)  # bound once, then cached
+    assert wlmData.LoadDLL(path) is api
+    with pytest.raises(AttributeError):
+        api.GetFrequency
+
+
+def test_simulated_wait_event_fills_ctypes_out_params(wavemeter):
+    api = wavemeter._api
+    ver, mode, intval, res1 = (ctypes.c_int32() for _ in range(4))
+    dblval = ctypes.c_double()
+    args = [ctypes.byref(p) for p in (ver, mode, intval, dblval, res1)]
+
+    assert api.WaitForNextWLMEventEx(*args) == -1  # not installed
+    api.Instantiate(
+        wlmConst.cInstNotification, wlmConst.cNotifyInstallWaitEventEx, 100, 0
     )
-    monkeypatch.setattr(
-        wm,
-        "_unregister_callback",
-        lambda: (stop_event_monitor_flag.set(), event_monitor_thread.join()),
+    assert api.WaitForNextWLMEventEx(*args) == 1
+    assert mode.value == wlmConst.cmiFrequency1
+    assert dblval.value == pytest.approx(375.0, abs=1e-4)
+    assert ver.value == api.version
+    api.Instantiate(
+        wlmConst.cInstNotification, wlmConst.cNotifyRemoveWaitEvent, None, 0
     )
 
-    return wm
-
 
-# @pytest.fixture
-# def interval_scheduler():
-#     return IntervalScheduler()
-
-# @pytest.fixture
-# def sample_point():
-#     return SamplePoint()
-
-
-# TESTING
-
-
-# TESTING WavemeterWS7 IN ISOLATION (Requires being physically connected to a Wavemeter):
-
-
-# TESTING CbEventDrivenScheduler IN ISOLATION:
-# TODO:
-#   1. mock register_callback to set the callback function
-#       1a. start a thread that simulates the callback events and calls the callback function
-#       1b. set the mock_wavemeter._cb_cfunc to the callback function
-#       1c. the thread should run until the stop_event is set
-#   2. mock unregister_callback to set the callback function to None
-#       2a. stop the thread that simulates the callback events (____stop_event.set())
-class TestCbEventDrivenScheduler:
+# TESTING WavemeterWS7 AGAINST THE SIMULATED LIBRARY:
+class TestWavemeterWS7:
+    def test_get_frequency(self, wavemeter):
+        assert wavemeter.get_frequency() == pytest.approx(375.0, abs=1e-4)
+
+    def test_set_frequency_and_drift(self, wavemeter):
+        wavemeter._api.set_frequency(380.0)
+        wavemeter._api.configure(noise=0.0, drift=1.0)
+        assert 380.0 < wavemeter.get_frequency() < 380.1
+
+    def test_quality_readings(self, wavemeter):
+        wavemeter._api.configure(exposure=12, linewidth=2e-6, noise=3e-7)
+        assert wavemeter.get_exposure_num(1) == 12
+        assert wavemeter.get_linewidth_num(1) == 2e-6
+        assert wavemeter.get_measurement_uncertainty(1) == 3e-7
+        assert wavemeter.get_linewidth_num(2) == wlmConst.ErrChannelNotAvailable
+
+    @pytest.mark.parametrize(
+        "error, exception",
+        [
+            (wlmConst.ErrNoSignal, WavemeterWS7NoSignalException),
+            (wlmConst.ErrLowSignal, WavemeterWS7LowSignalException),
+            (wlmConst.ErrWlmMissing, WavemeterWS7Exception),
+        ],
+    )
+    def test_signal_errors_raise(self, wavemeter, error, exception):
+        wavemeter._api.inject_error(error)
+        with pytest.raises(exception):
+            wavemeter.get_frequency()
+        assert wavemeter.get_frequency() > 0  # only the next measurement fails
+
+
+# TESTING INSTRUMENT STATE SNAPSHOTS:
+class TestInstrumentState:
+    def test_reads_overlap(self, wavemeter):
+        wavemeter._api.configure(temperature=25.5, pressure=990.0, read_delay=0.02)
+        start = time.perf_counter()
+        state = wavemeter.snapshot_state()
+        elapsed = time.perf_counter() - start
+
+        assert list(state.values) == list(STATE_PARAMETERS)
+        assert state["temperature"] == 25.5 and state["pressure"] == 990.0
+        assert state["exposure"] == 10 and state["switcher_channel"] == 1
+        assert all(age == 0.0 for age in state.ages.values())
+        assert elapsed < 3 * 0.02  # five reads one after another take 0.1 s
+
+    def test_cached_events_within_max_age(self, wavemeter):
+        wavemeter.track_state()
+        try:
+            wavemeter._api.configure(temperature=30.0, exposure=15)
+            assert wait_for(lambda: len(wavemeter._state_cache.entries) >= 2)
+            wavemeter._api.configure(read_delay=0.05)
+
+            start = time.perf_counter()
+            state = wavemeter.snapshot_state(("temperature", "exposure"))
+            assert time.perf_counter() - start < 0.05  # nothing was read
+            assert state.values == {"temperature": 30.0, "exposure": 15.0}
+            assert all(age > 0 for age in state.ages.values())
+
+            # Too old for max_age: read instead
+            wavemeter._api.configure(read_delay=0.0)
+            state = wavemeter.snapshot_state(("temperature",), max_age=0.0)
+            assert state.ages["temperature"] == 0.0
+        finally:
+            wavemeter.untrack_state()
+        assert wavemeter._dispatcher._cfunc is None
+
+    def test_async_snapshot_is_attached_to_the_step(self, wavemeter):
+        wavemeter._api.configure(read_delay=0.01)
+        detector = SettleDetector(
+            StabilityThresholds(settle_window=0.01, max_avg_time=0.05, target_sem=0.0)
+        )
+        scheduler = EventDrivenScheduler(wavemeter)
+        scheduler.add_consumer(detector)
+        detector.start_step(state=wavemeter.snapshot_state_async(("temperature",)))
+        scheduler.start()
+        result = detector.wait(timeout=2.0)
+        scheduler.stop()
+        assert result.state["temperature"] == 24.0
+
+    def test_unknown_parameter(self, wavemeter):
+        with pytest.raises(ValueError):
+            wavemeter.snapshot_state(("humidity",))
+
+
+# TESTING THE SCHEDULERS AGAINST THE SIMULATED LIBRARY:
+class TestEventDrivenScheduler:
     @pytest.fixture(autouse=True)
-    def setup(self, mock_wavemeter):
-        # TODO: if CBEventDrivenScheduler is updated to take a CB_func as an argument, adjust the below logic
-        self.scheduler = CbEventDrivenScheduler(mock_wavemeter)
+    def setup(self, wavemeter):
+        self.wavemeter = wavemeter
+        self.scheduler = EventDrivenScheduler(wavemeter)
 
     def test_start_stop_scheduler(self):
         """
-        Test starting and stopping the scheduler.
+        Samples arrive from the callback thread while running and stop arriving after stop().
         """
         self.scheduler.start()
         assert self.scheduler.is_running
+        assert wait_for(lambda: self.scheduler.data.qsize() >= 50)
 
-    # TODO: do one long test that tests the entire flow of the scheduler
-
-
-# TODO: Test for callback function individually (requires a mock wavemeter)
-
-# 1. Test starting and stopping the scheduler
-# 2. Test to make sure no more SamplePoints are being added after stopping the scheduler
-#   - Test that stop() unregisters the callback function
-
-# TESTING IntervalScheduler IN ISOLATION:
-
-
-# TESTING CALLBACK FUNCTION IN ISOLATION:
-
+        self.scheduler.stop()
+        assert not self.scheduler.is_running
+        count = self.scheduler.data.qsize()
+        time.sleep(0.05)
+        assert self.scheduler.data.qsize() == count
 
-# 1. Test if the callback function creates the expected SamplePoint with mode of interest: cmiFrequency1 = 28
+    def test_samples_follow_the_simulated_laser(self):
+        self.scheduler.start()
+        assert wait_for(lambda: self.scheduler.data.qsize() >= 50)
+        self.scheduler.stop()
+
+        t, values = self.scheduler.drain()
+        assert len(t) >= 50
+        assert (abs(values - 375.0) < 1e-4).all()
+        assert (t[1:] >= t[:-1]).all()
+
+    def test_ring_buffer_path(self, wavemeter):
+        scheduler = EventDrivenScheduler(wavemeter, buffer=RingBuffer(10_000))
+        scheduler.start()
+        assert wait_for(lambda: len(scheduler.snapshot()[0]) >= 50)
+        scheduler.stop()
+
+
+def test_switcher_scheduler_routes_channels(wavemeter):
+    wavemeter._api.configure(channels=2)
+    wavemeter._api.set_frequency(376.0)
+    scheduler = SwitcherScheduler(wavemeter, channels=[1, 2])
+    scheduler.start()
+    assert wait_for(
+        lambda: all(len(scheduler.snapshot_channel(ch)[0]) >= 20 for ch in (1, 2))
+    )
+    scheduler.stop()
 
-# 2. Test if the callback function creates the expected SamplePoint with mode of interest: cmiFrequency2 = 29
+    drained = scheduler.drain_all()
+    assert abs(drained[1][1].mean() - 376.0) < 1e-4
+    assert abs(drained[2][1].mean() - 376.0) < 1e-4
 
-# 3. Test if the callback function does NOT create a SamplePoint for an uninteresting mode: cmiVersion = 31
 
+def test_wait_event_scheduler(wavemeter):
+    scheduler = WaitEventScheduler(wavemeter, max_latency=0.005)
+    scheduler.start()
+    assert wait_for(lambda: len(scheduler.snapshot()[0]) >= 100)
+    scheduler.stop()
+    assert wavemeter._api._thread is None  # the wait-event was removed
 
-# TESTING CALLBACK FUNCTION AND SCHEDULER INTEGRATION: #TODO: likely just combine this test with the above tests
-# 1-3. Equivelent to the above tests, being run through the scheduler and checking if the SamplePoints are being appended to the Schedulers queue correctly
 
+def test_interval_scheduler(wavemeter):
+    scheduler = IntervalScheduler(wavemeter, interval=0.01)
+    scheduler.start()
+    assert wait_for(lambda: scheduler.data.qsize() >= 10)
+    scheduler.stop()
 
-# TESTING the SampleSession façade (May be unnecessary if not implemented)
+    _, values = scheduler.drain()
+    assert (abs(values - 375.0) < 1e-4).all()
 
 
-# TESTING Schedules with Live data from hardware device to make sure it has the right format (cant test for specific values)
+@pytest.mark.parametrize("path", ["callback", "ring", "switcher", "wait"])
+def test_consumers_only_get_measured_values(wavemeter, path):
+    """
+    Signal errors are kept in the buffer as raw codes but never reach the consumers.
+    """
+    wavemeter._api.configure(error_rate=0.3)
+    if path == "callback":
+        scheduler = EventDrivenScheduler(wavemeter)
+    elif path == "ring":
+        scheduler = EventDrivenScheduler(wavemeter, buffer=RingBuffer(10_000))
+    elif path == "switcher":
+        scheduler = SwitcherScheduler(wavemeter, channels=[1])
+    else:
+        scheduler = WaitEventScheduler(wavemeter, max_latency=0.005)
+    stats = OnlineStats()
+    scheduler.add_consumer(stats)
+    scheduler.start()
+    assert wait_for(lambda: stats.count >= 100)
+    scheduler.stop()
+
+    _, values = scheduler.drain()
+    assert (values <= 0).any()  # the errors were recorded
+    assert stats.count <= (values > 0).sum()
+    assert abs(stats.min - 375.0) < 1e-4 and abs(stats.mean - 375.0) < 1e-4
+
+
+# TESTING TRIGGERED MEASUREMENTS:
+class TestTriggeredMeasurement:
+    def test_triggered_mode(self, wavemeter):
+        wavemeter.start_triggered_mode()
+        assert wavemeter.get_trigger_state() == wlmConst.cCtrlMeasurementInterrupt
+        assert not wavemeter._api.GetIntervalMode(False)
+        assert wavemeter.trigger() == wlmConst.ResERR_NoErr
+        assert wavemeter.trigger() == wlmConst.ResERR_TriggerPending
+        wavemeter.stop_triggered_mode()
+        assert wavemeter.get_trigger_state() == wlmConst.cCtrlMeasurementContinue
+        assert wavemeter._api.GetIntervalMode(False)
+
+    def test_software_triggers_pair_one_to_one(self, wavemeter):
+        scheduler = TriggeredScheduler(wavemeter)
+        scheduler.start()
+        wavemeter._api.inject_error(wlmConst.ErrLowSignal)
+        for k in range(20):
+            assert scheduler.trigger() == k
+            assert scheduler.wait_for_measurement(k, timeout=1.0)
+        time.sleep(0.02)  # no measurements without triggers
+        scheduler.stop()
+
+        index, t, values = scheduler.drain_triggered()
+        assert index.tolist() == list(range(20))
+        assert (
+            values[0] == wlmConst.ErrLowSignal
+        )  # a failed measurement keeps its index
+        assert (abs(values[1:] - 375.0) < 1e-4).all()
+        assert (t[1:] > t[:-1]).all()
+        assert wavemeter._api.measurements == 20 + scheduler.stray_measurements
+        assert scheduler.data.qsize() == 20
+
+    def test_external_triggers(self, wavemeter):
+        scheduler = TriggeredScheduler(wavemeter, external=True)
+        scheduler.start()
+        time.sleep(0.01)  # measurements in flight when the interrupt was set
+        offset = scheduler.measurements_received
+        for k in range(5):
+            wavemeter._api.external_trigger()
+            assert scheduler.wait_for_measurement(offset + k, timeout=1.0)
+        scheduler.stop()
+        with pytest.raises(RuntimeError):
+            scheduler.trigger()
+        index, _, _ = scheduler.drain_triggered()
+        assert index[offset:].tolist() == list(range(offset, offset + 5))
+
+    def test_persistent_scheduler_restarts_indices_per_step(self, wavemeter):
+        scheduler = TriggeredScheduler(wavemeter)
+        scheduler.open()
+        for _ in range(3):
+            scheduler.start()
+            for k in range(3):
+                assert scheduler.trigger() == k
+                assert scheduler.wait_for_measurement(k, timeout=1.0)
+            scheduler.stop()
+            assert scheduler.drain_triggered()[0].tolist() == [0, 1, 2]
+            assert wavemeter.get_trigger_state() == wlmConst.cCtrlMeasurementInterrupt
+        scheduler.close()
+        assert wavemeter.get_trigger_state() == wlmConst.cCtrlMeasurementContinue
+
+
+# TESTING SEVERAL WLM INSTANCES:
+class TestMultipleInstances:
+    @pytest.fixture(autouse=True)
+    def setup(self, wavemeter):
+        self.wavemeter = wavemeter
+        self.second = wavemeter._api.add_instance(6000, rate=50, frequency=380.0)
+        wavemeter._api.configure(rate=2000)  # the default instance is 40 times faster
+
+    def test_instances_are_selected_per_call(self):
+        assert self.wavemeter.versions() == [5000, 6000]
+        a, b = self.wavemeter.instance(5000), self.wavemeter.instance(6000)
+        assert b.version == 6000
+        assert b.get_frequency() == pytest.approx(380.0, abs=1e-4)
+        assert a.get_frequency() == pytest.approx(375.0, abs=1e-4)
+        self.second.inject_error(wlmConst.ErrLowSignal)
+        assert b.get_frequency_raw() == wlmConst.ErrLowSignal
+        with pytest.raises(WavemeterWS7Exception):
+            self.wavemeter.instance(7000)
+
+    def test_default_object_keeps_its_instance(self):
+        assert self.wavemeter.version == 5000
+        b = self.wavemeter.instance(6000)
+        assert b.get_frequency() == pytest.approx(380.0, abs=1e-4)
+        # b preset the second instance; the default object still reads its own
+        assert self.wavemeter.get_frequency() == pytest.approx(375.0, abs=1e-4)
+
+        scheduler = EventDrivenScheduler(self.wavemeter)
+        scheduler.start()
+        assert wait_for(lambda: self.second.measurements >= 5)
+        scheduler.stop()
+        _, values = scheduler.drain()
+        assert len(values) > 0 and (abs(values - 375.0) < 1e-4).all()
+
+    def test_a_scheduler_per_instance(self):
+        fast = EventDrivenScheduler(
+            self.wavemeter.instance(5000), buffer=RingBuffer(100_000)
+        )
+        slow = EventDrivenScheduler(
+            self.wavemeter.instance(6000), buffer=RingBuffer(1_000)
+        )
+        fast.start()
+        slow.start()
+        time.sleep(0.3)
+        slow.stop()  # the other instance keeps its callback
+        measured = self.second.measurements
+        count = len(fast.snapshot()[0])
+        assert wait_for(lambda: len(fast.snapshot()[0]) > count)
+        fast.stop()
+        assert self.wavemeter._api._callback is None  # removed with the last handler
+
+        _, fast_values = fast.drain()
+        _, slow_values = slow.drain()
+        assert (abs(fast_values - 375.0) < 1e-4).all()
+        assert (abs(slow_values - 380.0) < 1e-4).all()
+        # The slow instance got every measurement despite sharing the callback thread
+        assert measured - 1 <= len(slow_values) <= measured
+        assert len(fast_values) > 10 * len(slow_values) > 0
+        assert slow.buffer_stats.dropped == 0
+
+    def test_wait_event_scheduler_keeps_its_instance(self):
+        """
+        Both instances' events arrive through the one wait-event queue; each scheduler keeps its own.
+        """
+        scheduler = WaitEventScheduler(self.wavemeter.instance(6000), max_latency=0.005)
+        scheduler.start()
+        assert wait_for(lambda: len(scheduler.snapshot()[0]) >= 10)
+        scheduler.stop()
+
+        _, values = scheduler.drain()
+        assert (abs(values - 380.0) < 1e-4).all()
+
+
+def test_interval_scheduler_records_errors_without_raising(wavemeter):
+    received = []
+
+    class Consumer:
+        def update(self, t, value):
+            received.append(value)
+
+    wavemeter._api.inject_error(wlmConst.ErrLowSignal, 3)
+    wavemeter._api.inject_error(wlmConst.ErrBigSignal, 2)
+    scheduler = IntervalScheduler(wavemeter, interval=0.002)
+    scheduler.add_consumer(Consumer())
+    scheduler.start()
+    assert wait_for(lambda: scheduler.data.qsize() >= 20)
+    scheduler.stop()
+
+    counts = scheduler.error_counts
+    assert (counts.low_signal, counts.big_signal, counts.other) == (3, 2, 0)
+    assert counts.total == scheduler.timing.polls
+    batch = scheduler.drain_batch()
+    assert batch.error_counts() == counts
+    assert (
+        batch.status[:5].tolist()
+        == [wlmConst.ErrLowSignal] * 3 + [wlmConst.ErrBigSignal] * 2
+    )
+    assert min(received) > 0  # consumers only see measured values
+
+
+def test_interval_scheduler_counts_raised_errors(wavemeter):
+    wavemeter._api.inject_error(wlmConst.ErrNoSignal, 2)
+    scheduler = IntervalScheduler(wavemeter, poll_frequency_strategy, interval=0.002)
+    scheduler.start()
+    assert wait_for(lambda: scheduler.data.qsize() >= 5)
+    scheduler.stop()
+    assert scheduler.error_counts.no_signal == 2
+    assert scheduler.data.qsize() == scheduler.timing.polls - 2
+
+
+def test_interval_scheduler_fills_the_quality_columns(wavemeter):
+    wavemeter._api.configure(exposure=12, linewidth=2e-6, noise=3e-7)
+    wavemeter._api.inject_error(wlmConst.ErrLowSignal, 2)
+    scheduler = IntervalScheduler(wavemeter, interval=0.002, quality_channel=1)
+    scheduler.start()
+    assert wait_for(lambda: scheduler.data.qsize() >= 10)
+    scheduler.stop()
+
+    batch = scheduler.drain_batch()
+    measured = batch.status == STATUS_OK
+    assert measured.sum() >= 8 and not measured[:2].any()
+    assert (batch.exposure[measured] == 12).all()
+    assert np.allclose(batch.linewidth[measured], 2e-6)
+    assert np.allclose(batch.uncertainty[measured], 3e-7)
+    assert np.isnan(batch.exposure[:2]).all()  # no readings for failed polls
+    assert len(batch.select(min_exposure=5)) == measured.sum()
+
+
+def test_persistent_acquisition_with_step_windows(wavemeter):
+    """
+    One scheduler runs across several steps; each step's samples, including the settling, come from the store.
+    """
+    store = TimeIndexedStore()
+    scheduler = EventDrivenScheduler(wavemeter)
+    scheduler.store_raw = False
+    scheduler.add_consumer(store)
+    scheduler.start()
+    steps = []
+    for frequency in (375.0, 376.0, 377.0):
+        t_step = time.monotonic_ns()
+        wavemeter._api.set_frequency(frequency, tau=0.005)
+        time.sleep(0.1)
+        steps.append((frequency, t_step, time.monotonic_ns()))
+    assert store.wait_until(steps[-1][2], timeout=1.0)
+    scheduler.stop()
+
+    for frequency, t_step, t_end in steps:
+        # Device timestamps have 1 ms resolution, so leave a margin before the next step
+        t, values = store.window(t_step + 60_000_000, t_end - 5_000_000)
+        assert len(t) > 10
+        assert abs(values.mean() - frequency) < 1e-4
+    # The settling towards 376 THz is kept as well
+    _, settling = store.window(steps[1][1], steps[1][1] + 20_000_000)
+    assert settling.min() < 375.9
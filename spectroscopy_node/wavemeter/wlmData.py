@@ -4,6 +4,7 @@ wlmData API function bindings generated from wlmData.h on 2024-11-12
 # pylint: disable=line-too-long
 
 import ctypes
+import os
 import platform
 
 _FUNCTYPE = ctypes.WINFUNCTYPE if platform.system() == 'Windows' else ctypes.CFUNCTYPE
@@ -563,10 +564,44 @@ _PROTOTYPES = {
 
 dll = None # pylint: disable=invalid-name
 
+# LoadDLL path selecting the pure-Python simulation (wlmSim.SimulatedWLM) instead of the library.
+# LoadDLL() also selects it when the WLMDATA_SIMULATED environment variable is set.
+SIMULATED = 'simulated'
+
+# Libraries loaded by this process, by path. Loading the same path again returns the same handle.
+_handles = {}
+
+class _LazyLibrary:
+    """
+    Loaded wlmData library whose functions get their _PROTOTYPES argtypes/restype when first used,
+    instead of all ~200 of them on load. A bound function is cached as an attribute, so later calls
+    cost the same as with an eagerly bound library.
+    """
+
+    def __init__(self, lib):
+        self._lib = lib
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        # lib[name] returns a new function pointer, so no other thread can see it before it is bound
+        fnptr = self._lib[name]
+        if name in _PROTOTYPES:
+            fnptr.restype, fnptr.argtypes = _PROTOTYPES[name]
+        setattr(self, name, fnptr)
+        return fnptr
+
 def LoadDLL(path = None): # pylint: disable=invalid-name
     """Load wlmData library"""
     global dll # pylint: disable=global-statement
 
+    if path is None and os.environ.get('WLMDATA_SIMULATED'):
+        path = SIMULATED
+    if path == SIMULATED:
+        import wlmSim # pylint: disable=import-outside-toplevel
+        dll = wlmSim.SimulatedWLM()
+        return dll
+
     if path is None:
         if platform.system() == 'Windows':
             path = 'wlmData.dll'
@@ -575,14 +610,9 @@ def LoadDLL(path = None): # pylint: disable=invalid-name
         else:
             path = 'libwlmData.so'
 
-    dll = ctypes.WinDLL(path) if platform.system() == 'Windows' else ctypes.CDLL(path)
-
-    for name, (restype, argtypes) in _PROTOTYPES.items():
-        try:
-            fnptr = getattr(dll, name)
-        except AttributeError:
-            continue
-        fnptr.argtypes = argtypes
-        fnptr.restype = restype
+    if path not in _handles:
+        lib = ctypes.WinDLL(path) if platform.system() == 'Windows' else ctypes.CDLL(path)
+        _handles[path] = _LazyLibrary(lib)
+    dll = _handles[path]
 
     return dll
@@ -0,0 +1,520 @@
+"""
+Pure-Python stand-in for the wlmData library, for running the acquisition code without a wavemeter.
+
+wlmData.LoadDLL(wlmData.SIMULATED) (or any LoadDLL() call with the WLMDATA_SIMULATED environment variable
+set) returns a SimulatedWLM instead of the ctypes library. It provides the wlmData functions WavemeterWS7
+uses, under the same names and with the same arguments and return values (see wlmData._PROTOTYPES):
+    GetWLMCount, PresetWLMIndex, GetWLMIndex, GetWLMVersion, GetFrequency, GetFrequencyNum, GetExposureNum,
+    GetLinewidthNum, GetMeasurementUncertainty, GetTemperature, GetPressure, GetSwitcherChannel,
+    TriggerMeasurement, GetTriggerState, SetIntervalMode, GetIntervalMode, Instantiate (install/remove of the
+    plain and extended callbacks and of the wait-event mechanism), WaitForWLMEvent(Ex),
+    WaitForNextWLMEvent(Ex), ClearWLMEvents.
+
+While a callback or the wait-event mechanism is installed, a background thread "measures" at `rate` Hz
+and delivers every measurement the way the DLL does: the callback is called from that thread, and
+wait-events are queued for WaitFor...WLMEvent. Unlike the DLL's thread it is a Python threading.Thread,
+so tests cannot rely on the callback running outside the interpreter. Measured values follow
+frequency + drift * t + gaussian noise, and signal errors (ErrNoSignal, ErrBadSignal, ...) can be
+injected at random or on demand.
+
+Changing the temperature, pressure or exposure with configure() delivers a cmiTemperature, cmiPressure or
+cmiExposureValue event with the next measurement, like the DLL reports changes of these values.
+`read_delay` makes the instrument-state getters (GetTemperature, GetPressure, GetExposureNum,
+GetLinewidthNum, GetSwitcherChannel) take that long, like calls that wait for the WLM server.
+
+TriggerMeasurement(cCtrlMeasurementInterrupt) stops the free-running measurement; afterwards one measurement
+is made per TriggerMeasurement(cCtrlMeasurementTriggerPoll) or external_trigger() (a pulse on the trigger
+input), in the next measurement slot. cCtrlMeasurementContinue resumes free-running measurement.
+
+Further WLM server instances are added with add_instance(version, ...). Each measures in its own thread at
+its own rate and settings; PresetWLMIndex selects the instance the Get... functions address, and events
+report the instance's version in the Ver argument of the extended callback and wait-events, as the DLL
+does with several WLM servers on one host.
+"""
+
+import collections, math, random, threading, time
+from typing import Optional
+
+import wlmConst
+
+SIGNAL_ERRORS = (
+    wlmConst.ErrNoSignal,
+    wlmConst.ErrBadSignal,
+    wlmConst.ErrLowSignal,
+    wlmConst.ErrBigSignal,
+)
+
+_INT32_RANGE = 2**32
+
+# The event reporting a change of each setting; exposure has one per switcher channel (CCD array 1)
+_STATE_EVENTS = {
+    "temperature": wlmConst.cmiTemperature,
+    "pressure": wlmConst.cmiPressure,
+    "exposure": (
+        wlmConst.cmiExposureValue11,
+        wlmConst.cmiExposureValue12,
+        wlmConst.cmiExposureValue13,
+        wlmConst.cmiExposureValue14,
+        wlmConst.cmiExposureValue15,
+        wlmConst.cmiExposureValue16,
+        wlmConst.cmiExposureValue17,
+        wlmConst.cmiExposureValue18,
+    ),
+}
+
+
+def _set_out(param, value) -> None:
+    # Writes an out-parameter passed as ctypes.byref(x) or ctypes.pointer(x)
+    target = getattr(param, "_obj", None)
+    if target is None:
+        target = param.contents
+    target.value = value
+
+
+class SimulatedWLM:
+    """
+    A simulated wavemeter behind the wlmData function interface.
+
+    Settings can be changed at any time with configure(), set_frequency() and inject_error().
+    The object is the library and its first WLM instance; add_instance() adds more.
+    """
+
+    def __init__(
+        self,
+        rate: float = wlmConst.WLM_MAX_MEASUREMENT_RATE,
+        frequency: float = 375.0,
+        noise: float = 1e-6,
+        drift: float = 0.0,
+        error_rate: float = 0.0,
+        channels: int = 1,
+        exposure: int = 10,
+        linewidth: float = 5e-6,
+        temperature: float = 24.0,
+        pressure: float = 1013.25,
+        read_delay: float = 0.0,
+        version: int = 5000,
+        event_queue_size: int = 65536,
+        seed: Optional[int] = None,
+    ):
+        """
+        Args:
+            rate (float): Measurements per second while a callback or wait-event is installed.
+            frequency (float): The laser frequency (THz).
+            noise (float): Standard deviation of the gaussian measurement noise (THz).
+            drift (float): Linear frequency drift (THz per second).
+            error_rate (float): Probability that a measurement returns a random signal error instead.
+            channels (int): Switcher channels. With more than one, measurements cycle through the channels
+                and each is preceded by a cmiSwitcherChannel event.
+            exposure (int): The exposure time in ms reported for every channel and array.
+            linewidth (float): The linewidth reported for every channel.
+            temperature (float): The temperature in °C reported by GetTemperature.
+            pressure (float): The pressure in mbar reported by GetPressure.
+            read_delay (float): Seconds each instrument-state getter takes.
+            version (int): The WLM version reported in the Ver argument of extended events.
+            event_queue_size (int): The number of wait-events kept; the oldest are dropped beyond this.
+            seed (int, optional): Seed of the noise and error generator.
+        """
+        self.rate = rate
+        self.noise = noise
+        self.drift = drift
+        self.error_rate = error_rate
+        self.channels = channels
+        self.exposure = exposure
+        self.linewidth = linewidth
+        self.temperature = temperature
+        self.pressure = pressure
+        self.read_delay = read_delay
+        self.version = version
+        # Settings changed by configure() that are reported with the next measurement
+        self._changed: set[str] = set()
+        self._random = random.Random(seed)
+
+        # Frequency model: relaxes from _start towards _target with time constant _tau, plus drift
+        self._target = self._start = frequency
+        self._tau = 0.0
+        self._t_set = time.monotonic()
+        self._pending_errors: collections.deque = collections.deque()
+
+        self._lock = threading.Lock()
+        self._callback = None
+        self._callback_ex = False
+        self._waiting = False
+        self._wait_timeout = 0.0
+        self._events: collections.deque = collections.deque(maxlen=event_queue_size)
+        self._event_ready = threading.Condition(self._lock)
+        self._deliver_lock = threading.Lock()
+
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._measurements = 0
+        self._channel = 1
+
+        # Triggering: cCtrlMeasurementContinue (free-running) or cCtrlMeasurementInterrupt (triggered)
+        self._trigger_mode = wlmConst.cCtrlMeasurementContinue
+        self._trigger_pending = False
+        self._missed_triggers = 0
+        self._interval_mode = True
+
+        # The library delivering this instance's events, and (on the library) its instances
+        self._library = self
+        self._instances = [self]
+        self._selected = self
+
+    # simulation control
+    @property
+    def measurements(self) -> int:
+        # Returns the number of measurements made by the background thread.
+        return self._measurements
+
+    def configure(self, **settings) -> None:
+        """
+        Changes any of the rate, noise, drift, error_rate, channels, exposure, linewidth, temperature,
+        pressure, read_delay and version settings.
+        """
+        for name, value in settings.items():
+            if name not in (
+                "rate",
+                "noise",
+                "drift",
+                "error_rate",
+                "channels",
+                "exposure",
+                "linewidth",
+                "temperature",
+                "pressure",
+                "read_delay",
+                "version",
+            ):
+                raise ValueError(f"Unknown simulation setting: {name}")
+            setattr(self, name, value)
+            if name in _STATE_EVENTS:
+                self._changed.add(name)
+
+    def add_instance(self, version: int, **settings) -> "SimulatedWLM":
+        """
+        Adds another WLM server instance with the given version and SimulatedWLM settings, and returns it
+        (to configure it or step its frequency). It measures whenever a callback or wait-event is installed.
+        """
+        if any(instance.version == version for instance in self._instances):
+            raise ValueError(f"A WLM instance with version {version} already exists.")
+        instance = SimulatedWLM(version=version, **settings)
+        instance._library = self
+        with self._lock:
+            self._instances = self._instances + [instance]
+            self._update_thread()
+        return instance
+
+    @property
+    def missed_triggers(self) -> int:
+        # Returns the number of external triggers that arrived while a measurement was still pending.
+        return self._missed_triggers
+
+    def external_trigger(self) -> None:
+        """
+        Simulates a pulse on the trigger input: in triggered mode, the next measurement slot measures.
+        A pulse arriving while the previous triggered measurement is pending is lost.
+        """
+        if self._trigger_pending:
+            self._missed_triggers += 1
+        self._trigger_pending = True
+
+    def set_frequency(self, frequency: float, tau: float = 0.0) -> None:
+        """
+        Steps the laser to a new frequency, approached exponentially with time constant tau (seconds).
+        """
+        now = time.monotonic()
+        self._start = self._true_frequency(now)
+        self._target = frequency
+        self._tau = tau
+        self._t_set = now
+
+    def inject_error(self, error: int = wlmConst.ErrNoSignal, count: int = 1) -> None:
+        """
+        Makes the next `count` measurements (polled or event) return the given error code.
+        """
+        self._pending_errors.extend([error] * count)
+
+    def _true_frequency(self, now: float) -> float:
+        elapsed = now - self._t_set
+        value = self._target + self.drift * elapsed
+        if self._tau > 0:
+            value += (self._start - self._target) * math.exp(-elapsed / self._tau)
+        return value
+
+    def _measure(self, now: float) -> float:
+        if self._pending_errors:
+            return float(self._pending_errors.popleft())
+        if self.error_rate and self._random.random() < self.error_rate:
+            return float(self._random.choice(SIGNAL_ERRORS))
+        return self._true_frequency(now) + self._random.gauss(0.0, self.noise)
+
+    # measurement thread
+    def _update_thread(self) -> None:
+        # Runs every instance's measurement thread while anything is installed. Called with the lock held.
+        active = self._callback is not None or self._waiting
+        stopped = []
+        for instance in self._instances:
+            if active and instance._thread is None:
+                instance._stop.clear()
+                instance._thread = threading.Thread(
+                    target=instance._measure_loop, daemon=True
+                )
+                instance._thread.start()
+            elif not active and instance._thread is not None:
+                stopped.append(instance._thread)
+                instance._thread = None
+                instance._stop.set()
+        # Like the DLL, no callback runs after the remove call returns
+        stopped = [t for t in stopped if t is not threading.current_thread()]
+        if stopped:
+            self._lock.release()
+            try:
+                for thread in stopped:
+                    thread.join()
+            finally:
+                self._lock.acquire()
+
+    def _measure_loop(self) -> None:
+        start = time.monotonic()
+        emitted = 0
+        while not self._stop.is_set():
+            now = time.monotonic()
+            # Emit every measurement that is due; at high rates this delivers them in bursts
+            due = int((now - start) * self.rate) - emitted
+            for i in range(due):
+                # In triggered mode a slot only measures if a trigger is pending
+                if self._trigger_mode == wlmConst.cCtrlMeasurementInterrupt:
+                    if not self._trigger_pending:
+                        continue
+                    self._trigger_pending = False
+                t = start + (emitted + i + 1) / self.rate
+                self._emit(t)
+            emitted += due
+            next_t = start + (emitted + 1) / self.rate
+            self._stop.wait(max(next_t - time.monotonic(), 0.0))
+
+    def _emit(self, t: float) -> None:
+        intval = int(t * 1000) % _INT32_RANGE
+        if intval >= _INT32_RANGE // 2:
+            intval -= _INT32_RANGE  # the DLL's timestamp is a signed 32 bit counter
+        library = self._library
+        if self._changed:
+            self._report_changes(intval)
+        if self.channels > 1:
+            self._channel = self._channel % self.channels + 1
+            library._deliver(
+                self.version, wlmConst.cmiSwitcherChannel, self._channel, 0.0
+            )
+        self._measurements += 1
+        library._deliver(self.version, wlmConst.cmiFrequency1, intval, self._measure(t))
+
+    def _report_changes(self, intval: int) -> None:
+        changed, self._changed = self._changed, set()
+        library = self._library
+        for name in changed:
+            if name == "exposure":
+                modes = _STATE_EVENTS[name][: self.channels]
+                for mode in modes:
+                    library._deliver(self.version, mode, self.exposure, 0.0)
+            else:
+                value = getattr(self, name)
+                library._deliver(self.version, _STATE_EVENTS[name], intval, value)
+
+    def _deliver(self, version: int, mode: int, intval: int, dblval: float) -> None:
+        # The DLL calls the callback from one thread; serialize the instances' measurement threads
+        with self._deliver_lock:
+            callback = self._callback
+            if callback is not None:
+                if self._callback_ex:
+                    callback(version, mode, intval, dblval, 0)
+                else:
+                    callback(mode, intval, dblval)
+        if self._waiting:
+            with self._event_ready:
+                self._events.append((version, mode, intval, dblval))
+                self._event_ready.notify()
+
+    # wlmData functions
+    def GetWLMCount(self, V: int) -> int:  # pylint: disable=invalid-name
+        return len(self._instances)
+
+    def PresetWLMIndex(self, Ver: int) -> int:  # pylint: disable=invalid-name
+        # Ver is an instance's version number or its index
+        instances = self._instances
+        for instance in instances:
+            if instance.version == Ver:
+                self._selected = instance
+                return wlmConst.ResERR_NoErr
+        if 0 <= Ver < len(instances):
+            self._selected = instances[Ver]
+            return wlmConst.ResERR_NoErr
+        return wlmConst.ResERR_WlmMissing
+
+    def GetWLMIndex(self, Ver: int) -> int:  # pylint: disable=invalid-name
+        for index, instance in enumerate(self._instances):
+            if instance.version == Ver:
+                return index
+        return wlmConst.ResERR_WlmMissing
+
+    def GetWLMVersion(self, Ver: int) -> int:  # pylint: disable=invalid-name
+        # 0: the WLM type, 1: its version number
+        if Ver == 0:
+            return 7
+        if Ver == 1:
+            return self._selected.version
+        return 0
+
+    def GetFrequency(self, F: float) -> float:  # pylint: disable=invalid-name
+        return self._selected._measure(time.monotonic())
+
+    def GetFrequencyNum(
+        self, num: int, F: float
+    ) -> float:  # pylint: disable=invalid-name
+        wlm = self._selected
+        if not 1 <= num <= wlm.channels:
+            return float(wlmConst.ErrChannelNotAvailable)
+        return wlm._measure(time.monotonic())
+
+    def _read_state(self) -> "SimulatedWLM":
+        # The selected instance, after the time a state getter takes
+        wlm = self._selected
+        if wlm.read_delay:
+            time.sleep(wlm.read_delay)
+        return wlm
+
+    def GetExposureNum(
+        self, num: int, arr: int, E: int
+    ) -> int:  # pylint: disable=invalid-name
+        wlm = self._read_state()
+        if not 1 <= num <= wlm.channels:
+            return wlmConst.ErrChannelNotAvailable
+        return wlm.exposure
+
+    def GetLinewidthNum(
+        self, num: int, LW: float
+    ) -> float:  # pylint: disable=invalid-name
+        wlm = self._read_state()
+        if not 1 <= num <= wlm.channels:
+            return float(wlmConst.ErrChannelNotAvailable)
+        return wlm.linewidth
+
+    def GetTemperature(self, T: float) -> float:  # pylint: disable=invalid-name
+        return self._read_state().temperature
+
+    def GetPressure(self, P: float) -> float:  # pylint: disable=invalid-name
+        return self._read_state().pressure
+
+    def GetSwitcherChannel(self, CH: int) -> int:  # pylint: disable=invalid-name
+        return self._read_state()._channel
+
+    def GetMeasurementUncertainty(
+        self, Index: int, num: int, MU: float
+    ) -> float:  # pylint: disable=invalid-name
+        wlm = self._selected
+        if not 1 <= num <= wlm.channels:
+            return float(wlmConst.ErrChannelNotAvailable)
+        # The noise is the measurement's uncertainty; a noise-free simulation still reports a floor
+        return max(wlm.noise, 1e-9)
+
+    def TriggerMeasurement(self, Action: int) -> int:  # pylint: disable=invalid-name
+        wlm = self._selected
+        if Action in (
+            wlmConst.cCtrlMeasurementContinue,
+            wlmConst.cCtrlMeasurementInterrupt,
+        ):
+            wlm._trigger_mode = Action
+            wlm._trigger_pending = False
+        elif Action == wlmConst.cCtrlMeasurementTriggerPoll:
+            if wlm._trigger_mode != wlmConst.cCtrlMeasurementInterrupt:
+                return wlmConst.ResERR_CouldNotSet
+            if wlm._trigger_pending:
+                return wlmConst.ResERR_TriggerPending
+            wlm._trigger_pending = True
+        elif Action != wlmConst.cCtrlMeasurementTriggerSuccess:
+            return wlmConst.ResERR_ParmOutOfRange
+        return wlmConst.ResERR_NoErr
+
+    def GetTriggerState(self, TS: int) -> int:  # pylint: disable=invalid-name
+        wlm = self._selected
+        if wlm._trigger_pending:
+            return wlmConst.cCtrlMeasurementTriggerPoll
+        return wlm._trigger_mode
+
+    def SetIntervalMode(self, IM: bool) -> int:  # pylint: disable=invalid-name
+        self._selected._interval_mode = bool(IM)
+        return wlmConst.ResERR_NoErr
+
+    def GetIntervalMode(self, IM: bool) -> bool:  # pylint: disable=invalid-name
+        return self._selected._interval_mode
+
+    def Instantiate(
+        self, RFC: int, Mode: int, P1, P2: int
+    ) -> int:  # pylint: disable=invalid-name
+        if RFC != wlmConst.cInstNotification:
+            return 1  # cInstCheckForWLM and the others: a WLM is running
+
+        with self._lock:
+            if Mode in (
+                wlmConst.cNotifyInstallCallback,
+                wlmConst.cNotifyInstallCallbackEx,
+            ):
+                self._callback = P1
+                self._callback_ex = Mode == wlmConst.cNotifyInstallCallbackEx
+            elif Mode == wlmConst.cNotifyRemoveCallback:
+                self._callback = None
+            elif Mode in (
+                wlmConst.cNotifyInstallWaitEvent,
+                wlmConst.cNotifyInstallWaitEventEx,
+            ):
+                self._waiting = True
+                self._wait_timeout = (P1 or 0) / 1000
+            elif Mode == wlmConst.cNotifyRemoveWaitEvent:
+                self._waiting = False
+                self._events.clear()
+                self._event_ready.notify_all()
+            else:
+                return 0
+            self._update_thread()
+        return 1
+
+    def ClearWLMEvents(self) -> None:  # pylint: disable=invalid-name
+        with self._lock:
+            self._events.clear()
+
+    def _next_event(self):
+        # Returns the oldest queued event, or an int return code if there is none
+        with self._event_ready:
+            if not self._waiting:
+                return -1
+            if not self._events:
+                self._event_ready.wait(self._wait_timeout)
+            if not self._waiting:
+                return -1
+            if not self._events:
+                return 0
+            return self._events.popleft()
+
+    def WaitForWLMEvent(
+        self, Mode, IntVal, DblVal
+    ) -> int:  # pylint: disable=invalid-name
+        event = self._next_event()
+        if isinstance(event, int):
+            return event
+        for param, value in zip((Mode, IntVal, DblVal), event[1:]):
+            _set_out(param, value)
+        return 1
+
+    def WaitForWLMEventEx(
+        self, Ver, Mode, IntVal, DblVal, Res1
+    ) -> int:  # pylint: disable=invalid-name
+        event = self._next_event()
+        if isinstance(event, int):
+            return event
+        for param, value in zip((Ver, Mode, IntVal, DblVal), event):
+            _set_out(param, value)
+        _set_out(Res1, 0)
+        return 1
+
+    # The events are queued in order and handed out oldest first, so both variants behave the same here
+    WaitForNextWLMEvent = WaitForWLMEvent
+    WaitForNextWLMEventEx = WaitForWLMEventEx